@@ -1,9 +1,15 @@
 import pandas as pd
 
-def deduplicate_excel(file_path, sheet_name, columns):
-    df = pd.read_excel(file_path, sheet_name=sheet_name, header=1)
+from dedupIndex import KSubsetIndex
+from tableIO import read_table
+
+def deduplicate_excel(file_path, sheet_name, columns, overlap_k=2, max_overlap_rows=3, max_value_frequency=3):
+    df = read_table(file_path, sheet_name=sheet_name, header=1)
     result = pd.DataFrame(columns=df.columns)  # 初始化结果 DataFrame
     value_counts = {}  # 用于记录每个值的出现次数
+    full_match = len(columns)  # 所有列的值都相同
+    kept_sets = []  # 已保留行的值集合，下标即保留顺序
+    overlap_index = KSubsetIndex(overlap_k)  # overlap_k 元子集 -> 已保留行下标
 
     for _, row in df.iterrows():
         values = row[columns].tolist()
@@ -13,29 +19,30 @@ def deduplicate_excel(file_path, sheet_name, columns):
             result = pd.concat([result, row.to_frame().T], ignore_index=True)
             for val in values:
                 value_counts[val] = value_counts.get(val, 0) + 1
+            kept_sets.append(set(values))
+            overlap_index.add(0, values)
             continue
 
-        # 检查重复关系
-        duplicate_rows = []
-        for _, existing_row in result.iterrows():
-            existing_values = existing_row[columns].tolist()
-            common_values = set(values) & set(existing_values)
-            if len(common_values) == 3:
-                duplicate_rows.append(existing_row)
-                break  # 如果存在 3 个值一样的行，跳过当前行
-            elif len(common_values) == 2:
-                duplicate_rows.append(existing_row)
-
-        if len(duplicate_rows) >= 1 and len(set(values) & set(duplicate_rows[0][columns].tolist())) == 3:
-            continue  # 如果存在 3 个值一样的行，跳过当前行
-        elif len(duplicate_rows) >= 3:
-            continue  # 如果存在 2 个值一样的行且已保留 3 行，跳过当前行
+        # 检查重复关系：只看索引中与当前行至少有 overlap_k 个相同值的已保留行，按保留顺序
+        duplicate_common = []
+        for kept in sorted(overlap_index.candidates(values)):
+            common_values = set(values) & kept_sets[kept]
+            duplicate_common.append(len(common_values))
+            if len(common_values) == full_match:
+                break  # 如果存在所有值一样的行，跳过当前行
+
+        if len(duplicate_common) >= 1 and duplicate_common[0] == full_match:
+            continue  # 如果存在所有值一样的行，跳过当前行
+        elif len(duplicate_common) >= max_overlap_rows:
+            continue  # 如果存在 overlap_k 个值一样的行且已保留 max_overlap_rows 行，跳过当前行
 
         # 检查值出现次数
-        if all(value_counts.get(val, 0) < 3 for val in values):
+        if all(value_counts.get(val, 0) < max_value_frequency for val in values):
             result = pd.concat([result, row.to_frame().T], ignore_index=True)
             for val in values:
                 value_counts[val] = value_counts.get(val, 0) + 1
+            overlap_index.add(len(kept_sets), values)
+            kept_sets.append(set(values))
 
     return result
 
@@ -1,8 +1,10 @@
 import pandas as pd
 
+from tableIO import read_table
+
 def deduplicate_excel(file_path, sheet_name, columns):
     # 读取原始数据（跳过第一行标题）
-    df = pd.read_excel(file_path, sheet_name=sheet_name, header=1)
+    df = read_table(file_path, sheet_name=sheet_name, header=1)
     result = pd.DataFrame(columns=df.columns)
     value_counts = {}  # 值频次计数器: {column_value: occurrence_count}
 
@@ -1,101 +1,162 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import time
 
-def deduplicate_excel_optimized(file_path, sheet_name, columns, sum_field='rate', max_two_duplicate_rows=2, max_value_frequency=3):
+from perfTrace import PerfTrace
+from tableIO import read_table, write_table
+from dedupIndex import (KSubsetIndex, KeyPacker, run_components,
+                        frame_digest, load_checkpoint, resume_row, save_checkpoint)
+
+def greedy_keep_mask(code_rows, packer, max_two_duplicate_rows=2, max_value_frequency=3, overlap_k=2, seed_rows=None):
     """
-    Excel数据去重函数：
-    1. ID1和(heroID2、heroID3)值完全相同的行不计入(位置可互换)
-    2. ID1和(heroID2、heroID3)值有两个相同的组合不再计入(位置可互换)
-    3. 单个值在三列中出现超过限制次数后不再计入
+    按行顺序的贪心去重，code_rows 为每行按列顺序的值编码，返回保留掩码。
+    只依赖与当前行有共同值的先前行，因此可按连通分量拆开并行执行（见 dedupIndex.run_components）。
+    各项检测只依赖已保留的行：seed_rows（此前已保留行的编码，用于增量检查点）先直接计入，不做检测。
     """
-    print(f"开始处理数据：{datetime.now().strftime('%H:%M:%S')}")
-    start_time = time.time()
-    
-    # 读取数据
-    print("读取Excel文件...")
-    df = pd.read_excel(file_path, sheet_name=sheet_name, header=1)
-    original_count = len(df)
-    
-    # 预计算字段累加值
-    print(f"计算{sum_field}累加值...")
-    rate_sums = {}
-    df['ids_set'] = df[columns].apply(lambda x: frozenset(x), axis=1)
-    for _, group in df.groupby('ids_set'):
-        rate_sums[group.iloc[0]['ids_set']] = group[sum_field].sum()
-    
-    # 准备数据结构
-    result_rows = []
-    processed_rows = []
-    value_counts = {}  # 记录每个值的出现次数
-    
-    # 修改两值相同检测部分
-    def check_values_match(row1, row2):
-        """检查两行的值是否匹配(考虑位置互换)"""
-        values1 = set([row1[columns[0]], row1[columns[1]], row1[columns[2]]])
-        values2 = set([row2[columns[0]], row2[columns[1]], row2[columns[2]]])
-        return values1 == values2
-
-    def count_common_values(row1, row2):
-        """计算两行之间共同值的数量(考虑位置互换)"""
-        values1 = set([row1[columns[0]], row1[columns[1]], row1[columns[2]]])
-        values2 = set([row2[columns[0]], row2[columns[1]], row2[columns[2]]])
-        return len(values1 & values2)
+    keep = np.zeros(len(code_rows), dtype=bool)
+    value_counts = np.zeros(len(packer.values), dtype=np.int64)  # 记录每个值的出现次数（按编码）
+    kept_sets = set()  # 已保留行的值集合(位置可互换)
+    overlap_index = KSubsetIndex(overlap_k)  # overlap_k 元子集 -> 已保留行号
+    kept_count = 0
+    for codes in ([] if seed_rows is None else seed_rows.tolist()):
+        for code in codes:
+            value_counts[code] += 1
+        kept_sets.add(frozenset(codes))
+        overlap_index.add(kept_count, codes)
+        kept_count += 1
 
-    print("开始主要处理流程...")
-    for idx, current_row in df.iterrows():
-        if idx % 1000 == 0:
-            print(f"已处理 {idx}/{len(df)} 行...")
+    for pos, codes in enumerate(code_rows.tolist()):
+        if pos % 1000 == 0:
+            print(f"已处理 {pos}/{len(code_rows)} 行...")
             
+        current_values = packer.decode(codes)
+        value_set = frozenset(codes)
+
         # === 阶段1: 完全相同值检测 ===
-        skip_row = False
-        for processed_row in processed_rows:
-            if check_values_match(current_row, processed_row):
-                print(f"跳过完全相同值行: {current_row[columns].tolist()}")
-                skip_row = True
-                break
-        if skip_row:
+        if value_set in kept_sets:
+            print(f"跳过完全相同值行: {current_values}")
             continue
             
-        # === 阶段2: 两值相同检测 ===
-        two_value_matches = 0
-        for processed_row in processed_rows:
-            if count_common_values(current_row, processed_row) >= 2:
-                two_value_matches += 1
-                if two_value_matches >= max_two_duplicate_rows:
-                    print(f"跳过两值重复超限行: {current_row[columns].tolist()}")
-                    skip_row = True
-                    break
-        if skip_row:
+        # === 阶段2: 多值相同检测（至少 overlap_k 个相同值的已保留行数） ===
+        overlapping = overlap_index.candidates(codes, limit=max_two_duplicate_rows)
+        if overlapping and len(overlapping) >= max_two_duplicate_rows:
+            print(f"跳过两值重复超限行: {current_values}")
             continue
             
         # === 阶段3: 单个值频次检测 ===
-        current_values = current_row[columns].tolist()
         skip_row = False
-        for val in current_values:
-            if value_counts.get(val, 0) >= max_value_frequency:
-                print(f"跳过超频值行: {current_values}, 超频值: {val} (已出现{value_counts[val]}次)")
+        for code in codes:
+            if value_counts[code] >= max_value_frequency:
+                print(f"跳过超频值行: {current_values}, 超频值: {packer.values[code]} (已出现{value_counts[code]}次)")
                 skip_row = True
                 break
         if skip_row:
             continue
             
         # 更新值计数
-        for val in current_values:
-            value_counts[val] = value_counts.get(val, 0) + 1
+        for code in codes:
+            value_counts[code] += 1
             
         # 通过所有检测，保留该行
-        new_row = current_row.copy()
-        new_row[sum_field] = rate_sums[current_row['ids_set']]
-        result_rows.append(new_row)
-        processed_rows.append(current_row)
+        keep[pos] = True
+        kept_sets.add(value_set)
+        overlap_index.add(kept_count, codes)
+        kept_count += 1
+    return keep
+
+def deduplicate_excel_optimized(file_path, sheet_name, columns, sum_field='rate', max_two_duplicate_rows=2, max_value_frequency=3,
+                                overlap_k=2, workers=None, perf=None, checkpoint=None,
+                                return_indices=False):
+    """
+    Excel数据去重函数（columns 可为任意多列，如 3/4/5 人阵容）：
+    1. columns 中的值完全相同的行不计入(位置可互换)
+    2. 与已保留行有 overlap_k 个及以上相同值的行，达到 max_two_duplicate_rows 行后不再计入(位置可互换)
+    3. 单个值在这些列中出现超过限制次数后不再计入
+    已保留行按值集合与 overlap_k 元子集建哈希索引，每行只做 C(n, k) 次查找，不再逐行扫描已保留行。
+    没有共同值的行互不影响：输入按值的连通分量拆分后在 workers 个进程中并行去重（默认 CPU 数，1 为不并行）。
+    perf 为 PerfTrace 时各阶段计入其中由调用方输出；为空时按环境变量 PERF_TRACE 记录并在返回前输出。
+    checkpoint 为检查点文件路径：运行结束时保存已保留行与各组合的 sum_field 累计值；
+    下次运行时若输入只是在末尾追加了新行（已处理的行内容不变、参数相同），以已保留行重建索引后只处理新增的行，
+    结果与整体重新计算相同。
+    返回保留的行（sum_field 替换为同组合的累计值）；return_indices 为 True 时只返回保留行在数据区的行号数组，
+    由调用方自行取行、关联。
+    file_path 可以是 Excel（表头在第二行），也可以是 tableIO 转换出的 Parquet/Feather/CSV（表头在第一行）。
+    """
+    print(f"开始处理数据：{datetime.now().strftime('%H:%M:%S')}")
+    start_time = time.time()
+    own_perf = perf is None
+    if own_perf:
+        perf = PerfTrace.from_env("Deduplication4")
     
-    # 创建结果DataFrame
-    result = pd.DataFrame(result_rows)
+    # 读取数据
+    print("读取数据文件...")
+    with perf.stage("read"):
+        # 只要行号时只读取去重列与累加列（Parquet/Feather 只解码这些列）
+        df = read_table(file_path, sheet_name=sheet_name, header=1,
+                        columns=list(dict.fromkeys(list(columns) + [sum_field])) if return_indices else None)
+    original_count = len(df)
+
+    # 检查点：参数一致且历史行未变时，只处理检查点之后追加的行
+    params = {"tool": "Deduplication4", "sheet_name": sheet_name, "columns": list(columns), "sum_field": sum_field,
+              "max_two_duplicate_rows": max_two_duplicate_rows, "max_value_frequency": max_value_frequency,
+              "overlap_k": overlap_k}
+    state, start_row = None, 0
+    if checkpoint:
+        with perf.stage("checkpoint_load"):
+            state = load_checkpoint(checkpoint, params)
+            start_row = resume_row(state, df)
+            if not start_row:
+                state = None
+            digest = frame_digest(df)
+        if state:
+            print(f"从检查点继续：已处理 {start_row} 行，本次新增 {original_count - start_row} 行")
+            df = df.iloc[start_row:].copy()
     
-    # 清理临时列
-    if 'ids_set' in result.columns:
-        result.drop(['ids_set'], axis=1, inplace=True)
+    # 预计算字段累加值（带检查点时在已有累计值上加上新增行）
+    print(f"计算{sum_field}累加值...")
+    rate_sums = dict(state["sums"]) if state else {}
+    with perf.stage("aggregate"):
+        df['ids_set'] = [frozenset(r) for r in df[columns].itertuples(index=False)]
+        for key, total in df.groupby('ids_set', sort=False)[sum_field].sum().items():
+            rate_sums[key] = rate_sums[key] + total if key in rate_sums else total
+    
+    # 准备数据结构
+    seed = state["kept_rows"][columns] if state else df[columns].iloc[:0]
+    # 值 -> 整数编码（只需判断相等，按首次出现顺序编码）
+    with perf.stage("encode"):
+        packer = KeyPacker(seed.to_numpy().ravel().tolist() + df[columns].to_numpy().ravel().tolist(), ordered=False)
+        code_rows, seed_rows = (np.array([packer.encode(r) for r in frame.itertuples(index=False)],
+                                         dtype=np.int64).reshape(len(frame), len(columns)) for frame in (df[columns], seed))
+
+    print("开始主要处理流程...")
+    with perf.stage("select"):
+        if state:
+            # 新增行依赖此前保留的行，在本进程内接着处理
+            keep = greedy_keep_mask(code_rows, packer, max_two_duplicate_rows=max_two_duplicate_rows,
+                                    max_value_frequency=max_value_frequency, overlap_k=overlap_k, seed_rows=seed_rows)
+        else:
+            keep = run_components(greedy_keep_mask, code_rows, workers=workers, packer=packer,
+                                  max_two_duplicate_rows=max_two_duplicate_rows, max_value_frequency=max_value_frequency,
+                                  overlap_k=overlap_k)
+    # 检查点之前保留的行排在新保留的行之前，与整体计算的顺序一致
+    kept = df.take(np.flatnonzero(keep))
+    if state:
+        kept = pd.concat([state["kept_rows"], kept])
+
+    if checkpoint:
+        with perf.stage("checkpoint_save"):
+            save_checkpoint(checkpoint, {"params": params, "rows_done": original_count, "digest": digest,
+                                         "sums": rate_sums, "kept_rows": kept})
+
+    # 通过所有检测的行，累加字段替换为同组合的总和（一次取行 + 按组合映射累计值）
+    with perf.stage("materialize"):
+        if return_indices:
+            # 行号即 read_excel 的默认行标签（数据区从 0 开始）
+            result = kept.index.to_numpy()
+        else:
+            result = kept.drop(columns='ids_set')
+            result[sum_field] = kept['ids_set'].map(rate_sums)
     
     # 打印处理结果
     end_time = time.time()
@@ -106,18 +167,25 @@ def deduplicate_excel_optimized(file_path, sheet_name, columns, sum_field='rate'
     print(f"原始数据行数：{original_count}")
     print(f"处理后行数：{len(result)}")
     print(f"去重率：{((original_count - len(result)) / original_count * 100):.2f}%")
+    perf.note(file=file_path, rows_in=original_count, rows_new=original_count - start_row, rows_out=len(result))
+    if own_perf:
+        perf.emit()
     
     return result
 
 # 执行入口
 if __name__ == "__main__":
     # === 可配置参数 ===
-    file_path = "e:/CODE/dataAnalysis/TEST/test.xlsx"
+    file_path = "e:/CODE/dataAnalysis/TEST/test.xlsx"  # 也可以是 tableIO.py 转换出的 .parquet / .feather
     sheet_name = "Sheet2"
     columns = ["ID1", "heroID2", "heroID3"]
     sum_field = "场次"  # 需要累加的字段名，可以更换为其他字段
     max_two_duplicate_rows = 3  # 可设置保留两列重复的最大数量
     max_value_frequency = 3     # 可设置单个值出现的最大次数
+    checkpoint = None           # 检查点文件路径（如 "e:/CODE/dataAnalysis/TEST/test.dedup4.ckpt"），数据只追加时下次只处理新增行
+
+    # 性能记录：--perf[=memory,profile] / --perf-out 文件，或环境变量 PERF_TRACE
+    perf, _ = PerfTrace.from_argv("Deduplication4")
 
     try:
         # 执行去重处理
@@ -127,12 +195,16 @@ if __name__ == "__main__":
             columns=columns,
             sum_field=sum_field,  # 添加累加字段参数
             max_two_duplicate_rows=max_two_duplicate_rows,
-            max_value_frequency=max_value_frequency
+            max_value_frequency=max_value_frequency,
+            perf=perf,
+            checkpoint=checkpoint
         )
 
         # 保存结果
-        result_df.to_excel("e:/CODE/dataAnalysis/TEST/deduplicated_result.xlsx", index=False)
+        with perf.stage("write"):
+            write_table(result_df, "e:/CODE/dataAnalysis/TEST/deduplicated_result.xlsx")
         print(f"\n结果已保存至：deduplicated_result.xlsx")
+        perf.emit()
         
     except Exception as e:
         print(f"处理过程中出现错误：{str(e)}")
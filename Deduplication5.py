@@ -1,91 +1,192 @@
+import os
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from itertools import combinations
 import time
 
-def deduplicate_excel_optimized(file_path, sheet_name, columns, sum_field='rate', max_two_duplicate_rows=2, max_value_frequency=3):
+from perfTrace import PerfTrace
+from tableIO import read_table, write_table
+from dedupIndex import (KeyPacker, make_counter_store, run_components,
+                        frame_digest, load_checkpoint, resume_row, save_checkpoint)
+
+def state_values(state):
+    """检查点计数状态中出现过的全部值（编码新输入时需一并纳入，保证旧状态可以重新编码）"""
+    values = set(state.get("value_counts", ()))
+    for combo in state.get("complete", ()):
+        values.update(combo)
+    for combo in state.get("pairs", ()):
+        values.update(combo)
+    return values
+
+def greedy_keep_mask(code_rows, packer, max_two_duplicate_rows=2, max_value_frequency=3, overlap_k=2,
+                     memory_budget_mb=None, spill_dir=None, state=None):
     """
-    Excel数据去重函数：
-    1. ID1和(heroID2、heroID3)值完全相同的行不计入(位置可互换)
-    2. ID1和(heroID2、heroID3)值有两个相同的组合不再计入(位置可互换)
-    3. 单个值在三列中出现超过限制次数后不再计入
+    按行顺序的贪心去重，code_rows 为每行排序后的值编码，返回保留掩码。
+    只依赖与当前行有共同值的先前行，因此可按连通分量拆开并行执行（见 dedupIndex.run_components）。
+    state 为字典时先载入其中的计数（按原值保存：complete / pairs / value_counts，空字典表示从头开始），
+    处理完后把更新后的计数写回 state，供增量检查点使用。
+    """
+    keep = np.zeros(len(code_rows), dtype=bool)
+    # 整数键计数表（可按内存预算落盘）
+    complete_matches = make_counter_store(memory_budget_mb, spill_dir, share=0.25)  # 存储完全匹配的组合
+    two_value_matches = make_counter_store(memory_budget_mb, spill_dir, share=0.75)  # 存储 overlap_k 值匹配的组合
+    value_counts = np.zeros(len(packer.values), dtype=np.int64)  # 存储单值计数（按编码）
+    try:
+        if state:
+            # 原值元组已排序，编码按名次分配，encode 后仍是排序的编码元组
+            for combo in state["complete"]:
+                complete_matches.set(packer.pack(packer.encode(combo)), 1)
+            for combo, count in state["pairs"].items():
+                two_value_matches.set(packer.pack(packer.encode(combo)), count)
+            for value, count in state["value_counts"].items():
+                value_counts[packer.codes[value]] = count
+        for pos, codes in enumerate(code_rows.tolist()):
+            current_values = packer.decode(codes)
+            
+            # === 阶段1: 完全相同值检测 ===
+            if packer.pack(codes) in complete_matches:
+                print(f"跳过完全相同值行: {current_values}")
+                continue
+            
+            # === 阶段2: 多值相同检测（codes 已排序，组合即为规范的有序元组） ===
+            skip_row = False
+            for pair in combinations(codes, overlap_k):
+                pair_key = packer.pack(pair)
+                seen = two_value_matches.get(pair_key)
+                two_value_matches.set(pair_key, seen + 1)
+                # 首次出现的组合只计数、不判断上限（与原字典写法一致）
+                if seen and seen + 1 > max_two_duplicate_rows:
+                    print(f"跳过两值重复超限行: {current_values}")
+                    skip_row = True
+                    break
+            if skip_row:
+                continue
+                
+            # === 阶段3: 单个值频次检测 ===
+            skip_row = False
+            for code in codes:
+                if value_counts[code] >= max_value_frequency:
+                    print(f"跳过超频值行: {current_values}, 超频值: {packer.values[code]}")
+                    skip_row = True
+                    break
+            if skip_row:
+                continue
+                
+            # 更新记录
+            complete_matches.set(packer.pack(codes), 1)
+            for code in codes:
+                value_counts[code] += 1
+            keep[pos] = True
+        if state is not None:
+            width = code_rows.shape[1]
+            state["complete"] = [tuple(packer.decode(packer.unpack(key, width))) for key, _ in complete_matches.items()]
+            state["pairs"] = {tuple(packer.decode(packer.unpack(key, overlap_k))): count
+                              for key, count in two_value_matches.items()}
+            state["value_counts"] = {packer.values[c]: int(value_counts[c]) for c in np.flatnonzero(value_counts)}
+    finally:
+        complete_matches.close()
+        two_value_matches.close()
+    return keep
+
+def deduplicate_excel_optimized(file_path, sheet_name, columns, sum_field='rate', max_two_duplicate_rows=2, max_value_frequency=3,
+                                overlap_k=2, memory_budget_mb=None, spill_dir=None, workers=None, perf=None,
+                                checkpoint=None, return_indices=False):
+    """
+    Excel数据去重函数（columns 可为任意多列，如 3/4/5 人阵容）：
+    1. columns 中的值完全相同的行不计入(位置可互换)
+    2. 任意 overlap_k 个值的组合出现超过 max_two_duplicate_rows 次后不再计入(位置可互换)
+    3. 单个值在这些列中出现超过限制次数后不再计入
+    组合计数按排序后的 overlap_k 元组哈希，每行 C(n, k) 次查找。
+    值先按排序名次编码为整数，组合打包成整数键；指定 memory_budget_mb 时计数超出预算的部分
+    落到 spill_dir（默认系统临时目录）下的 SQLite 文件，结果与纯内存计算完全相同。
+    没有共同值的行互不影响：输入按值的连通分量拆分后在 workers 个进程中并行去重（默认 CPU 数，1 为不并行）。
+    perf 为 PerfTrace 时各阶段计入其中由调用方输出；为空时按环境变量 PERF_TRACE 记录并在返回前输出。
+    checkpoint 为检查点文件路径：运行结束时保存计数状态、各组合的 sum_field 累计值与已保留行；
+    下次运行时若输入只是在末尾追加了新行（已处理的行内容不变、参数相同），只处理新增的行，
+    结果与整体重新计算相同。带检查点时在本进程内顺序处理（计数状态需要连续传递）。
+    返回保留的行（sum_field 替换为同组合的累计值）；return_indices 为 True 时只返回保留行在数据区的行号数组，
+    由调用方自行取行、关联。
+    file_path 可以是 Excel（表头在第二行），也可以是 tableIO 转换出的 Parquet/Feather/CSV（表头在第一行）。
     """
     print(f"开始处理数据：{datetime.now().strftime('%H:%M:%S')}")
     start_time = time.time()
+    own_perf = perf is None
+    if own_perf:
+        perf = PerfTrace.from_env("Deduplication5")
     
     # 读取数据
-    print("读取Excel文件...")
-    df = pd.read_excel(file_path, sheet_name=sheet_name, header=1)
+    print("读取数据文件...")
+    with perf.stage("read"):
+        # 只要行号时只读取去重列与累加列（Parquet/Feather 只解码这些列）
+        df = read_table(file_path, sheet_name=sheet_name, header=1,
+                        columns=list(dict.fromkeys(list(columns) + [sum_field])) if return_indices else None)
     original_count = len(df)
+
+    # 检查点：参数一致且历史行未变时，只处理检查点之后追加的行
+    params = {"tool": "Deduplication5", "sheet_name": sheet_name, "columns": list(columns), "sum_field": sum_field,
+              "max_two_duplicate_rows": max_two_duplicate_rows, "max_value_frequency": max_value_frequency,
+              "overlap_k": overlap_k}
+    state, start_row = None, 0
+    if checkpoint:
+        with perf.stage("checkpoint_load"):
+            state = load_checkpoint(checkpoint, params)
+            start_row = resume_row(state, df)
+            if not start_row:
+                state = None
+            digest = frame_digest(df)
+        if state:
+            print(f"从检查点继续：已处理 {start_row} 行，本次新增 {original_count - start_row} 行")
+            df = df.iloc[start_row:].copy()
     
-    # 预计算字段累加值
+    # 预计算字段累加值（带检查点时在已有累计值上加上新增行）
     print(f"计算{sum_field}累加值...")
-    rate_sums = {}
-    df['ids_set'] = df[columns].apply(lambda x: frozenset(x), axis=1)
-    for _, group in df.groupby('ids_set'):
-        rate_sums[group.iloc[0]['ids_set']] = group[sum_field].sum()
+    rate_sums = dict(state["sums"]) if state else {}
+    with perf.stage("aggregate"):
+        df['ids_set'] = [frozenset(r) for r in df[columns].itertuples(index=False)]
+        for key, total in df.groupby('ids_set', sort=False)[sum_field].sum().items():
+            rate_sums[key] = rate_sums[key] + total if key in rate_sums else total
     
     # 准备数据结构
-    result_rows = []
-    processed_rows = []
-    
-    # 使用字典优化存储和查找
-    complete_matches = {}  # 存储完全匹配的组合
-    two_value_matches = {}  # 存储两值匹配的组合
-    value_counts = {}  # 存储单值计数
+    greedy_state = state["greedy"] if state else {}
     
+    # 值 -> 按排序名次的整数编码；每行编码排序后与原来对值排序的顺序一致
+    with perf.stage("encode"):
+        packer = KeyPacker(df[columns].to_numpy().ravel().tolist() + list(state_values(greedy_state)))
+        code_rows = np.sort(np.array([packer.encode(r) for r in df[columns].itertuples(index=False)],
+                                     dtype=np.int64).reshape(len(df), len(columns)), axis=1)
+
     print("开始主要处理流程...")
-    for idx, current_row in df.iterrows():
-        current_values = tuple(sorted([current_row[col] for col in columns]))
-        
-        # === 阶段1: 完全相同值检测 ===
-        if current_values in complete_matches:
-            print(f"跳过完全相同值行: {list(current_values)}")
-            continue
-        
-        # === 阶段2: 两值相同检测 ===
-        skip_row = False
-        for i in range(len(current_values)):
-            for j in range(i + 1, len(current_values)):
-                pair = tuple(sorted([current_values[i], current_values[j]]))
-                if pair in two_value_matches:
-                    two_value_matches[pair] += 1
-                    if two_value_matches[pair] > max_two_duplicate_rows:
-                        print(f"跳过两值重复超限行: {list(current_values)}")
-                        skip_row = True
-                        break
-                else:
-                    two_value_matches[pair] = 1
-            if skip_row:
-                break
-        if skip_row:
-            continue
-            
-        # === 阶段3: 单个值频次检测 ===
-        skip_row = False
-        for val in current_values:
-            if value_counts.get(val, 0) >= max_value_frequency:
-                print(f"跳过超频值行: {list(current_values)}, 超频值: {val}")
-                skip_row = True
-                break
-        if skip_row:
-            continue
-            
-        # 更新记录
-        complete_matches[current_values] = True
-        for val in current_values:
-            value_counts[val] = value_counts.get(val, 0) + 1
-            
-        # 保存结果
-        new_row = current_row.copy()
-        new_row[sum_field] = rate_sums[current_row['ids_set']]
-        result_rows.append(new_row)
-    
-    # 创建结果DataFrame
-    result = pd.DataFrame(result_rows)
-    
-    # 清理临时列
-    if 'ids_set' in result.columns:
-        result.drop(['ids_set'], axis=1, inplace=True)
+    worker_count = workers or os.cpu_count() or 1
+    with perf.stage("select"):
+        if checkpoint:
+            keep = greedy_keep_mask(code_rows, packer, max_two_duplicate_rows=max_two_duplicate_rows,
+                                    max_value_frequency=max_value_frequency, overlap_k=overlap_k,
+                                    memory_budget_mb=memory_budget_mb, spill_dir=spill_dir, state=greedy_state)
+        else:
+            keep = run_components(greedy_keep_mask, code_rows, workers=worker_count, packer=packer,
+                                  max_two_duplicate_rows=max_two_duplicate_rows, max_value_frequency=max_value_frequency,
+                                  overlap_k=overlap_k, spill_dir=spill_dir,
+                                  # 各工作进程分摊内存预算
+                                  memory_budget_mb=None if memory_budget_mb is None else memory_budget_mb / worker_count)
+    # 检查点之前保留的行排在新保留的行之前，与整体计算的顺序一致
+    kept = df.take(np.flatnonzero(keep))
+    if state:
+        kept = pd.concat([state["kept_rows"], kept])
+
+    if checkpoint:
+        with perf.stage("checkpoint_save"):
+            save_checkpoint(checkpoint, {"params": params, "rows_done": original_count, "digest": digest,
+                                         "sums": rate_sums, "greedy": greedy_state, "kept_rows": kept})
+
+    # 保存结果（一次取行 + 按组合映射累计值）
+    with perf.stage("materialize"):
+        if return_indices:
+            # 行号即 read_excel 的默认行标签（数据区从 0 开始）
+            result = kept.index.to_numpy()
+        else:
+            result = kept.drop(columns='ids_set')
+            result[sum_field] = kept['ids_set'].map(rate_sums)
     
     # 打印处理结果
     end_time = time.time()
@@ -96,18 +197,26 @@ def deduplicate_excel_optimized(file_path, sheet_name, columns, sum_field='rate'
     print(f"原始数据行数：{original_count}")
     print(f"处理后行数：{len(result)}")
     print(f"去重率：{((original_count - len(result)) / original_count * 100):.2f}%")
+    perf.note(file=file_path, rows_in=original_count, rows_new=original_count - start_row, rows_out=len(result))
+    if own_perf:
+        perf.emit()
     
     return result
 
 # 执行入口
 if __name__ == "__main__":
     # === 可配置参数 ===
-    file_path = "e:/CODE/dataAnalysis/TEST/test.xlsx"
+    file_path = "e:/CODE/dataAnalysis/TEST/test.xlsx"  # 也可以是 tableIO.py 转换出的 .parquet / .feather
     sheet_name = "Sheet2"
     columns = ["ID1", "heroID2", "heroID3"]
     sum_field = "场次"  # 需要累加的字段名，可以更换为其他字段
     max_two_duplicate_rows = 3  # 可设置保留两列重复的最大数量
     max_value_frequency = 3     # 可设置单个值出现的最大次数
+    memory_budget_mb = None     # 计数状态的内存预算(MB)，超出部分落盘；None 表示全部放在内存
+    checkpoint = None           # 检查点文件路径（如 "e:/CODE/dataAnalysis/TEST/test.dedup5.ckpt"），数据只追加时下次只处理新增行
+
+    # 性能记录：--perf[=memory,profile] / --perf-out 文件，或环境变量 PERF_TRACE
+    perf, _ = PerfTrace.from_argv("Deduplication5")
 
     try:
         # 执行去重处理
@@ -117,12 +226,17 @@ if __name__ == "__main__":
             columns=columns,
             sum_field=sum_field,  # 添加累加字段参数
             max_two_duplicate_rows=max_two_duplicate_rows,
-            max_value_frequency=max_value_frequency
+            max_value_frequency=max_value_frequency,
+            memory_budget_mb=memory_budget_mb,
+            perf=perf,
+            checkpoint=checkpoint
         )
 
         # 保存结果
-        result_df.to_excel("e:/CODE/dataAnalysis/TEST/deduplicated_result.xlsx", index=False)
+        with perf.stage("write"):
+            write_table(result_df, "e:/CODE/dataAnalysis/TEST/deduplicated_result.xlsx")
         print(f"\n结果已保存至：deduplicated_result.xlsx")
+        perf.emit()
         
     except Exception as e:
         print(f"处理过程中出现错误：{str(e)}")
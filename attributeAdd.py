@@ -1,14 +1,92 @@
+from __future__ import annotations
+
+import time
+_STARTUP_T0 = time.perf_counter()
+
 import os
 import sys
+import json
+import random
+import threading
 import site
-from typing import Optional, Union, Dict
-import pandas as pd
+from typing import Optional, Union, Dict, List, Callable
+import numpy as np
+
+# Qt 平台插件目录的缓存文件（按用户），键为 解释器前缀|PyQt5 版本|插件名前缀
+QT_PLUGIN_CACHE = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "attributeAdd", "qt_plugins.json")
+
+def _platform_plugin_prefix() -> str:
+    """当前平台需要的 platforms 插件文件名前缀"""
+    if sys.platform.startswith("win"):
+        return "qwindows"
+    if sys.platform == "darwin":
+        return "qcocoa"
+    # Linux 等：按 QT_QPA_PLATFORM 指定的平台（如 offscreen），默认 xcb
+    platform = os.environ.get("QT_QPA_PLATFORM", "xcb").split(":")[0].strip() or "xcb"
+    return f"q{platform.lower()}"
+
+def _is_plugin_file(name: str, prefix: str) -> bool:
+    # Linux/macOS 下插件文件带 lib 前缀，如 libqxcb.so
+    name = name.lower()
+    return name.startswith(prefix) or name.startswith("lib" + prefix)
+
+def _has_plugin(path: str, prefix: str) -> bool:
+    try:
+        return any(_is_plugin_file(f, prefix) for f in os.listdir(path))
+    except OSError:
+        return False
+
+def _qt_plugin_cache_key(prefix: str) -> str:
+    try:
+        from PyQt5.QtCore import PYQT_VERSION_STR
+    except Exception:
+        PYQT_VERSION_STR = "?"
+    return f"{sys.prefix}|{PYQT_VERSION_STR}|{prefix}"
+
+def _read_qt_plugin_cache() -> Dict[str, str]:
+    try:
+        with open(QT_PLUGIN_CACHE, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _write_qt_plugin_cache(key: str, path: str):
+    data = _read_qt_plugin_cache()
+    data[key] = path
+    try:
+        os.makedirs(os.path.dirname(QT_PLUGIN_CACHE), exist_ok=True)
+        with open(QT_PLUGIN_CACHE, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+    except OSError:
+        pass  # 缓存写不进去不影响使用，下次启动重新查找
+
+def _set_qt_plugin_path(path: str) -> str:
+    os.environ["QT_QPA_PLATFORM_PLUGIN_PATH"] = path
+    return path
 
 def find_and_set_qt_plugins():
+    """
+    查找 Qt platforms 插件目录并设置 QT_QPA_PLATFORM_PLUGIN_PATH。
+    先查每用户缓存（只确认缓存目录仍存在且含插件），未命中才检查候选目录并递归扫描 site-packages，
+    找到后写回缓存。已手动设置的 QT_QPA_PLATFORM_PLUGIN_PATH 直接使用。
+    """
+    prefix = _platform_plugin_prefix()
+    preset = os.environ.get("QT_QPA_PLATFORM_PLUGIN_PATH")
+    if preset and _has_plugin(preset, prefix):
+        return preset
+    key = _qt_plugin_cache_key(prefix)
+    cached = _read_qt_plugin_cache().get(key)
+    if cached and _has_plugin(cached, prefix):
+        return _set_qt_plugin_path(cached)
+
     candidates = []
     # PyQt5 模块自带位置
     try:
         import PyQt5
+        candidates.append(os.path.join(os.path.dirname(PyQt5.__file__), "Qt5", "plugins", "platforms"))
         candidates.append(os.path.join(os.path.dirname(PyQt5.__file__), "Qt", "plugins", "platforms"))
     except Exception:
         pass
@@ -22,6 +100,7 @@ def find_and_set_qt_plugins():
     # sys.prefix / conda 常见位置
     candidates.append(os.path.join(sys.prefix, "Lib", "site-packages", "PyQt5", "Qt", "plugins", "platforms"))
     candidates.append(os.path.join(sys.prefix, "Library", "plugins", "platforms"))
+    candidates.append(os.path.join(sys.prefix, "plugins", "platforms"))
     if os.environ.get("CONDA_PREFIX"):
         cp = os.environ["CONDA_PREFIX"]
         candidates.append(os.path.join(cp, "Library", "plugins", "platforms"))
@@ -29,469 +108,203 @@ def find_and_set_qt_plugins():
 
     # 检查候选目录
     for c in candidates:
-        if c and os.path.isdir(c):
-            for f in os.listdir(c):
-                if f.lower().startswith("qwindows"):
-                    os.environ["QT_QPA_PLATFORM_PLUGIN_PATH"] = c
-                    print("已设置 QT_QPA_PLATFORM_PLUGIN_PATH =", c)
-                    return c
-
-    # 回退：在 site-packages 目录中递归查找 qwindows*
+        if c and _has_plugin(c, prefix):
+            print("已设置 QT_QPA_PLATFORM_PLUGIN_PATH =", c)
+            _write_qt_plugin_cache(key, c)
+            return _set_qt_plugin_path(c)
+
+    # 回退：在 site-packages 目录中递归查找插件（较慢，结果写入缓存后下次不再扫描）
     roots = set(site.getsitepackages() if hasattr(site, "getsitepackages") else [sys.prefix])
     for root in roots:
         for dirpath, dirnames, filenames in os.walk(root):
-            for f in filenames:
-                if f.lower().startswith("qwindows"):
-                    os.environ["QT_QPA_PLATFORM_PLUGIN_PATH"] = dirpath
-                    print("在路径中找到 qwindows 插件，已设置 QT_QPA_PLATFORM_PLUGIN_PATH =", dirpath)
-                    return dirpath
+            if os.path.basename(dirpath) != "platforms":
+                continue
+            if any(_is_plugin_file(f, prefix) for f in filenames):
+                print(f"在路径中找到 {prefix} 插件，已设置 QT_QPA_PLATFORM_PLUGIN_PATH =", dirpath)
+                _write_qt_plugin_cache(key, dirpath)
+                return _set_qt_plugin_path(dirpath)
 
-    print("未找到 Qt platforms/qwindows 插件目录。请重装 PyQt5 或手动设置 QT_QPA_PLATFORM_PLUGIN_PATH。")
+    print(f"未找到 Qt platforms/{prefix} 插件目录。请重装 PyQt5 或手动设置 QT_QPA_PLATFORM_PLUGIN_PATH。")
     return None
 
-_find = find_and_set_qt_plugins()
 
-from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, QThread, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QFileDialog, QLineEdit, QLabel, QTableView, QMessageBox, QFormLayout,
-    QCheckBox, QDialog, QDialogButtonBox, QSpinBox
+    QCheckBox, QDialog, QDialogButtonBox, QSpinBox, QProgressBar, QTabWidget, QComboBox, QShortcut
 )
-from PyQt5.QtGui import QColor, QBrush
-
-# ---------------- CONFIG: 在这里修改要操作的字段与映射 ----------------
-# 逻辑名称（界面显示使用）
-ATTRS = ["武力", "智力", "政治", "魅力", "防御", "速度"]
-
-# 映射到 Excel 表头（header=1 时使用第二行作为列名）。
-# 每个键为逻辑名，value/init/growth 指向 Excel 中实际列名。
-ATTR_COL_MAP = {
-    "武力": {"value": "武力", "init": "武力初始", "growth": "武力成长"},
-    "智力": {"value": "智力", "init": "智力初始", "growth": "智力成长"},
-    "政治": {"value": "政治", "init": "政治初始", "growth": "政治成长"},
-    "魅力": {"value": "魅力", "init": "魅力初始", "growth": "魅力成长"},
-    "防御": {"value": "防御", "init": "防御初始", "growth": "防御成长"},
-    "速度": {"value": "速度", "init": "速度初始", "growth": "速度成长"},
-}
-
-# 全局后备后缀（如果 ATTR_COL_MAP 未提供某项，则使用后缀策略）
-INIT_SUFFIX = "初始"
-GROWTH_SUFFIX = "成长"
-DEFAULT_ADD_VALUE = 50
-GROWTH_MULT = 49
-# -------------------------------------------------------------------
-
-class ExcelHandler:
-    def __init__(self):
-        self.df: Optional[pd.DataFrame] = None
-        self.path: Optional[str] = None
-        self.sheet_name: str = "hero"
-
-    def _col_names_for(self, attr: str):
-        m = ATTR_COL_MAP.get(attr, {})
-        value_col = m.get("value", attr)
-        init_col = m.get("init", f"{attr}{INIT_SUFFIX}")
-        growth_col = m.get("growth", f"{attr}{GROWTH_SUFFIX}")
-        return value_col, init_col, growth_col
-
-    def load(self, path: str, sheet_name: str = "hero") -> pd.DataFrame:
-        self.path = path
-        self.sheet_name = sheet_name
-        try:
-            df = pd.read_excel(path, sheet_name=sheet_name, header=1, engine="openpyxl")
-        except Exception as e:
-            raise RuntimeError(f"读取 Excel 失败: {e}")
-        self.df = df.copy()
-        self._ensure_required_columns()
-        self._compute_base_and_add()
-        return self.df
-
-    def _ensure_required_columns(self):
-        if self.df is None:
-            raise RuntimeError("数据未加载")
-        needed = ["ID", "name"]
-        for a in ATTRS:
-            v, init, grow = self._col_names_for(a)
-            needed += [v, init, grow]
-        needed = list(dict.fromkeys(needed))
-        missing = [c for c in needed if c not in self.df.columns]
-        if missing:
-            raise RuntimeError(f"缺少必要列: {missing}\n请在文件顶部的 ATTR_COL_MAP 中为对应属性指定实际列名（区分大小写）。")
-
-    def _compute_base_and_add(self):
-        if self.df is None:
-            return
-        df = self.df
-        for a in ATTRS:
-            value_col, init_col, growth_col = self._col_names_for(a)
-            base_col = f"base_{a}"
-            add_col = f"add_{a}"
-            # 安全读取列，缺失时填 0
-            init_series = df[init_col].fillna(0).astype(float) if init_col in df.columns else 0.0
-            growth_series = df[growth_col].fillna(0).astype(float) if growth_col in df.columns else 0.0
-            value_series = df[value_col].fillna(0).astype(float) if value_col in df.columns else 0.0
-            df[base_col] = init_series + growth_series * GROWTH_MULT
-            # 先保留文件已有 add_ 列（若存在），否则用 value-base 计算；最终强制为 int
-            if add_col in df.columns:
-                df[add_col] = pd.to_numeric(df[add_col], errors="coerce").fillna(0).round(0).astype(int)
-            else:
-                add_series = (value_series - df[base_col]).round(0).fillna(0).astype(int)
-                df[add_col] = add_series
-
-        # 计算加点和（整数）
-        add_cols = [f"add_{a}" for a in ATTRS if f"add_{a}" in df.columns]
-        if add_cols:
-            df["add_sum"] = df[add_cols].sum(axis=1).fillna(0).astype(int)
-        else:
-            df["add_sum"] = 0
-
-        # 默认目标判断（保持原逻辑）
-        base_group = [f"base_{x}" for x in ["武力", "智力", "防御", "速度"] if f"base_{x}" in df.columns]
-        if base_group:
-            df["_default_target"] = df[base_group].idxmax(axis=1)
-            df["_default_target_attr"] = df["_default_target"].str.replace(r"^base_", "", regex=True)
-        else:
-            df["_default_target"] = None
-            df["_default_target_attr"] = None
-
-        def is_default(row):
-            target = row.get("_default_target_attr")
-            for a in ATTRS:
-                expected = int(DEFAULT_ADD_VALUE) if a == target else 0
-                if int(round(float(row.get(f"add_{a}", 0)))) != expected:
-                    return False
-            return True
-        df["is_default_add"] = df.apply(is_default, axis=1)
-        self.df = df
-
-    def get_hero(self, key: Union[int, str]) -> Optional[pd.Series]:
-        if self.df is None:
-            return None
-        mask_id = self.df["ID"].astype(str) == str(key)
-        if mask_id.any():
-            return self.df[mask_id].iloc[0]
-        mask_name = self.df["name"].astype(str).str.contains(str(key), na=False)
-        if mask_name.any():
-            return self.df[mask_name].iloc[0]
-        return None
-
-    def search(self, term: str) -> pd.DataFrame:
-        if self.df is None:
-            return pd.DataFrame()
-        t = str(term)
-        mask = self.df["name"].astype(str).str.contains(t, na=False) | (self.df["ID"].astype(str) == t)
-        return self.df[mask].copy()
-
-    def update_add_points(self, id_or_name: Union[int, str], new_adds: Dict[str, float]):
-        if self.df is None:
-            raise RuntimeError("数据未加载")
-        idx = None
-        mask_id = self.df["ID"].astype(str) == str(id_or_name)
-        if mask_id.any():
-            idx = self.df[mask_id].index[0]
-        else:
-            mask_name = self.df["name"].astype(str).str.contains(str(id_or_name), na=False)
-            if mask_name.any():
-                idx = self.df[mask_name].index[0]
-        if idx is None:
-            raise KeyError("未找到指定英雄")
-        for a, v in new_adds.items():
-            if a not in ATTRS:
-                continue
-            add_int = int(round(v))
-            # 只把 add_* 存为整数
-            self.df.at[idx, f"add_{a}"] = add_int
-            value_col, init_col, growth_col = self._col_names_for(a)
-            if f"base_{a}" not in self.df.columns:
-                init_val = float(self.df.at[idx, init_col]) if init_col in self.df.columns else 0.0
-                growth_val = float(self.df.at[idx, growth_col]) if growth_col in self.df.columns else 0.0
-                self.df.at[idx, f"base_{a}"] = init_val + growth_val * GROWTH_MULT
-            try:
-                base_val = float(self.df.at[idx, f"base_{a}"])
-            except Exception:
-                base_val = 0.0
-            # 保持 value 为 base（浮点） + add_int（整数），不要强制转为 int
-            try:
-                self.df.at[idx, value_col] = float(base_val) + float(add_int)
-            except Exception:
-                self.df.at[idx, value_col] = base_val + add_int
-        self._compute_base_and_add()
-
-    def save(self, out_path: str):
-        if self.df is None:
-            raise RuntimeError("数据未加载")
-        # 若没有原始文件路径，退回 pandas 全表保存（写入第二行作为 header）
-        if not self.path:
-            try:
-                self.df.to_excel(out_path, index=False, engine="openpyxl")
-            except Exception as e:
-                raise RuntimeError(f"保存 Excel 失败: {e}")
-            return
-        try:
-            from openpyxl import load_workbook
-        except Exception:
-            try:
-                self.df.to_excel(out_path, index=False, engine="openpyxl")
-            except Exception as e2:
-                raise RuntimeError(f"保存 Excel 失败（openpyxl 未安装且 pandas 导出失败）: {e2}")
-            return
-
-        wb = load_workbook(self.path)
-        sheet_name = self.sheet_name if self.sheet_name in wb.sheetnames else wb.sheetnames[0]
-        ws = wb[sheet_name]
-        header_row = 2  # header=1 对应工作表第2行
-
-        # 建立表头名 -> 列字母 映射（采用工作表现有表头，strip 处理）
-        header_map = {}
-        for cell in ws[header_row]:
-            if cell.value is None:
-                continue
-            header_map[str(cell.value).strip()] = cell.column_letter
-
-        # 定位 ID 列字母
-        id_col_letter = header_map.get("ID")
-        if not id_col_letter:
-            for k in header_map:
-                if str(k).strip().lower() == "id":
-                    id_col_letter = header_map[k]
-                    break
-        if not id_col_letter:
-            raise RuntimeError("工作表中未找到 ID 列，无法定位行以进行部分更新。")
-
-        # 构建 excel id -> 行号 映射
-        excel_id_map = {}
-        for r in range(header_row + 1, ws.max_row + 1):
-            cell = ws[f"{id_col_letter}{r}"]
-            val = cell.value
-            if val is None:
-                continue
-            excel_id_map[str(val)] = r
-
-        # 对于每一行（按 df），若能定位到工作表行，就把工作表中存在的 header 列全部更新为 df 对应值
-        for idx, row in self.df.iterrows():
-            id_val = row.get("ID")
-            if id_val is None:
-                continue
-            excel_row = excel_id_map.get(str(id_val))
-            if excel_row is None:
-                # 如果 ID 行在原表找不到，跳过（避免新增乱位）
-                continue
-            for hname, col_letter in header_map.items():
-                # 仅当 df 中存在该列才写回（这样不会破坏工作表中额外的列）
-                if hname not in self.df.columns:
-                    continue
-                excel_cell = ws[f"{col_letter}{excel_row}"]
-                df_val = row.get(hname)
-                try:
-                    if pd.isna(df_val):
-                        excel_cell.value = None
-                    else:
-                        if isinstance(df_val, int):
-                            excel_cell.value = int(df_val)
-                        elif isinstance(df_val, float):
-                            excel_cell.value = float(df_val)
-                        else:
-                            excel_cell.value = df_val
-                except Exception:
-                    excel_cell.value = df_val
-
-        try:
-            wb.save(out_path)
-        except Exception as e:
-            raise RuntimeError(f"保存 Excel 失败: {e}")
-
-    def export_full_red(self, out_path: str):
-        if self.df is None:
-            raise RuntimeError("数据未加载")
-        if not self.path:
-            raise RuntimeError("需要原始文件路径才能做部分插入保存")
-
-        try:
-            from openpyxl import load_workbook
-        except Exception:
-            raise RuntimeError("export_full_red 需要 openpyxl，可通过 pip install openpyxl 安装")
-
-        wb = load_workbook(self.path)
-        sheet_name = self.sheet_name if self.sheet_name in wb.sheetnames else wb.sheetnames[0]
-        ws = wb[sheet_name]
-        header_row = 2
-
-        # 读取表头顺序与列字母映射
-        headers_in_order = []
-        header_map = {}
-        for cell in ws[header_row]:
-            name = None if cell.value is None else str(cell.value).strip()
-            headers_in_order.append(name)
-            if name is not None:
-                header_map[name] = cell.column_letter
-
-        # 定位 ID 列字母
-        id_col_letter = header_map.get("ID")
-        if not id_col_letter:
-            for k in header_map:
-                if k and str(k).strip().lower() == "id":
-                    id_col_letter = header_map[k]
-                    break
-        if not id_col_letter:
-            raise RuntimeError("未找到 ID 列，无法执行满红导出")
-
-        # 缓存 worksheet 中每行原始单元格值（按 ID -> row index）
-        excel_id_to_row = {}
-        for r in range(header_row + 1, ws.max_row + 1):
-            cell = ws[f"{id_col_letter}{r}"]
-            if cell.value is None:
-                continue
-            excel_id_to_row[str(cell.value)] = r
+from PyQt5.QtGui import QColor, QBrush, QKeySequence
+
+# 数据处理部分不依赖 Qt，在 attributeHandler.py 中；这里重新导出，保持 attributeAdd.ExcelHandler 等原有引用可用
+from attributeHandler import (  # noqa: F401
+    ATTRS, ATTR_COL_MAP, INIT_SUFFIX, GROWTH_SUFFIX, DEFAULT_ADD_VALUE, GROWTH_MULT,
+    ProgressCallback, OperationCancelled, WorkbookSession, WorkbookCache, WORKBOOK_CACHE, WORKBOOK_CACHE_SIZE,
+    DEFAULT_TARGET_ATTRS, DERIVED_COLUMNS, BULK_RULES, HeroAttrStore, EditJournal, ExcelHandler,
+    _ensure_data_modules, PERF,
+)
+from perfTrace import PERF_ENV, PERF_OUT_ENV, split_perf_args
 
-        # ATTR 对应列预计算
-        attr_cols = {a: self._col_names_for(a) for a in ATTRS}
+# ---------------- Qt Model & Dialog ----------------
+# 行集合变化拆成的连续区间超过该数时整体重置模型（逐段增删的信号开销更大）
+MODEL_RESET_RUNS = 100
 
-        # 准备要追加的行数据（按原 df 顺序）
-        rows_to_append = []
-        for idx, df_row in self.df.iterrows():
-            orig_id = df_row.get("ID")
-            if orig_id is None:
-                continue
-            try:
-                if isinstance(orig_id, (int, float)):
-                    orig_id_str = str(int(float(orig_id)))
-                elif isinstance(orig_id, str) and orig_id.strip().isdigit():
-                    orig_id_str = str(int(orig_id.strip()))
-                else:
-                    orig_id_str = str(orig_id)
-            except Exception:
-                orig_id_str = str(orig_id)
-            new_id = None
-            if len(orig_id_str) == 3:
-                new_id = "50" + orig_id_str
-            elif len(orig_id_str) == 2:
-                new_id = "500" + orig_id_str
-            else:
-                continue  # 非 2/3 位跳过
-
-            # 尽量读取工作表中该行的原始单元格值（保留浮点格式）
-            excel_row = excel_id_to_row.get(orig_id_str)
-            orig_values = {}
-            if excel_row:
-                for hname, col_letter in header_map.items():
-                    orig_values[hname] = ws[f"{col_letter}{excel_row}"].value
-
-            # 构建新行字典（header名 -> 值）
-            new_row_vals = {}
-            for hname in headers_in_order:
-                if hname is None:
-                    continue
-                # ID 列
-                if hname == "ID":
-                    new_row_vals[hname] = new_id
-                    continue
-                # name 列
-                if hname == "name":
-                    orig_name = orig_values.get("name") if orig_values.get("name") is not None else df_row.get("name", "")
-                    new_row_vals[hname] = f"{orig_name}(满红)"
-                    continue
-
-                # add_* 列：翻倍并以整数写入（若表中存在该列）
-                is_add_col = False
-                for a in ATTRS:
-                    add_col_name = f"add_{a}"
-                    if hname == add_col_name:
-                        old_add = df_row.get(add_col_name, 0)
-                        try:
-                            old_add_f = float(old_add)
-                        except Exception:
-                            old_add_f = 0.0
-                        new_add = int(round(old_add_f * 2))
-                        new_row_vals[hname] = new_add
-                        is_add_col = True
-                        break
-                if is_add_col:
-                    continue
-
-                # value 列：写为 base + new_add，保留浮点（不强制为整数）
-                handled = False
-                for a in ATTRS:
-                    value_col, init_col, growth_col = attr_cols[a]
-                    if hname == value_col:
-                        # 计算 base（优先使用 df 中计算好的 base_*，否则用 init/growth）
-                        base_val = None
-                        if f"base_{a}" in self.df.columns:
-                            base_val = df_row.get(f"base_{a}", None)
-                        if base_val is None:
-                            try:
-                                init_v = float(df_row.get(init_col, 0.0)) if init_col in df_row.index else float(orig_values.get(init_col, 0.0) or 0.0)
-                            except Exception:
-                                init_v = 0.0
-                            try:
-                                growth_v = float(df_row.get(growth_col, 0.0)) if growth_col in df_row.index else float(orig_values.get(growth_col, 0.0) or 0.0)
-                            except Exception:
-                                growth_v = 0.0
-                            base_val = init_v + growth_v * GROWTH_MULT
-                        # old add
-                        old_add = df_row.get(f"add_{a}", None)
-                        if old_add is None:
-                            old_add = orig_values.get(f"add_{a}", 0)
-                        try:
-                            old_add_f = float(old_add)
-                        except Exception:
-                            old_add_f = 0.0
-                        new_add = int(round(old_add_f * 2))
-                        # 新的实际值为 base + new_add（保持浮点，不转为 int）
-                        try:
-                            new_value = float(base_val) + float(new_add)
-                        except Exception:
-                            new_value = base_val
-                        new_row_vals[hname] = new_value
-                        handled = True
-                        break
-                if handled:
-                    continue
-
-                # 其它列：优先使用 worksheet 的原始单元格值，其次使用 df 中的值（不改变类型）
-                val = orig_values.get(hname, None)
-                if val is None:
-                    val = df_row.get(hname, None)
-                new_row_vals[hname] = val
-
-            rows_to_append.append(new_row_vals)
-
-        # 将准备好的新行依次追加到表末尾（保持 header 行在第 header_row）
-        append_at = ws.max_row + 1
-        for new_row in rows_to_append:
-            for hname, col_letter in header_map.items():
-                cell_ref = f"{col_letter}{append_at}"
-                val = new_row.get(hname)
-                # add_* 写整数，其它数值保持原类型（float 等）
-                ws[cell_ref].value = val
-            append_at += 1
-
-        # 保存为 out_path
-        try:
-            wb.save(out_path)
-        except Exception as e:
-            raise RuntimeError(f"满红导出保存失败: {e}")
+def _runs(flags: np.ndarray) -> List[tuple]:
+    """布尔数组中连续为 True 的区间 [(起, 止), ...]（闭区间）"""
+    edges = np.diff(np.concatenate(([0], flags.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), (np.flatnonzero(edges == -1) - 1).tolist()))
 
-# ---------------- Qt Model & Dialog ----------------
 class DataFrameModel(QAbstractTableModel):
-    def __init__(self, df: pd.DataFrame, columns: list):
+    """
+    持久表格模型：引用 handler 的列数组（派生列为 HeroAttrStore 中的视图），不做拷贝。
+    _rows 保存当前显示的 df 行位置（numpy 数组）；_rank 为排序名次（rank[行位置] 越小越靠前），
+    为 None 时按 df 行位置升序。筛选变化时按差异 beginInsertRows/beginRemoveRows，
+    排序变化时只重排（保留选中），编辑后只对受影响的行发 dataChanged 或移动该行。
+    """
+    def __init__(self, handler: "ExcelHandler", columns: list, rows=None, rank: Optional[np.ndarray] = None):
         super().__init__()
-        self._df = df
+        self._handler = handler
         self._cols = columns
+        self._arrays = {c: handler.column(c) for c in columns}
+        store = handler.store
+        self._target = store.target
+        self._add_sum = store.add_sum
+        self._rows = np.arange(len(store)) if rows is None else np.asarray(rows, dtype=np.intp)
+        self._rank = rank
 
     def rowCount(self, parent=QModelIndex()):
-        return 0 if self._df is None else len(self._df)
+        return len(self._rows)
 
     def columnCount(self, parent=QModelIndex()):
         return len(self._cols)
 
+    def source_row(self, row: int) -> int:
+        """界面行号 -> handler.df 中的行位置"""
+        return int(self._rows[row])
+
+    def _value(self, pos: int, col: str):
+        return self._arrays[col][pos]
+
+    def _find(self, pos: int) -> tuple:
+        """按当前次序二分查找行位置 pos：返回 (界面行号或应插入的位置, 是否在显示中)"""
+        rows, rank = self._rows, self._rank
+        key = pos if rank is None else rank[pos]
+        lo, hi = 0, len(rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (rows[mid] if rank is None else rank[rows[mid]]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo, lo < len(rows) and rows[lo] == pos
+
+    def _insert_row(self, at: int, pos: int):
+        self.beginInsertRows(QModelIndex(), at, at)
+        self._rows = np.insert(self._rows, at, pos)
+        self.endInsertRows()
+
+    def _remove_row(self, at: int):
+        self.beginRemoveRows(QModelIndex(), at, at)
+        self._rows = np.delete(self._rows, at)
+        self.endRemoveRows()
+
+    def set_rows(self, rows, rank: Optional[np.ndarray] = None):
+        """
+        切换显示行（rows 需按 rank 的次序排列）。次序不变时按差异增删行，保留未变化行；
+        次序改变而行集合不变时只重排；其余情况（或差异过于零碎时）整体重置。
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        n = len(self._handler.store)
+        new_mask = np.zeros(n, dtype=bool)
+        new_mask[rows] = True
+        if rank is not self._rank:
+            if len(rows) == len(self._rows) and new_mask[self._rows].all():
+                self._reorder(rows, rank)
+            else:
+                self._reset(rows, rank)
+            return
+        old_mask = np.zeros(n, dtype=bool)
+        old_mask[self._rows] = True
+        removed = _runs(~new_mask[self._rows])
+        added = _runs(~old_mask[rows])
+        if len(removed) + len(added) > MODEL_RESET_RUNS:
+            self._reset(rows, rank)
+            return
+        # 先删除：从后往前按连续区间删除，避免行号偏移
+        for start, end in reversed(removed):
+            self.beginRemoveRows(QModelIndex(), start, end)
+            self._rows = np.delete(self._rows, np.s_[start:end + 1])
+            self.endRemoveRows()
+        # 再插入：此时 _rows 是 rows 的子序列，按连续区间插入
+        for start, end in added:
+            self.beginInsertRows(QModelIndex(), start, end)
+            self._rows = np.concatenate((self._rows[:start], rows[start:end + 1], self._rows[start:]))
+            self.endInsertRows()
+
+    def _reset(self, rows: np.ndarray, rank: Optional[np.ndarray]):
+        self.beginResetModel()
+        self._rows, self._rank = rows, rank
+        self.endResetModel()
+
+    def _reorder(self, rows: np.ndarray, rank: Optional[np.ndarray]):
+        """行集合不变、只改次序：发 layoutChanged 并把选中/当前单元格映射到新行号"""
+        self.layoutAboutToBeChanged.emit()
+        old = self._rows
+        where = np.empty(len(self._handler.store), dtype=np.intp)
+        where[rows] = np.arange(len(rows))
+        self._rows, self._rank = rows, rank
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(int(where[old[i.row()]]), i.column()) for i in persistent])
+        self.layoutChanged.emit()
+
+    def update_rows(self, visibility: Dict[int, bool], rank: Optional[np.ndarray] = None):
+        """
+        编辑后增量更新：visibility 为 {df 行位置: 是否应显示}，rank 为编辑后的排序名次。
+        可见性与次序都未变的行只发 dataChanged；可见性变化的行单独插入/删除；
+        名次数组变了（按被编辑的列排序）时，受影响的行先按旧次序取出，再按新次序插回，其余行的相对次序不变。
+        """
+        moved = rank is not self._rank
+        for pos in sorted(visibility, reverse=True, key=self._sort_key):
+            at, present = self._find(pos)
+            if present and (moved or not visibility[pos]):
+                self._remove_row(at)
+        self._rank = rank
+        changed = []
+        for pos in sorted(visibility, key=self._sort_key):
+            at, present = self._find(pos)
+            if visibility[pos] and not present:
+                self._insert_row(at, pos)
+            elif present:
+                changed.append(pos)
+        self.rows_changed(changed)
+
+    def _sort_key(self, pos: int):
+        return pos if self._rank is None else self._rank[pos]
+
+    def all_changed(self):
+        """批量修改后对整个可见区域发一次 dataChanged"""
+        if len(self._rows) and self._cols:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._rows) - 1, len(self._cols) - 1))
+
+    def rows_changed(self, positions: List[int]):
+        """对指定 df 行位置中当前可见的行发 dataChanged"""
+        if not positions or not self._cols:
+            return
+        last_col = len(self._cols) - 1
+        for pos in positions:
+            at, present = self._find(pos)
+            if present:
+                self.dataChanged.emit(self.index(at, 0), self.index(at, last_col))
+
     def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid() or self._df is None:
+        if not index.isValid():
             return QVariant()
-        row = index.row()
+        row = self._rows[index.row()]
         col = self._cols[index.column()]
         if role == Qt.DisplayRole:
             try:
-                val = self._df.iloc[row, self._df.columns.get_loc(col)]
+                val = self._value(row, col)
             except Exception:
                 val = ""
             try:
@@ -517,24 +330,12 @@ class DataFrameModel(QAbstractTableModel):
                     return QBrush(QColor(240, 240, 240))
                 # 若是 add_* 列，且该行的默认加点属性与此列匹配，则浅蓝
                 if col.startswith("add_"):
-                    try:
-                        default_attr = None
-                        if "_default_target_attr" in self._df.columns:
-                            default_attr = self._df.iloc[row, self._df.columns.get_loc("_default_target_attr")]
-                        if default_attr and isinstance(default_attr, str):
-                            target_add_col = f"add_{default_attr}"
-                            if col == target_add_col:
-                                return QBrush(QColor(200, 230, 255))  # 浅蓝
-                    except Exception:
-                        pass
-                # 最后：如果加点和存在且不等于默认值，整行标红（浅红）
-                if "add_sum" in self._df.columns:
-                    try:
-                        add_sum_val = int(self._df.iloc[row, self._df.columns.get_loc("add_sum")])
-                        if add_sum_val != int(DEFAULT_ADD_VALUE):
-                            return QBrush(QColor(255, 200, 200))
-                    except Exception:
-                        pass
+                    t = int(self._target[row])
+                    if t >= 0 and col == f"add_{ATTRS[t]}":
+                        return QBrush(QColor(200, 230, 255))  # 浅蓝
+                # 最后：如果加点和不等于默认值，整行标红（浅红）
+                if int(self._add_sum[row]) != int(DEFAULT_ADD_VALUE):
+                    return QBrush(QColor(255, 200, 200))
             except Exception:
                 pass
             return QVariant()
@@ -606,14 +407,417 @@ class SingleAttrEditDialog(QDialog):
         btns.rejected.connect(self.reject)
         layout.addWidget(btns)
 
+class BulkEditDialog(QDialog):
+    """批量加点：选择规则、属性与 N，作用于选中行或当前视图中的全部行"""
+    def __init__(self, has_selection: bool, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("批量加点")
+        self.setModal(True)
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.rule_cb = QComboBox()
+        for rule, label in BULK_RULES.items():
+            self.rule_cb.addItem(label, rule)
+        self.rule_cb.currentIndexChanged.connect(self._on_rule_changed)
+        form.addRow("规则:", self.rule_cb)
+        self.attr_cb = QComboBox()
+        self.attr_cb.addItems(ATTRS)
+        form.addRow("属性:", self.attr_cb)
+        self.sb = QSpinBox()
+        self.sb.setRange(-99999, 99999)
+        self.sb.setValue(int(DEFAULT_ADD_VALUE))
+        form.addRow("N:", self.sb)
+        self.selected_cb = QCheckBox("仅作用于选中的行")
+        self.selected_cb.setChecked(has_selection)
+        self.selected_cb.setEnabled(has_selection)
+        form.addRow(self.selected_cb)
+        layout.addLayout(form)
+        btns = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        btns.accepted.connect(self.accept)
+        btns.rejected.connect(self.reject)
+        layout.addWidget(btns)
+        self._on_rule_changed()
+
+    def _on_rule_changed(self, *_):
+        needs_attr = self.rule() != "reset_default"
+        self.attr_cb.setEnabled(needs_attr)
+        self.sb.setEnabled(needs_attr)
+
+    def rule(self) -> str:
+        return self.rule_cb.currentData()
+
+# ---------------- Background Task ----------------
+class TaskWorker(QThread):
+    """
+    在后台线程执行 fn(report)，report(百分比, 说明) 汇报进度。
+    cancel() 后下一次 report 会抛出 OperationCancelled 中止任务；结果通过信号回到界面线程。
+    """
+    progress = pyqtSignal(int, str)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, fn: Callable[[ProgressCallback], object], parent=None):
+        super().__init__(parent)
+        self._fn = fn
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def report(self, percent: int, message: str = ""):
+        if self._cancel:
+            raise OperationCancelled()
+        self.progress.emit(int(percent), message)
+
+    def run(self):
+        try:
+            result = self._fn(self.report)
+        except OperationCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if self._cancel:
+            self.cancelled.emit()
+            return
+        self.succeeded.emit(result)
+
 # ---------------- Main Window ----------------
+# 列宽自动测量：可视区行数（表格尚未布局时使用）、随机抽样行数、内边距与最大宽度
+AUTOSIZE_VIEW_ROWS = 40
+AUTOSIZE_SAMPLE_ROWS = 200
+AUTOSIZE_CELL_PADDING = 16
+AUTOSIZE_HEADER_PADDING = 24
+AUTOSIZE_MAX_WIDTH = 400
+
+def _text_width(fm, text: str) -> int:
+    # Qt 5.11 起 width() 更名为 horizontalAdvance()
+    if hasattr(fm, "horizontalAdvance"):
+        return fm.horizontalAdvance(text)
+    return fm.width(text)
+
+# 一次编辑影响的行数超过该值时整体刷新表格，而不是逐行增删
+BULK_REFRESH_ROWS = 50
+
+class HeroTab(QWidget):
+    """一个已加载工作簿的标签页：独立的 ExcelHandler、表格视图与持久模型，切换标签不重新解析"""
+    def __init__(self, handler: ExcelHandler, window: "MainWindow"):
+        super().__init__(window)
+        self.handler = handler
+        self._window = window
+        # 搜索结果视图的行位置；None 表示按“显示所有英雄”筛选的常规视图
+        self._search_rows: Optional[List[int]] = None
+        # 当前模型按哪种筛选状态生成，切换标签时据此判断是否需要刷新
+        self._shown_all: Optional[bool] = None
+        # 当前排序：(列名, 是否降序)；None 表示按表中原顺序
+        self._sort: Optional[tuple] = None
+        self._applying_widths = False
+        # 当前模型中只按表头测量、尚未缓存宽度的列（建模型时没有可见行）
+        self._unsized_cols: List[str] = []
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.table = QTableView()
+        self.table.doubleClicked.connect(self.on_double_click)
+        header = self.table.horizontalHeader()
+        header.sectionResized.connect(self._on_section_resized)
+        # 点击表头排序：不用 setSortingEnabled，由 handler.sort_index 提供缓存的排列
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        header.sortIndicatorChanged.connect(self._on_sort_changed)
+        layout.addWidget(self.table, 1)
+
+    def _table_columns(self, with_sum: bool = True) -> List[str]:
+        # 原列顺序：ID name is_default_add add_武力 ... add_速度，然后加点和
+        cols = ["ID", "name", "is_default_add"] + [f"add_{a}" for a in ATTRS]
+        # 在 add_速度 后面插入 add_sum（显示名称为 加点和）
+        if with_sum:
+            cols.append("add_sum")
+        return [c for c in cols if self.handler.has_column(c)]
+
+    def _arranged(self, mask: Optional[np.ndarray] = None) -> tuple:
+        """
+        mask 选中的行（None 为全部）按当前排序排列，返回 (行位置数组, 名次)。
+        排序时直接按掩码过滤缓存的排列，不重新排序；未排序时按 df 行位置升序，名次为 None。
+        """
+        if self._sort is None:
+            rows = np.arange(len(self.handler.store)) if mask is None else np.flatnonzero(mask)
+            return rows, None
+        perm, rank = self.handler.sort_index.order(*self._sort)
+        return (perm if mask is None else perm[mask[perm]]), rank
+
+    def _search_mask(self) -> np.ndarray:
+        mask = np.zeros(len(self.handler.store), dtype=bool)
+        mask[self._search_rows] = True
+        return mask
+
+    def _visible_rows(self) -> tuple:
+        """“显示所有英雄”未勾选时只显示非默认加点的行；is_default 随编辑按行更新，直接作为筛选掩码"""
+        if self._window.show_all_cb.isChecked():
+            return self._arranged()
+        return self._arranged(~self.handler.store.is_default)
+
+    def _current_rows(self) -> tuple:
+        """当前视图（搜索结果或常规筛选）应显示的行与名次"""
+        if self._search_rows is not None:
+            return self._arranged(self._search_mask())
+        return self._visible_rows()
+
+    def _set_model(self, cols: List[str], rows: np.ndarray, rank: Optional[np.ndarray]):
+        """复用同一 handler、同一列集合的现有模型，只做行差异更新；否则新建模型"""
+        model = self.table.model()
+        if isinstance(model, DataFrameModel) and model._handler is self.handler and model._cols == cols:
+            model.set_rows(rows, rank)
+            return
+        model = DataFrameModel(self.handler, cols, rows, rank)
+        self.table.setModel(model)
+        # 没有行时测得的只是表头宽度，等有行显示时再补测
+        model.rowsInserted.connect(self._refit_unsized)
+        model.modelReset.connect(self._refit_unsized)
+        self._fit_columns(cols)
+        self._show_sort_indicator(cols)
+
+    def _show_sort_indicator(self, cols: List[str]):
+        """新模型的列集合可能不同（搜索视图没有加点和），按列名重新放置排序箭头"""
+        header = self.table.horizontalHeader()
+        header.blockSignals(True)
+        try:
+            if self._sort is not None and self._sort[0] in cols:
+                header.setSortIndicator(cols.index(self._sort[0]),
+                                        Qt.DescendingOrder if self._sort[1] else Qt.AscendingOrder)
+            else:
+                header.setSortIndicator(-1, Qt.AscendingOrder)
+        finally:
+            header.blockSignals(False)
+
+    def _on_sort_changed(self, section: int, order):
+        model = self.table.model()
+        if not isinstance(model, DataFrameModel) or self.handler.df is None:
+            return
+        if not 0 <= section < len(model._cols):
+            return
+        self._sort = (model._cols[section], order == Qt.DescendingOrder)
+        model.set_rows(*self._current_rows())
+
+    def _fit_columns(self, cols: List[str]):
+        """
+        列宽按列名缓存（各标签页共用）：只测量尚无宽度的列，且只采样表头 + 可视区 + 随机抽样行，
+        不做 resizeColumnsToContents 的全表测量；用户手动拖动的宽度会被记住并在刷新后保留。
+        模型没有行时只按表头设置宽度、不写入缓存，由 _refit_unsized 在有行后补测。
+        """
+        widths = self._window._col_widths
+        model = self.table.model()
+        n = model.rowCount()
+        missing = [i for i, c in enumerate(cols) if c not in widths]
+        rows = self._sample_rows(n) if missing and n else []
+        measured = {cols[i]: self._measure_column(model, i, rows) for i in missing}
+        if n:
+            widths.update(measured)
+            self._unsized_cols = []
+        else:
+            self._unsized_cols = list(measured)
+        self._applying_widths = True
+        try:
+            for i, c in enumerate(cols):
+                self.table.setColumnWidth(i, widths.get(c, measured.get(c)))
+        finally:
+            self._applying_widths = False
+
+    def _refit_unsized(self, *_):
+        """模型从无行变为有行时，补测只按表头设置过宽度的列"""
+        model = self.table.model()
+        if self._unsized_cols and isinstance(model, DataFrameModel) and model.rowCount():
+            self._fit_columns(model._cols)
+
+    def _sample_rows(self, n: int) -> List[int]:
+        """可视区内的行 + 固定上限的随机抽样行"""
+        first = self.table.rowAt(0)
+        last = self.table.rowAt(self.table.viewport().height() - 1)
+        if first < 0:
+            first, last = 0, min(n, AUTOSIZE_VIEW_ROWS) - 1
+        elif last < 0:
+            last = min(n, first + AUTOSIZE_VIEW_ROWS) - 1
+        rows = set(range(first, last + 1))
+        rest = n - len(rows)
+        if rest > 0:
+            rng = random.Random(n)
+            rows.update(rng.sample(range(n), min(n, AUTOSIZE_SAMPLE_ROWS)))
+        return sorted(rows)
+
+    def _measure_column(self, model: "DataFrameModel", col: int, rows: List[int]) -> int:
+        fm = self.table.fontMetrics()
+        hfm = self.table.horizontalHeader().fontMetrics()
+        width = _text_width(hfm, str(model.headerData(col, Qt.Horizontal))) + AUTOSIZE_HEADER_PADDING
+        for r in rows:
+            text = model.data(model.index(r, col))
+            if text:
+                width = max(width, _text_width(fm, str(text)) + AUTOSIZE_CELL_PADDING)
+        return min(width, AUTOSIZE_MAX_WIDTH)
+
+    def _on_section_resized(self, logical: int, old: int, new: int):
+        # 只记录用户手动拖动的宽度，程序设置宽度时忽略
+        if self._applying_widths:
+            return
+        model = self.table.model()
+        if isinstance(model, DataFrameModel) and 0 <= logical < len(model._cols):
+            self._window._col_widths[model._cols[logical]] = new
+
+    def refresh_table(self, *_):
+        if self.handler.df is None:
+            return
+        self._search_rows = None
+        self._shown_all = self._window.show_all_cb.isChecked()
+        self._set_model(self._table_columns(), *self._visible_rows())
+
+    def release(self) -> bool:
+        """不活跃时释放数据（模型一并清除）；有未保存的修改时不释放。再次切换到本标签时重新读取"""
+        if not self.handler.release():
+            return False
+        self.table.setModel(None)
+        self._search_rows = None
+        self._shown_all = None
+        return True
+
+    def ensure_current(self):
+        """切换到本标签时调用：筛选开关在其它标签中被改过才刷新（按行差异，开销很小）"""
+        if self._search_rows is None and self._shown_all != self._window.show_all_cb.isChecked():
+            self.refresh_table()
+
+    def _warn_journal(self):
+        """恢复日志写入失败时提示一次（日志已关闭，编辑不受影响）"""
+        journal = self.handler.journal
+        if journal.log_error:
+            message, journal.log_error = journal.log_error, None
+            QMessageBox.warning(self, "恢复日志", message)
+
+    def refresh_rows(self, positions: List[int]):
+        """编辑后只刷新受影响的行；可见性变化的行增删，其余只重绘该行"""
+        self._warn_journal()
+        model = self.table.model()
+        if not isinstance(model, DataFrameModel) or model._handler is not self.handler:
+            self.refresh_table()
+            return
+        # 按被编辑的列排序时名次数组会更新，受影响的行在模型中移动到新位置
+        rank = None if self._sort is None else self.handler.sort_index.order(*self._sort)[1]
+        if self._search_rows is not None:
+            # 搜索视图的行集合只取决于 ID/名称，编辑不改变可见性
+            found = set(self._search_rows)
+            model.update_rows({p: p in found for p in positions}, rank)
+            return
+        show_all = self._window.show_all_cb.isChecked()
+        flags = self.handler.store.is_default
+        model.update_rows({p: show_all or not bool(flags[p]) for p in positions}, rank)
+
+    def refresh_bulk(self):
+        """批量修改后：按差异一次性增删可见行，再整体重绘，不逐行更新"""
+        self._warn_journal()
+        model = self.table.model()
+        if not isinstance(model, DataFrameModel) or model._handler is not self.handler:
+            self.refresh_table()
+            return
+        model.set_rows(*self._current_rows())
+        model.all_changed()
+
+    def refresh_edited(self, positions: List[int]):
+        """编辑/撤销后刷新：少量行逐行更新，大批量时整体按差异刷新"""
+        if len(positions) > BULK_REFRESH_ROWS:
+            self.refresh_bulk()
+        else:
+            self.refresh_rows(positions)
+
+    def undo(self):
+        self.refresh_edited(self.handler.undo())
+
+    def redo(self):
+        self.refresh_edited(self.handler.redo())
+
+    def bulk_edit(self):
+        model = self.table.model()
+        if self.handler.df is None or not isinstance(model, DataFrameModel):
+            return
+        selected = sorted({model.source_row(idx.row()) for idx in self.table.selectionModel().selectedIndexes()})
+        dlg = BulkEditDialog(bool(selected), parent=self)
+        if not dlg.exec_():
+            return
+        rows = selected if dlg.selected_cb.isChecked() else model._rows
+        try:
+            changed = self.handler.apply_bulk_rule(dlg.rule(), rows, dlg.attr_cb.currentText(), dlg.sb.value())
+        except Exception as e:
+            QMessageBox.critical(self, "批量修改失败", str(e))
+            return
+        self.refresh_edited(changed)
+        self._window.statusBar().showMessage(f"批量加点：修改了 {len(changed)} 个英雄", 5000)
+
+    def search(self, term: str):
+        if not term:
+            self.refresh_table()
+            return
+        if self.handler.df is None:
+            return
+        rows = self.handler.search_rows(term)
+        if not rows:
+            QMessageBox.information(self, "未找到", "没有匹配的英雄")
+            return
+        self._search_rows = rows
+        self._set_model(self._table_columns(with_sum=False), *self._current_rows())
+
+    def on_double_click(self, index: QModelIndex):
+        """
+        双击处理：
+        - 若双击列为 add_* 则弹出 SingleAttrEditDialog 修改该属性的加点值（只应用到内存并刷新）
+        - 否则保持原有行为，弹出 AdjustDialog（修改全部属性）
+        """
+        model = self.table.model()
+        if not isinstance(model, DataFrameModel) or self.handler.df is None or not index.isValid():
+            return
+        # 当前展示列名由模型 cols 列表确定；界面行通过模型映射回 handler.df 的行位置
+        try:
+            col_name = model._cols[index.column()]
+        except Exception:
+            col_name = None
+        pos = model.source_row(index.row())
+
+        if col_name and col_name.startswith("add_"):
+            # 单属性编辑
+            cur_val = 0
+            try:
+                cur_val = int(self.handler.column(col_name)[pos])
+            except Exception:
+                cur_val = 0
+            dlg = SingleAttrEditDialog(col_name, cur_val, parent=self)
+            if dlg.exec_():
+                new_val = int(dlg.sb.value())
+                # 只修改该 add_ 列，并同步对应 value 列为 base+add（保持浮点）
+                try:
+                    self.handler.update_add_points_at(pos, {col_name.replace("add_", ""): new_val})
+                except Exception as e:
+                    QMessageBox.critical(self, "更新失败", str(e))
+                self.refresh_rows([pos])
+            return
+
+        # 不是单属性列，则回退为原先的整体调整弹窗
+        id_val = self.handler.value_at(pos, "ID")
+        dlg = AdjustDialog(self.handler, id_val, parent=self)
+        if dlg.exec_():
+            self.refresh_rows([pos])
+
+# 同时常驻内存的标签页数据（df 与 HeroAttrStore）上限，与工作簿会话上限一致；
+# 超出时释放最久未使用、且没有未保存修改的标签页，切换回去时在后台重新读取
+LOADED_TABS_LIMIT = WORKBOOK_CACHE_SIZE
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("属性加点工具")
         self.resize(1000, 640)
-        self.handler = ExcelHandler()
-        self.current_df: Optional[pd.DataFrame] = None
+        # 没有打开任何标签时使用的空处理器
+        self._empty_handler = ExcelHandler()
+        # 列宽缓存：列名 -> 宽度（自动测量或用户手动调整），各标签页共用
+        self._col_widths: Dict[str, int] = {}
+        # 标签页按最近使用排序（末尾为当前标签），用于释放不活跃标签的数据
+        self._recent_tabs: List[HeroTab] = []
         central = QWidget()
         self.setCentralWidget(central)
         layout = QVBoxLayout(central)
@@ -626,12 +830,23 @@ class MainWindow(QMainWindow):
         self.save_current_btn.clicked.connect(self.save_current)
         self.full_red_btn = QPushButton("满红导出")
         self.full_red_btn.clicked.connect(self.full_red_export)
+        self.undo_btn = QPushButton("撤销")
+        self.undo_btn.clicked.connect(self.undo)
+        self.redo_btn = QPushButton("重做")
+        self.redo_btn.clicked.connect(self.redo)
+        QShortcut(QKeySequence.Undo, self, self.undo)
+        QShortcut(QKeySequence.Redo, self, self.redo)
+        self.bulk_btn = QPushButton("批量加点")
+        self.bulk_btn.clicked.connect(self.bulk_edit)
         self.show_all_cb = QCheckBox("显示所有英雄")
         self.show_all_cb.stateChanged.connect(self.refresh_table)
         top.addWidget(self.open_btn)
         top.addWidget(self.save_current_btn)                   
         top.addWidget(self.save_btn)
         top.addWidget(self.full_red_btn)
+        top.addWidget(self.bulk_btn)
+        top.addWidget(self.undo_btn)
+        top.addWidget(self.redo_btn)
         top.addWidget(self.show_all_cb)
         top.addStretch()
         self.search_input = QLineEdit()
@@ -639,158 +854,276 @@ class MainWindow(QMainWindow):
         self.search_input.returnPressed.connect(self.on_search)
         top.addWidget(self.search_input)
         layout.addLayout(top)
-        body = QHBoxLayout()
-        self.table = QTableView()
-        self.table.doubleClicked.connect(self.on_double_click)
-        body.addWidget(self.table, 1)
-        layout.addLayout(body)
+        # 每个打开的工作簿一个标签页
+        self.tabs = QTabWidget()
+        self.tabs.setTabsClosable(True)
+        self.tabs.setMovable(True)
+        self.tabs.tabCloseRequested.connect(self.close_tab)
+        self.tabs.currentChanged.connect(self._on_tab_changed)
+        layout.addWidget(self.tabs, 1)
         self.setAcceptDrops(True)
+        # 状态栏进度：后台加载/保存时显示，可取消
+        self._load_worker: Optional[TaskWorker] = None
+        self._pending_paths: List[str] = []
+        self._save_worker: Optional[TaskWorker] = None
+        self._progress_worker: Optional[TaskWorker] = None
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setMaximumWidth(200)
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.clicked.connect(self.cancel_task)
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.statusBar().addPermanentWidget(self.cancel_btn)
+        self.progress_bar.hide()
+        self.cancel_btn.hide()
+
+    def current_tab(self) -> Optional[HeroTab]:
+        tab = self.tabs.currentWidget()
+        return tab if isinstance(tab, HeroTab) else None
+
+    @property
+    def handler(self) -> ExcelHandler:
+        """当前标签页的处理器；没有打开的标签时为空处理器"""
+        tab = self.current_tab()
+        return tab.handler if tab is not None else self._empty_handler
+
+    def _find_tab(self, path: str) -> Optional[HeroTab]:
+        key = os.path.abspath(path)
+        for i in range(self.tabs.count()):
+            tab = self.tabs.widget(i)
+            if isinstance(tab, HeroTab) and tab.handler.path and os.path.abspath(tab.handler.path) == key:
+                return tab
+        return None
+
+    def _on_tab_changed(self, _index: int):
+        tab = self.current_tab()
+        if tab is None:
+            self.setWindowTitle("属性加点工具")
+            return
+        if tab.handler.released:
+            self._reload_tab(tab)
+        else:
+            tab.ensure_current()
+        self._touch_tab(tab)
+        self.setWindowTitle(f"属性加点工具 - {tab.handler.path}")
+
+    def _touch_tab(self, tab: HeroTab):
+        """记录标签的使用顺序；常驻数据的标签超过上限时，从最久未使用的开始释放（当前标签除外）"""
+        if tab in self._recent_tabs:
+            self._recent_tabs.remove(tab)
+        self._recent_tabs.append(tab)
+        loaded = [t for t in self._recent_tabs if t.handler.df is not None]
+        excess = len(loaded) - LOADED_TABS_LIMIT
+        for old in loaded[:-1]:
+            if excess <= 0:
+                break
+            if old is not tab and old.release():
+                excess -= 1
+
+    def _reload_tab(self, tab: HeroTab):
+        """在后台线程重新读取被释放的标签页数据；正在加载其它文件时跳过，之后切换回本标签再读取"""
+        if self._load_worker is not None:
+            if getattr(self._load_worker, "tab", None) is not tab:
+                self.statusBar().showMessage("正在加载其它文件，完成后切换回本标签即可重新读取", 5000)
+            return
+        handler = tab.handler
+
+        def job(report):
+            handler.reload(progress=report)
+            return handler
+
+        worker = TaskWorker(job, self)
+        worker.tab = tab
+        worker.succeeded.connect(self._on_reload_done)
+        worker.failed.connect(self._on_load_failed)
+        worker.cancelled.connect(self._on_load_cancelled)
+        self._load_worker = worker
+        self._start_task(worker, f"正在重新读取 {os.path.basename(handler.path)}")
+
+    def _on_reload_done(self, handler: "ExcelHandler"):
+        worker = self.sender()
+        if worker is not self._load_worker:
+            return
+        self._load_worker = None
+        self._end_task(worker, f"已重新读取：{handler.path}（耗时 {handler.load_seconds:.2f} 秒）")
+        if self.tabs.indexOf(worker.tab) >= 0:
+            worker.tab.refresh_table()
+            self._touch_tab(worker.tab)
+        self._load_next()
+
+    def close_tab(self, index: int):
+        tab = self.tabs.widget(index)
+        if isinstance(tab, HeroTab) and tab.handler._dirty:
+            ret = QMessageBox.question(self, "关闭", f"{os.path.basename(tab.handler.path)} 有未保存的修改，仍然关闭？")
+            if ret != QMessageBox.Yes:
+                return
+            # 用户确认放弃修改，恢复日志一并删除
+            tab.handler.journal.discard()
+        self.tabs.removeTab(index)
+        if isinstance(tab, HeroTab):
+            if tab in self._recent_tabs:
+                self._recent_tabs.remove(tab)
+            if tab.handler.path and self._find_tab(tab.handler.path) is None:
+                WORKBOOK_CACHE.discard(tab.handler.path)
+            tab.deleteLater()
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
 
     def dropEvent(self, event):
-        urls = event.mimeData().urls()
-        if not urls:
-            return
-        path = urls[0].toLocalFile()
-        if path:
-            self.load_path(path)
+        for url in event.mimeData().urls():
+            path = url.toLocalFile()
+            if path:
+                self.load_path(path)
 
     def open_file(self):
-        path, _ = QFileDialog.getOpenFileName(self, "打开 Excel 文件", "", "Excel 文件 (*.xlsx *.xls)")
-        if path:
+        paths, _ = QFileDialog.getOpenFileNames(self, "打开 Excel 文件", "", "Excel 文件 (*.xlsx *.xls)")
+        for path in paths:
             self.load_path(path)
 
     def load_path(self, path: str):
-        try:
-            self.handler.load(path, sheet_name="hero")
-        except Exception as e:
-            QMessageBox.critical(self, "读取失败", str(e))
+        """
+        在后台线程加载到新的标签页；已打开的文件直接切换到对应标签。
+        加载进行中再打开/拖入的文件排队，按顺序依次加载。
+        """
+        tab = self._find_tab(path)
+        if tab is not None:
+            self.tabs.setCurrentWidget(tab)
             return
-        self.refresh_table()
-
-    def refresh_table(self):
-        if self.handler.df is None:
+        if self._load_worker is not None:
+            if path not in self._pending_paths:
+                self._pending_paths.append(path)
             return
-        if self.show_all_cb.isChecked():
-            df_show = self.handler.df.copy()
-        else:
-            df_show = self.handler.df[~self.handler.df["is_default_add"]].copy()
-        df_show = df_show.reset_index(drop=False)
-        # 原列顺序：ID name is_default_add add_武力 ... add_速度，然后加点和
-        add_cols = [f"add_{a}" for a in ATTRS]
-        cols = ["ID", "name", "is_default_add"] + [c for c in add_cols if c in df_show.columns]
-        # 在 add_速度 后面插入 add_sum（显示名称为 加点和）
-        if "add_sum" in df_show.columns:
-            cols.append("add_sum")
-        cols = [c for c in cols if c in df_show.columns]
-        self.current_df = df_show
-        model = DataFrameModel(df_show, cols)
-        self.table.setModel(model)
-        self.table.resizeColumnsToContents()
+        handler = ExcelHandler()
 
-    def on_search(self):
-        term = self.search_input.text().strip()
-        if not term:
-            self.refresh_table()
+        def job(report):
+            handler.load(path, sheet_name="hero", progress=report)
+            return handler
+
+        worker = TaskWorker(job, self)
+        worker.succeeded.connect(self._on_load_done)
+        worker.failed.connect(self._on_load_failed)
+        worker.cancelled.connect(self._on_load_cancelled)
+        self._load_worker = worker
+        self._start_task(worker, f"正在加载 {os.path.basename(path)}")
+
+    def _load_next(self):
+        if self._pending_paths:
+            self.load_path(self._pending_paths.pop(0))
+
+    def _on_load_done(self, handler: "ExcelHandler"):
+        if self.sender() is not self._load_worker:
             return
-        if self.handler.df is None:
+        self._load_worker = None
+        self._end_task(self.sender(), f"已加载：{handler.path}（{handler.load_engine}，耗时 {handler.load_seconds:.2f} 秒）")
+        tab = HeroTab(handler, self)
+        index = self.tabs.addTab(tab, os.path.basename(handler.path))
+        self.tabs.setTabToolTip(index, handler.path)
+        self.tabs.setCurrentIndex(index)
+        tab.refresh_table()
+        self._offer_recovery(tab)
+        self._load_next()
+
+    def _offer_recovery(self, tab: HeroTab):
+        """源文件旁有未保存编辑的恢复日志时询问是否恢复；不恢复则删除日志"""
+        handler = tab.handler
+        try:
+            groups = handler.pending_recovery()
+        except Exception as e:
+            QMessageBox.warning(self, "恢复日志", f"{e}，已忽略该日志")
+            handler.journal.discard()
             return
-        res = self.handler.search(term)
-        if res.empty:
-            QMessageBox.information(self, "未找到", "没有匹配的英雄")
+        if not groups:
+            handler.journal.discard()
             return
-        self.current_df = res.reset_index(drop=False)
-        cols = ["ID", "name", "is_default_add"] + [f"add_{a}" for a in ATTRS]
-        cols = [c for c in cols if c in self.current_df.columns]
-        self.table.setModel(DataFrameModel(self.current_df, cols))
-        self.table.resizeColumnsToContents()
-
-    def on_double_click(self, index: QModelIndex):
-        """
-        双击处理：
-        - 若双击列为 add_* 则弹出 SingleAttrEditDialog 修改该属性的加点值（只应用到内存并刷新）
-        - 否则保持原有行为，弹出 AdjustDialog（修改全部属性）
-        """
-        if self.current_df is None or not index.isValid():
+        ret = QMessageBox.question(self, "恢复", f"{os.path.basename(handler.path)} 有 {len(groups)} 步未保存的编辑记录，是否恢复？")
+        if ret != QMessageBox.Yes:
+            handler.journal.discard()
             return
-        row = index.row()
-        col = index.column()
-
-        # 当前展示列名由模型 cols 列表确定
-        model = self.table.model()
         try:
-            col_name = model._cols[col]
-        except Exception:
-            col_name = None
-
-        # 找到原始 handler.df 的索引
-        orig_idx = None
-        try:
-            if "index" in self.current_df.columns:
-                orig_idx = int(self.current_df.at[row, "index"])
-            else:
-                # 使用 ID 定位
-                id_val = self.current_df.at[row, "ID"]
-                mask = self.handler.df["ID"].astype(str) == str(id_val)
-                if mask.any():
-                    orig_idx = self.handler.df[mask].index[0]
-        except Exception:
-            orig_idx = None
+            tab.refresh_edited(handler.recover(groups))
+        except Exception as e:
+            QMessageBox.critical(self, "恢复失败", str(e))
 
-        if col_name and col_name.startswith("add_"):
-            # 单属性编辑
-            cur_val = 0
-            try:
-                cur_val = int(round(float(self.handler.df.at[orig_idx, col_name])))
-            except Exception:
-                cur_val = 0
-            dlg = SingleAttrEditDialog(col_name, cur_val, parent=self)
-            if dlg.exec_():
-                new_val = int(dlg.sb.value())
-                # 写回 handler.df 仅该 add_ 列，并更新对应 value 列为 base+add（保持浮点）
-                try:
-                    self.handler.df.at[orig_idx, col_name] = int(new_val)
-                    # 同步对应 value 列
-                    attr = col_name.replace("add_", "")
-                    value_col, init_col, growth_col = self.handler._col_names_for(attr)
-                    # 确保 base 存在
-                    if f"base_{attr}" not in self.handler.df.columns:
-                        init_v = float(self.handler.df.at[orig_idx, init_col]) if init_col in self.handler.df.columns else 0.0
-                        growth_v = float(self.handler.df.at[orig_idx, growth_col]) if growth_col in self.handler.df.columns else 0.0
-                        self.handler.df.at[orig_idx, f"base_{attr}"] = init_v + growth_v * GROWTH_MULT
-                    try:
-                        base_val = float(self.handler.df.at[orig_idx, f"base_{attr}"])
-                    except Exception:
-                        base_val = 0.0
-                    # 保持 value 为浮点 base + 整数 add
-                    self.handler.df.at[orig_idx, value_col] = float(base_val) + float(new_val)
-                except Exception as e:
-                    QMessageBox.critical(self, "更新失败", str(e))
-                # 重新计算并刷新界面
-                try:
-                    self.handler._compute_base_and_add()
-                except Exception:
-                    pass
-                self.refresh_table()
+    def _on_load_failed(self, message: str):
+        if self.sender() is not self._load_worker:
             return
+        self._load_worker = None
+        self._end_task(self.sender())
+        QMessageBox.critical(self, "读取失败", message)
+        self._load_next()
 
-        # 不是单属性列，则回退为原先的整体调整弹窗
-        if "index" in self.current_df.columns:
-            try:
-                orig_idx = int(self.current_df.at[row, "index"])
-                id_val = self.handler.df.at[orig_idx, "ID"]
-            except Exception:
-                id_val = self.current_df.at[row, "ID"]
-        else:
-            id_val = self.current_df.at[row, "ID"]
+    def _on_load_cancelled(self):
+        if self.sender() is not self._load_worker:
+            return
+        self._load_worker = None
+        self._end_task(self.sender(), "已取消加载")
+        self._load_next()
+
+    def _start_task(self, worker: TaskWorker, label: str):
+        worker.progress.connect(self._on_task_progress)
+        worker.finished.connect(worker.deleteLater)
+        self._progress_worker = worker
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.cancel_btn.show()
+        self.statusBar().showMessage(label)
+        worker.start()
+
+    def _on_task_progress(self, percent: int, message: str):
+        if self.sender() is not self._progress_worker:
+            return
+        self.progress_bar.setValue(percent)
+        if message:
+            self.statusBar().showMessage(message)
+
+    def _end_task(self, worker: TaskWorker, message: str = ""):
+        if worker is self._progress_worker:
+            self._progress_worker = None
+            self.progress_bar.hide()
+            self.cancel_btn.hide()
+        if message:
+            self.statusBar().showMessage(message, 5000)
+
+    def cancel_task(self):
+        if self._progress_worker is not None:
+            self._progress_worker.cancel()
+
+    def closeEvent(self, event):
+        # 退出前取消并等待后台线程，避免线程运行中被销毁
+        self._pending_paths.clear()
+        for worker in self.findChildren(TaskWorker):
+            worker.cancel()
+            worker.wait()
+        super().closeEvent(event)
+
+    def refresh_table(self, *_):
+        tab = self.current_tab()
+        if tab is not None:
+            tab.refresh_table()
+
+    def undo(self):
+        tab = self.current_tab()
+        if tab is not None:
+            tab.undo()
+
+    def redo(self):
+        tab = self.current_tab()
+        if tab is not None:
+            tab.redo()
+
+    def bulk_edit(self):
+        tab = self.current_tab()
+        if tab is None:
+            QMessageBox.information(self, "提示", "请先打开并加载源 Excel 文件")
+            return
+        tab.bulk_edit()
 
-        dlg = AdjustDialog(self.handler, id_val, parent=self)
-        if dlg.exec_():
-            self.handler._compute_base_and_add()
-            self.refresh_table()
+    def on_search(self):
+        tab = self.current_tab()
+        if tab is not None:
+            tab.search(self.search_input.text().strip())
 
     def save_file(self):
         if self.handler.df is None:
@@ -799,11 +1132,8 @@ class MainWindow(QMainWindow):
         path, _ = QFileDialog.getSaveFileName(self, "保存为", "modified.xlsx", "Excel 文件 (*.xlsx)")
         if not path:
             return
-        try:
-            self.handler.save(path)
-            QMessageBox.information(self, "保存成功", f"已保存到：{path}")
-        except Exception as e:
-            QMessageBox.critical(self, "保存失败", str(e))
+        self._start_save(lambda snap, report: snap.save(path, progress=report),
+                         f"正在保存到 {path}", f"已保存到：{path}", "保存失败")
 
     def save_current(self):
         """直接保存当前修改，优先覆盖原始文件，否则弹出保存对话框"""
@@ -811,22 +1141,17 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "提示", "当前没有可保存的数据")
             return
         if self.handler.path:
-            try:
-                # 尝试保存到原路径（handler.save 会处理部分写回）
-                self.handler.save(self.handler.path)
-                QMessageBox.information(self, "保存成功", f"已保存到原文件：{self.handler.path}")
-            except Exception as e:
-                QMessageBox.critical(self, "保存失败", str(e))
+            # 保存到原路径（handler.save 会处理部分写回）
+            path = self.handler.path
+            done = f"已保存到原文件：{path}"
         else:
             # 没有原始路径则提示另存为
             path, _ = QFileDialog.getSaveFileName(self, "保存为", "modified.xlsx", "Excel 文件 (*.xlsx)")
             if not path:
                 return
-            try:
-                self.handler.save(path)
-                QMessageBox.information(self, "保存成功", f"已保存到：{path}")
-            except Exception as e:
-                QMessageBox.critical(self, "保存失败", str(e))
+            done = f"已保存到：{path}"
+        self._start_save(lambda snap, report: snap.save(path, progress=report),
+                         f"正在保存到 {path}", done, "保存失败")
 
     def full_red_export(self):
         if self.handler.df is None:
@@ -835,18 +1160,103 @@ class MainWindow(QMainWindow):
         path, _ = QFileDialog.getSaveFileName(self, "满红导出保存为", "full_red.xlsx", "Excel 文件 (*.xlsx)")
         if not path:
             return
-        try:
-            self.handler.export_full_red(path)
-            QMessageBox.information(self, "完成", f"满红导出已保存到：{path}")
-        except Exception as e:
-            QMessageBox.critical(self, "导出失败", str(e))
+        self._start_save(lambda snap, report: snap.export_full_red(path, progress=report),
+                         f"正在满红导出到 {path}", f"满红导出已保存到：{path}", "导出失败")
+
+    def _start_save(self, job: Callable[["ExcelHandler", ProgressCallback], None], label: str,
+                    done_message: str, fail_title: str):
+        """
+        在后台线程对当前数据的快照执行保存/导出；同一时间只允许一个写文件任务，
+        期间界面可以继续编辑（编辑不影响快照），完成或失败时以非阻塞提示告知。
+        """
+        if self._save_worker is not None:
+            QMessageBox.information(self, "提示", "上一次保存尚未完成，请稍候")
+            return
+        snap = self.handler.snapshot()
+        worker = TaskWorker(lambda report: job(snap, report), self)
+        worker.handler = self.handler
+        worker.snapshot = snap
+        worker.done_message = done_message
+        worker.fail_title = fail_title
+        worker.succeeded.connect(self._on_save_done)
+        worker.failed.connect(self._on_save_failed)
+        worker.cancelled.connect(self._on_save_cancelled)
+        self._save_worker = worker
+        self._set_save_enabled(False)
+        self._start_task(worker, label)
+
+    def _set_save_enabled(self, enabled: bool):
+        for btn in (self.save_current_btn, self.save_btn, self.full_red_btn):
+            btn.setEnabled(enabled)
+
+    def _finish_save(self):
+        worker = self._save_worker
+        self._save_worker = None
+        self._set_save_enabled(True)
+        return worker
+
+    def _on_save_done(self, _result):
+        worker = self._finish_save()
+        worker.handler.mark_saved(worker.snapshot)
+        self._end_task(worker, worker.done_message)
+        self._notify(QMessageBox.Information, "完成", worker.done_message)
+
+    def _on_save_failed(self, message: str):
+        worker = self._finish_save()
+        self._end_task(worker)
+        self._notify(QMessageBox.Critical, worker.fail_title, message)
+
+    def _on_save_cancelled(self):
+        worker = self._finish_save()
+        self._end_task(worker, "已取消保存")
+
+    def _notify(self, icon, title: str, message: str):
+        # open() 显示窗口级提示但不进入嵌套事件循环
+        box = QMessageBox(icon, title, message, QMessageBox.Ok, self)
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.open()
 
 # ---------------- 运行 ----------------
+# 设置该环境变量或传入 --startup-timing 时把启动各阶段耗时输出到 stderr
+# （逐模块的导入耗时可配合 python -X importtime 查看）；
+# 读取/保存/导出等阶段的耗时用 --perf[=memory,profile] 或 PERF_TRACE 开启，退出时输出一行 JSON
+STARTUP_TIMING_ENV = "ATTRIBUTEADD_STARTUP_TIMING"
+
+def _preload_in_background():
+    """窗口显示后在后台线程预加载 pandas/openpyxl，打开第一个文件时不再等待导入"""
+    threading.Thread(target=_ensure_data_modules, name="preload", daemon=True).start()
+
 def main():
-    app = QApplication(sys.argv)
+    verbose = bool(os.environ.get(STARTUP_TIMING_ENV)) or "--startup-timing" in sys.argv
+    perf_options, perf_out, rest = split_perf_args(sys.argv[1:])
+    if perf_options or perf_out:
+        PERF.configure(perf_options or os.environ.get(PERF_ENV) or "on", perf_out or os.environ.get(PERF_OUT_ENV))
+    argv = [sys.argv[0]] + [a for a in rest if a != "--startup-timing"]
+    stages = [("导入模块", time.perf_counter())]
+    find_and_set_qt_plugins()
+    stages.append(("查找 Qt 插件", time.perf_counter()))
+    app = QApplication(argv)
+    stages.append(("创建 QApplication", time.perf_counter()))
     w = MainWindow()
     w.show()
-    sys.exit(app.exec_())
+    stages.append(("显示主窗口", time.perf_counter()))
+
+    def first_frame():
+        stages.append(("首帧完成", time.perf_counter()))
+        total = stages[-1][1] - _STARTUP_T0
+        w.statusBar().showMessage(f"启动耗时 {total:.2f} 秒", 5000)
+        if verbose:
+            prev = _STARTUP_T0
+            for name, t in stages:
+                print(f"[startup] {name}: {t - prev:.3f}s", file=sys.stderr)
+                prev = t
+            print(f"[startup] 合计: {total:.3f}s", file=sys.stderr)
+        _preload_in_background()
+
+    QTimer.singleShot(0, first_frame)
+    code = app.exec_()
+    PERF.emit(tool="attributeAdd")
+    sys.exit(code)
 
 if __name__ == "__main__":
 
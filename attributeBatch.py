@@ -0,0 +1,161 @@
+"""
+属性加点的命令行批处理（不需要 Qt / 图形界面，可在无显示的 Linux 机器上运行）。
+
+    python attributeBatch.py audit  a.xlsx b.xlsx --summary 非默认加点.csv
+    python attributeBatch.py export a.xlsx b.xlsx --out-dir 满红
+    python attributeBatch.py bulk   a.xlsx --rule reset_default [--attr 速度 --value 50] [--out-dir 输出]
+
+多个工作簿在独立的工作进程中并行处理；--summary 汇总各文件（处理后）的非默认加点英雄。
+--perf[=memory,profile] 为每个文件输出一行各阶段耗时的 JSON（--perf-out 指定追加写入的文件，默认 stderr）。
+"""
+import os
+import sys
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Dict, List
+
+from attributeHandler import ATTRS, BULK_RULES, PERF, ExcelHandler
+from perfTrace import PERF_ENV, PERF_OUT_ENV
+
+# ---------------- 单个工作簿的处理（在工作进程中运行） ----------------
+def _non_default_rows(handler: ExcelHandler) -> List[Dict]:
+    """非默认加点英雄的 ID、名称、各属性加点、加点和与默认目标属性"""
+    frame = handler.to_frame()
+    frame = frame[~frame["is_default_add"].astype(bool)]
+    cols = ["ID", "name"] + [f"add_{a}" for a in ATTRS] + ["add_sum", "_default_target_attr"]
+    rows = frame[cols].rename(columns={"add_sum": "加点和", "_default_target_attr": "默认目标"})
+    return rows.to_dict("records")
+
+def _out_path(path: str, out_dir: Optional[str], suffix: str) -> str:
+    stem, ext = os.path.splitext(os.path.basename(path))
+    folder = out_dir or os.path.dirname(os.path.abspath(path))
+    return os.path.join(folder, f"{stem}{suffix}{ext or '.xlsx'}")
+
+def run_job(command: str, path: str, sheet: str = "hero", out_dir: Optional[str] = None,
+            rule: Optional[str] = None, attr: Optional[str] = None, value: int = 0) -> Dict:
+    """
+    处理一个工作簿并返回结果字典（可跨进程传递）：
+    file / heroes / changed / output / non_default（非默认加点英雄列表）/ seconds / error
+    """
+    start = time.perf_counter()
+    result = {"file": path, "heroes": 0, "changed": 0, "output": None, "non_default": [], "error": None}
+    try:
+        handler = ExcelHandler()
+        handler.load(path, sheet_name=sheet)
+        result["heroes"] = len(handler.df)
+        if command == "export":
+            out = _out_path(path, out_dir, "_满红")
+            handler.export_full_red(out)
+            result["output"] = out
+        elif command == "bulk":
+            # 批处理不写崩溃恢复日志（也不动界面可能留下的日志）
+            handler.journal.log_path = None
+            result["changed"] = len(handler.apply_bulk_rule(rule, attr=attr, value=value))
+            # 没有 --out-dir 时写回原文件（只写修改过的单元格）
+            out = _out_path(path, out_dir, "") if out_dir else path
+            if result["changed"] or out != path:
+                handler.save(out)
+                result["output"] = out
+        result["non_default"] = _non_default_rows(handler)
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    # 每个文件一条记录（工作进程内直接输出，不经主进程转发）
+    PERF.emit(file=path, command=command, heroes=result["heroes"], changed=result["changed"],
+              error=result["error"])
+    return result
+
+# ---------------- 汇总 ----------------
+def write_summary(results: List[Dict], out_path: str):
+    """各文件的非默认加点英雄写入一张表（按扩展名写 .xlsx 或 .csv）"""
+    import pandas as pd
+    frames = []
+    for r in results:
+        if r["non_default"]:
+            df = pd.DataFrame(r["non_default"])
+            df.insert(0, "文件", os.path.basename(r["file"]))
+            frames.append(df)
+    summary = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["文件", "ID", "name"])
+    if out_path.lower().endswith((".xlsx", ".xls")):
+        summary.to_excel(out_path, index=False, engine="openpyxl")
+    else:
+        # utf-8-sig 方便 Excel 直接打开中文 CSV
+        summary.to_csv(out_path, index=False, encoding="utf-8-sig")
+
+def run_batch(command: str, paths: List[str], workers: Optional[int] = None, **options) -> List[Dict]:
+    """并行处理多个工作簿，结果按输入顺序返回；单个文件时不启动子进程"""
+    if len(paths) <= 1 or workers == 1:
+        return [run_job(command, p, **options) for p in paths]
+    results: Dict[str, Dict] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, command, p, **options): p for p in paths}
+        for fut in as_completed(futures):
+            r = fut.result()
+            results[futures[fut]] = r
+            _print_result(command, r)
+    return [results[p] for p in paths]
+
+def _print_result(command: str, r: Dict):
+    name = os.path.basename(r["file"])
+    if r["error"]:
+        print(f"[失败] {name}: {r['error']}", file=sys.stderr)
+        return
+    msg = f"[完成] {name}: {r['heroes']} 个英雄，非默认加点 {len(r['non_default'])} 个"
+    if command == "bulk":
+        msg += f"，修改 {r['changed']} 个"
+    if r["output"]:
+        msg += f" -> {r['output']}"
+    print(f"{msg}（{r['seconds']:.2f} 秒）")
+
+# ---------------- 运行 ----------------
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="属性加点批处理：审计默认加点 / 满红导出 / 批量加点")
+    sub = parser.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("files", nargs="+", help="要处理的 Excel 文件")
+    common.add_argument("--sheet", default="hero", help="工作表名（默认 hero）")
+    common.add_argument("--workers", type=int, default=None, help="并行进程数（默认 CPU 数）")
+    common.add_argument("--summary", help="非默认加点英雄汇总输出（.csv 或 .xlsx）")
+    common.add_argument("--perf", nargs="?", const="on", metavar="选项",
+                        help="输出各阶段耗时 JSON；选项可含 memory（内存峰值）、profile（cProfile 文件）")
+    common.add_argument("--perf-out", help="性能记录追加写入的文件（默认 stderr）")
+    sub.add_parser("audit", parents=[common], help="检查非默认加点的英雄")
+    p_export = sub.add_parser("export", parents=[common], help="满红导出")
+    p_export.add_argument("--out-dir", help="输出目录（默认与源文件相同，文件名加 _满红）")
+    p_bulk = sub.add_parser("bulk", parents=[common], help="按规则批量修改加点")
+    p_bulk.add_argument("--rule", required=True, choices=list(BULK_RULES), help="批量规则")
+    p_bulk.add_argument("--attr", choices=ATTRS, help="规则作用的属性（set_attr / set_attr_if_max）")
+    p_bulk.add_argument("--value", type=int, default=0, help="设置的加点值 N")
+    p_bulk.add_argument("--out-dir", help="输出目录（不指定则写回原文件）")
+    args = parser.parse_args(argv)
+
+    if args.command == "bulk" and args.rule != "reset_default" and not args.attr:
+        parser.error(f"规则 {args.rule} 需要 --attr")
+    if args.perf or args.perf_out:
+        # 写入环境变量让新启动的工作进程也按同样的设置记录
+        os.environ[PERF_ENV] = args.perf or os.environ.get(PERF_ENV) or "on"
+        if args.perf_out:
+            os.environ[PERF_OUT_ENV] = os.path.abspath(args.perf_out)
+        PERF.configure(os.environ[PERF_ENV], os.environ.get(PERF_OUT_ENV))
+    out_dir = getattr(args, "out_dir", None)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    options = {"sheet": args.sheet, "out_dir": out_dir}
+    if args.command == "bulk":
+        options.update(rule=args.rule, attr=args.attr, value=args.value)
+
+    start = time.perf_counter()
+    results = run_batch(args.command, args.files, workers=args.workers, **options)
+    if len(args.files) <= 1 or args.workers == 1:
+        for r in results:
+            _print_result(args.command, r)
+    if args.summary:
+        write_summary([r for r in results if not r["error"]], args.summary)
+        print(f"汇总已写入：{args.summary}")
+    failed = sum(1 for r in results if r["error"])
+    print(f"共 {len(results)} 个文件，失败 {failed} 个，耗时 {time.perf_counter() - start:.2f} 秒")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1206 @@
+"""
+属性加点的数据处理部分（不依赖 Qt）：读取 hero 表、计算 base/加点、编辑/撤销、写回与满红导出。
+界面见 attributeAdd.py，命令行批处理见 attributeBatch.py。
+"""
+from __future__ import annotations
+
+import os
+import sys
+import json
+import threading
+import time
+import importlib.util
+from collections import OrderedDict, deque
+from typing import Optional, Union, Dict, List, Callable, Tuple
+import numpy as np
+
+from perfTrace import PerfTrace
+
+def _lazy_import(name: str):
+    """
+    延迟导入：模块对象立即可用，首次访问其属性时才真正执行导入。
+    pandas 导入耗时占启动的大头，窗口显示时并不需要它。
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"未安装 {name}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+pd = _lazy_import("pandas")
+
+# 延迟模块的真正加载在锁内进行：后台预加载线程与加载文件的工作线程可能同时触发
+_PRELOAD_LOCK = threading.Lock()
+
+def _ensure_data_modules():
+    """确保 pandas/openpyxl 已真正导入（打开文件前调用；已导入时几乎无开销）"""
+    with _PRELOAD_LOCK:
+        pd.DataFrame  # 访问属性触发延迟导入
+        try:
+            import openpyxl  # noqa: F401
+        except Exception:
+            pass
+
+# 设置环境变量 PERF_TRACE 时记录读取/计算/编辑/保存/导出各阶段耗时（输出方式见 perfTrace.py），
+# 由界面退出或批处理的每个文件结束时调用 PERF.emit() 输出
+PERF = PerfTrace.from_env("attributeHandler")
+
+# ---------------- CONFIG: 在这里修改要操作的字段与映射 ----------------
+# 逻辑名称（界面显示使用）
+ATTRS = ["武力", "智力", "政治", "魅力", "防御", "速度"]
+
+# 映射到 Excel 表头（header=1 时使用第二行作为列名）。
+# 每个键为逻辑名，value/init/growth 指向 Excel 中实际列名。
+ATTR_COL_MAP = {
+    "武力": {"value": "武力", "init": "武力初始", "growth": "武力成长"},
+    "智力": {"value": "智力", "init": "智力初始", "growth": "智力成长"},
+    "政治": {"value": "政治", "init": "政治初始", "growth": "政治成长"},
+    "魅力": {"value": "魅力", "init": "魅力初始", "growth": "魅力成长"},
+    "防御": {"value": "防御", "init": "防御初始", "growth": "防御成长"},
+    "速度": {"value": "速度", "init": "速度初始", "growth": "速度成长"},
+}
+
+# 全局后备后缀（如果 ATTR_COL_MAP 未提供某项，则使用后缀策略）
+INIT_SUFFIX = "初始"
+GROWTH_SUFFIX = "成长"
+DEFAULT_ADD_VALUE = 50
+GROWTH_MULT = 49
+# -------------------------------------------------------------------
+
+# 进度回调：report(百分比, 说明)；回调可抛出 OperationCancelled 以中止操作
+ProgressCallback = Callable[[int, str], None]
+
+class OperationCancelled(Exception):
+    """后台任务被用户取消"""
+
+def _no_progress(percent: int, message: str = ""):
+    pass
+
+def _excel_value(val):
+    """DataFrame 单元格值 -> openpyxl 可写入的值（缺失为空，numpy 数值转为 Python 数值）"""
+    try:
+        if pd.isna(val):
+            return None
+        if isinstance(val, (bool, np.bool_)):
+            return bool(val)
+        if isinstance(val, (int, np.integer)):
+            return int(val)
+        if isinstance(val, (float, np.floating)):
+            return float(val)
+    except (TypeError, ValueError):
+        pass
+    return val
+
+def _normalize_ids(ids: pd.Series) -> pd.Series:
+    """ID 列 -> 字符串：数值与纯数字字符串规范为整数形式（12.0 -> "12"），缺失 ID 为空串"""
+    if pd.api.types.is_numeric_dtype(ids):
+        out = pd.Series("", index=ids.index, dtype=object)
+        valid = ids.notna()
+        out[valid] = ids[valid].astype("int64").astype(str)
+        return out
+
+    def one(v):
+        if v is None or (isinstance(v, float) and np.isnan(v)):
+            return ""
+        try:
+            if isinstance(v, (int, float, np.integer, np.floating)):
+                return str(int(float(v)))
+            if isinstance(v, str) and v.strip().isdigit():
+                return str(int(v.strip()))
+        except Exception:
+            pass
+        return str(v)
+    return ids.map(one).astype(object)
+
+HEADER_ROW_INDEX = 1  # 表头所在行（0 起算），与 read_excel(header=1) 一致
+
+def _typed_column(values: list, numeric: bool) -> pd.Series:
+    """单列原始值 -> 有类型列：数值列为 float64；其余列若全为整数值则用可空整数类型"""
+    s = pd.Series(values, dtype=object)
+    if numeric:
+        return pd.to_numeric(s, errors="coerce").astype(float)
+    present = s.notna()
+    nums = pd.to_numeric(s, errors="coerce")
+    if present.any() and (nums.notna() == present).all():
+        valid = nums[present]
+        if (valid % 1 == 0).all():
+            return nums.astype("Int64") if not present.all() else nums.astype("int64")
+        return nums
+    return s
+
+def _iter_sheet_rows(path: str, sheet_name: str):
+    """逐行产出工作表的值（空单元格为 None）；有 python-calamine 时用它，否则用 openpyxl 只读流式读取"""
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        CalamineWorkbook = None
+    if CalamineWorkbook is not None:
+        wb = CalamineWorkbook.from_path(path)
+        rows = wb.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False)
+        return "calamine", len(rows), ([None if v == "" else v for v in row] for row in rows)
+
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    if sheet_name not in wb.sheetnames:
+        wb.close()
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    ws = wb[sheet_name]
+
+    def gen():
+        try:
+            yield from ws.iter_rows(values_only=True)
+        finally:
+            wb.close()
+    return "openpyxl-readonly", ws.max_row or 0, gen()
+
+def _read_columns(path: str, sheet_name: str, wanted: List[str], numeric: set, report: ProgressCallback):
+    """
+    只取 wanted 中存在于表头的列，逐行读取后转为有类型的列（numeric 中的列为 float64）；
+    返回 (DataFrame, 读取方式, 每行在工作表中的行号)。缺少的列不报错，交给 _ensure_required_columns 统一检查。
+    """
+    engine, total, rows = _iter_sheet_rows(path, sheet_name)
+    header = None
+    picks: List[Tuple[str, int]] = []
+    data: Dict[str, list] = {}
+    last_nonempty = 0
+    for r, row in enumerate(rows):
+        if r < HEADER_ROW_INDEX:
+            continue
+        if r == HEADER_ROW_INDEX:
+            header = [None if h is None else str(h).strip() for h in row]
+            for name in wanted:
+                if name in header:
+                    picks.append((name, header.index(name)))
+            data = {name: [] for name, _ in picks}
+            continue
+        if r % 2000 == 0:
+            report(5 + 50 * r // max(total, 1), "读取数据")
+        width = len(row)
+        empty = True
+        for name, j in picks:
+            v = row[j] if j < width else None
+            data[name].append(v)
+            if v is not None:
+                empty = False
+        if not empty:
+            last_nonempty = len(data[picks[0][0]]) if picks else 0
+    if header is None:
+        raise ValueError("工作表缺少表头行")
+    # 与 read_excel 一致：去掉末尾的空行；数据行逐行对应，工作表行号（1 起算）= 表头行号 + 1 + 行位置
+    df = pd.DataFrame({name: _typed_column(vals[:last_nonempty], name in numeric) for name, vals in data.items()})
+    sheet_rows = np.arange(len(df), dtype=np.int64) + HEADER_ROW_INDEX + 2
+    return df, engine, sheet_rows
+
+class WorkbookSession:
+    """
+    源文件的 openpyxl 工作簿会话：整本工作簿只打开一次，缓存工作表、表头顺序、
+    表头 -> 列字母、ID -> 行号映射，供 save / export_full_red 复用。
+    每次使用前比对文件的 mtime/大小，只有文件在磁盘上被改动时才重新打开。
+    调用方在使用 wb/ws 期间需持有 lock（后台保存线程与界面线程可能共用同一会话）。
+    """
+    HEADER_ROW = 2  # header=1 对应工作表第2行
+
+    def __init__(self, path: str, sheet_name: str):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.lock = threading.RLock()
+        self.wb = None
+        self.ws = None
+        self.headers_in_order: List[Optional[str]] = []
+        self.header_map: Dict[str, str] = {}
+        self.id_row_map: Dict[str, int] = {}
+        self.id_col: Optional[int] = None
+        self._stamp = None
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def ensure(self) -> "WorkbookSession":
+        """确保工作簿已打开且与磁盘文件一致"""
+        stamp = self._file_stamp()
+        if self.wb is None or stamp != self._stamp:
+            with PERF.stage("open_workbook"):
+                self._open()
+            self._stamp = stamp
+        return self
+
+    def _open(self):
+        from openpyxl import load_workbook
+        from openpyxl.utils import column_index_from_string
+        wb = load_workbook(self.path)
+        sheet_name = self.sheet_name if self.sheet_name in wb.sheetnames else wb.sheetnames[0]
+        ws = wb[sheet_name]
+
+        # 读取表头顺序与 表头名 -> 列字母 映射（采用工作表现有表头，strip 处理）
+        headers_in_order = []
+        header_map = {}
+        for cell in ws[self.HEADER_ROW]:
+            name = None if cell.value is None else str(cell.value).strip()
+            headers_in_order.append(name)
+            if name is not None:
+                header_map[name] = cell.column_letter
+
+        # 定位 ID 列字母
+        id_col_letter = header_map.get("ID")
+        if not id_col_letter:
+            for k in header_map:
+                if str(k).strip().lower() == "id":
+                    id_col_letter = header_map[k]
+                    break
+        if not id_col_letter:
+            raise RuntimeError("工作表中未找到 ID 列，无法定位行以进行部分更新。")
+
+        # 构建 excel id -> 行号 映射（只扫描 ID 列一次）
+        id_row_map = {}
+        id_col_idx = column_index_from_string(id_col_letter)
+        id_cells = ws.iter_rows(min_row=self.HEADER_ROW + 1, max_row=ws.max_row,
+                                min_col=id_col_idx, max_col=id_col_idx, values_only=True)
+        for r, (val,) in enumerate(id_cells, start=self.HEADER_ROW + 1):
+            if val is None:
+                continue
+            id_row_map[str(val)] = r
+
+        self.wb, self.ws = wb, ws
+        self.headers_in_order = headers_in_order
+        self.header_map = header_map
+        self.id_row_map = id_row_map
+        self.id_col = id_col_idx
+
+    def save(self, out_path: str):
+        with PERF.stage("serialize"):
+            self.wb.save(out_path)
+        if os.path.abspath(out_path) == os.path.abspath(self.path):
+            # 内存中的工作簿就是刚写入的文件，更新时间戳避免下次误判为外部修改而重新打开
+            self._stamp = self._file_stamp()
+
+    def close(self):
+        """释放已打开的工作簿（等待正在使用的保存结束）；之后再 ensure() 会重新打开"""
+        with self.lock:
+            if self.wb is not None:
+                self.wb.close()
+            self.wb = self.ws = None
+            self.headers_in_order = []
+            self.header_map = {}
+            self.id_row_map = {}
+            self.id_col = None
+            self._stamp = None
+
+# 同时保持打开的工作簿会话上限（每个会话持有整本 openpyxl 工作簿，内存占用较大）
+WORKBOOK_CACHE_SIZE = 4
+
+class WorkbookCache:
+    """
+    按 (绝对路径, 工作表) 共享 WorkbookSession 的 LRU 缓存：多个标签页/快照打开同一文件时只解析一次，
+    超出上限时关闭最久未使用的会话。被淘汰的会话若仍被后台保存持有，close() 会等其释放锁后再关闭。
+    各标签页的 df 与 HeroAttrStore 由界面按同一上限管理（ExcelHandler.release/reload）。
+    """
+    def __init__(self, max_size: int = WORKBOOK_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[Tuple[str, str], WorkbookSession]" = OrderedDict()
+
+    def get(self, path: str, sheet_name: str) -> WorkbookSession:
+        key = (os.path.abspath(path), sheet_name)
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = WorkbookSession(path, sheet_name)
+                self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_size:
+                evicted.append(self._sessions.popitem(last=False)[1])
+        # 在缓存锁之外关闭，避免等待保存线程时阻塞其它标签页取会话
+        for old in evicted:
+            old.close()
+        return session
+
+    def discard(self, path: str):
+        """关闭并移除某个文件的全部会话（标签页关闭时调用）"""
+        key_path = os.path.abspath(path)
+        with self._lock:
+            keys = [k for k in self._sessions if k[0] == key_path]
+            sessions = [self._sessions.pop(k) for k in keys]
+        for session in sessions:
+            session.close()
+
+WORKBOOK_CACHE = WorkbookCache()
+
+# 默认加点目标在这些属性中按 base 最大值选取（并列时取靠前者）
+DEFAULT_TARGET_ATTRS = ["武力", "智力", "防御", "速度"]
+# 派生列名（界面/导出使用），实际数据存放在 HeroAttrStore 中而不是 df
+DERIVED_COLUMNS = ["add_sum", "is_default_add", "_default_target", "_default_target_attr"]
+
+# 批量加点规则：规则名 -> 界面显示名称（ExcelHandler.apply_bulk_rule）
+BULK_RULES = {
+    "reset_default": "非默认加点重置为默认",
+    "set_attr": "设置属性加点为 N",
+    "set_attr_if_max": "该属性 base 最高的英雄设置加点为 N",
+}
+
+class HeroAttrStore:
+    """
+    派生属性的紧凑数组存储，行与 handler.df 的行位置一一对应：
+    - base: float32 (n, len(ATTRS))，仅用于显示与比较；写回 Excel 的 value 按 float64 重新计算
+    - add: int32 (n, len(ATTRS))
+    - add_sum: int32 (n,)；target: int8 (n,)，默认加点属性在 ATTRS 中的下标，-1 表示无
+    - is_default: bool (n,)
+    数组只做原地更新，column() 返回的视图在编辑后仍然有效，可直接交给界面。
+    """
+    def __init__(self, base: np.ndarray, add: np.ndarray, target: np.ndarray):
+        n = len(add)
+        self.base = np.ascontiguousarray(base, dtype=np.float32)
+        self.add = np.ascontiguousarray(add, dtype=np.int32)
+        self.target = np.ascontiguousarray(target, dtype=np.int8)
+        self.add_sum = np.zeros(n, dtype=np.int32)
+        self.is_default = np.zeros(n, dtype=bool)
+        self.recompute()
+
+    def __len__(self):
+        return len(self.add)
+
+    def copy(self) -> "HeroAttrStore":
+        return HeroAttrStore(self.base.copy(), self.add.copy(), self.target.copy())
+
+    def recompute(self, rows=None):
+        """重新计算加点和与是否默认加点；rows 为 None 时整表，否则只算给定行位置"""
+        sel = slice(None) if rows is None else np.asarray(rows, dtype=np.intp)
+        add = self.add[sel]
+        target = self.target[sel]
+        self.add_sum[sel] = add.sum(axis=1)
+        expected = np.zeros_like(add)
+        has_target = target >= 0
+        expected[np.flatnonzero(has_target), target[has_target]] = int(DEFAULT_ADD_VALUE)
+        self.is_default[sel] = (add == expected).all(axis=1)
+
+    def target_attrs(self) -> np.ndarray:
+        """默认加点属性名（object 数组，无目标为 None）"""
+        names = np.array(list(ATTRS) + [None], dtype=object)
+        return names[np.where(self.target >= 0, self.target, len(ATTRS))]
+
+    def column(self, name: str) -> Optional[np.ndarray]:
+        """按 df 风格的列名取数组；add_/base_/add_sum/is_default_add 返回视图"""
+        if name.startswith("add_") and name[4:] in ATTRS:
+            return self.add[:, ATTRS.index(name[4:])]
+        if name.startswith("base_") and name[5:] in ATTRS:
+            return self.base[:, ATTRS.index(name[5:])]
+        if name == "add_sum":
+            return self.add_sum
+        if name == "is_default_add":
+            return self.is_default
+        if name == "_default_target_attr":
+            return self.target_attrs()
+        if name == "_default_target":
+            attrs = self.target_attrs()
+            return np.array([None if a is None else f"base_{a}" for a in attrs], dtype=object)
+        return None
+
+# 一次编辑影响的行数超过总行数的该比例时，整列重新 argsort，而不是逐行插回
+SORT_REBUILD_RATIO = 0.05
+
+class SortIndex:
+    """
+    表格排序的缓存：列名 -> 按 (值, df 行位置) 升序的行位置排列（稳定 argsort 的结果），以及由它得到的名次。
+    编辑只记下受影响的行，下次取该列排列时把这些行取出、按新值二分插回，不必整列重新排序；
+    ID/名称等源数据列不会被编辑，排列一直有效。
+    排列没有变化时 order() 返回同一对数组对象，界面据此判断行次序是否需要调整。
+    """
+    def __init__(self, handler: "ExcelHandler"):
+        self._handler = handler
+        self._perms: Dict[str, np.ndarray] = {}
+        self._stale: Dict[str, set] = {}
+        # (列名, 是否降序) -> (生成时的升序排列, 显示排列, 名次)
+        self._views: Dict[Tuple[str, bool], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def clear(self):
+        self._perms.clear()
+        self._stale.clear()
+        self._views.clear()
+
+    def _values(self, name: str) -> np.ndarray:
+        values = self._handler.column(name)
+        if values.dtype != object:
+            return values
+        # 文本/混合列：能整体转成数字就按数字排，否则按文本排
+        try:
+            return values.astype(np.float64)
+        except (TypeError, ValueError):
+            return values.astype(str)
+
+    def invalidate(self, rows):
+        """编辑后调用：派生列（add_*、加点和等）的已缓存排列中，这些行需要按新值重新定位"""
+        store = self._handler.store
+        for name in self._perms:
+            if store is not None and store.column(name) is not None:
+                self._stale.setdefault(name, set()).update(int(p) for p in rows)
+
+    def _ascending(self, name: str) -> np.ndarray:
+        perm = self._perms.get(name)
+        stale = self._stale.pop(name, None)
+        if perm is None or (stale and len(stale) > len(perm) * SORT_REBUILD_RATIO):
+            perm = np.argsort(self._values(name), kind="stable")
+        elif stale:
+            fixed = self._reinsert(perm, self._values(name), np.fromiter(stale, dtype=np.intp, count=len(stale)))
+            # 编辑没有改变次序时保留原数组，界面不必移动行
+            if not np.array_equal(fixed, perm):
+                perm = fixed
+        self._perms[name] = perm
+        return perm
+
+    @staticmethod
+    def _reinsert(perm: np.ndarray, values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """把 rows 从排列中取出，再按 (新值, 行位置) 插回；其余行的相对次序不变"""
+        rows = np.unique(rows)
+        keep = np.ones(len(perm), dtype=bool)
+        keep[rows] = False
+        kept = perm[keep[perm]]
+        kept_values = values[kept]
+        row_values = values[rows]
+        order = np.lexsort((rows, row_values))
+        rows, row_values = rows[order], row_values[order]
+        lo = np.searchsorted(kept_values, row_values, side="left")
+        hi = np.searchsorted(kept_values, row_values, side="right")
+        # 同值区间内按行位置升序，再二分一次确定位置
+        at = [a + int(np.searchsorted(kept[a:b], r)) for a, b, r in zip(lo.tolist(), hi.tolist(), rows.tolist())]
+        return np.insert(kept, at, rows)
+
+    def order(self, name: str, descending: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        返回 (rows, rank)：rows 为按该列排序后的 df 行位置，rank[pos] 为行位置 pos 在 rows 中的下标。
+        降序为升序排列的逆序（同值时行位置大的在前）。
+        """
+        base = self._ascending(name)
+        key = (name, descending)
+        cached = self._views.get(key)
+        if cached is not None and cached[0] is base:
+            return cached[1], cached[2]
+        rows = base[::-1] if descending else base
+        rank = np.empty(len(rows), dtype=np.intp)
+        rank[rows] = np.arange(len(rows))
+        self._views[key] = (base, rows, rank)
+        return rows, rank
+
+# 撤销栈保留的最大步数；恢复日志文件 = 源文件路径 + JOURNAL_SUFFIX
+JOURNAL_MAX_STEPS = 200
+JOURNAL_SUFFIX = ".journal"
+
+JournalCells = List[Tuple[int, str, int, int]]
+
+class EditJournal:
+    """
+    编辑日志：每次编辑（单行或批量）记录一组 (df 行位置, 列名, 旧值, 新值) 差异，
+    撤销/重做只重放这一组差异，开销与编辑规模成正比而与表大小无关。
+    log_path 不为空时，每组实际生效的差异追加写入 JSON Lines 文件（崩溃恢复日志）：
+    {"n": 序号, "cells": [[行, 列, 旧, 新], ...]}；保存到原文件后追加 {"saved": 序号}，
+    恢复时只重放最后一次保存之后的各组差异。
+    日志文件写不进去（只读目录、文件被占用等）时关闭日志并记下 log_error，编辑照常进行。
+    """
+    def __init__(self, log_path: Optional[str] = None, rows: int = 0, seq: int = 0):
+        self.log_path = log_path
+        self.rows = rows
+        # 最近一组写入日志的差异序号
+        self.seq = seq
+        # 日志写入失败的说明（界面提示一次后清空）
+        self.log_error: Optional[str] = None
+        self._undo: "deque[JournalCells]" = deque(maxlen=JOURNAL_MAX_STEPS)
+        self._redo: List[JournalCells] = []
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def record(self, cells: JournalCells):
+        """记录一组已经应用到数据上的差异"""
+        self._undo.append(cells)
+        self._redo.clear()
+        self._log(cells)
+
+    def undo(self, apply: Callable[[JournalCells], List[int]]) -> List[int]:
+        """
+        把最近一组差异的反向差异交给 apply 写回数据，成功后才移到重做栈并写日志；
+        apply 出错时撤销栈保持不变。返回 apply 的结果。
+        """
+        cells = self._undo[-1]
+        result = apply([(r, c, new, old) for r, c, old, new in reversed(cells)])
+        self._undo.pop()
+        self._redo.append(cells)
+        self._log([(r, c, new, old) for r, c, old, new in reversed(cells)])
+        return result
+
+    def redo(self, apply: Callable[[JournalCells], List[int]]) -> List[int]:
+        cells = self._redo[-1]
+        result = apply(cells)
+        self._redo.pop()
+        self._undo.append(cells)
+        self._log(cells)
+        return result
+
+    def _append(self, entries: List[Dict]):
+        """追加写入日志；失败时关闭日志（之后不再尝试），不影响编辑"""
+        try:
+            first = not os.path.exists(self.log_path)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                if first:
+                    f.write(json.dumps({"file": os.path.basename(self.log_path[:-len(JOURNAL_SUFFIX)]),
+                                        "rows": self.rows}, ensure_ascii=False) + "\n")
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+        except OSError as e:
+            self.log_error = f"恢复日志无法写入，本次编辑将不支持崩溃恢复：{e}"
+            print(self.log_error, file=sys.stderr)
+            self.log_path = None
+
+    def _log(self, cells: JournalCells):
+        self.seq += 1
+        if self.log_path:
+            self._append([{"n": self.seq, "cells": cells}])
+
+    def mark_saved(self, seq: int):
+        """序号 seq 及之前的差异已写入原文件；全部已保存时删除日志"""
+        if not self.log_path or not os.path.exists(self.log_path):
+            return
+        if seq >= self.seq:
+            self.discard()
+            return
+        self._append([{"saved": seq}])
+
+    def pending(self) -> List[JournalCells]:
+        """读取日志中最后一次保存之后的差异组（按写入顺序）；日志与当前数据行数不符时报错"""
+        if not self.log_path or not os.path.exists(self.log_path):
+            return []
+        groups: List[Tuple[int, JournalCells]] = []
+        saved = 0
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # 崩溃时最后一行可能不完整
+                if "rows" in entry and entry["rows"] != self.rows:
+                    raise RuntimeError("恢复日志与当前文件的行数不一致，无法恢复")
+                if "saved" in entry:
+                    saved = entry["saved"]
+                elif "n" in entry:
+                    groups.append((entry["n"], [tuple(c) for c in entry["cells"]]))
+        if groups:
+            self.seq = max(self.seq, groups[-1][0])
+        return [cells for n, cells in groups if n > saved]
+
+    def restore(self, groups: List[JournalCells]):
+        """恢复后的差异组放回撤销栈（不再写日志，日志中已有）"""
+        self._undo.extend(groups)
+        self._redo.clear()
+
+    def discard(self):
+        if self.log_path and os.path.isfile(self.log_path):
+            try:
+                os.remove(self.log_path)
+            except OSError:
+                pass
+
+class ExcelHandler:
+    def __init__(self):
+        # df 只保存工作表中的源数据列；base/add 等派生数据保存在 store 中
+        self.df: Optional[pd.DataFrame] = None
+        self.store: Optional[HeroAttrStore] = None
+        # 每个 df 行位置在源工作表中的行号（加载时记录；ID 可能重复，写回按位置而不是按 ID 定位）
+        self.sheet_rows: Optional[np.ndarray] = None
+        self.path: Optional[str] = None
+        self.sheet_name: str = "hero"
+        # 自加载/上次保存到原文件以来修改过的单元格：(df 行位置, 列名) -> 修改序号
+        self._dirty: Dict[Tuple[int, str], int] = {}
+        self._edit_seq = 0
+        # 保存成功后本次写回的修改（供界面把原处理器对应条目标记为已保存）
+        self._saved_dirty: Dict[Tuple[int, str], int] = {}
+        # 快照固定持有的工作簿会话；普通处理器为 None，按需从 WORKBOOK_CACHE 获取
+        self._session: Optional[WorkbookSession] = None
+        # 编辑日志（撤销/重做与崩溃恢复）；保存到原文件时写入的日志序号
+        self.journal = EditJournal()
+        self._saved_journal_seq: Optional[int] = None
+        # 最近一次加载的耗时（秒）与读取方式
+        self.load_seconds: Optional[float] = None
+        self.load_engine: Optional[str] = None
+        # 界面按列排序用的排列缓存，编辑时只标记受影响的行
+        self.sort_index = SortIndex(self)
+        # release() 释放了数据、等待 reload()；以及释放时源文件的 (修改时间, 大小)
+        self.released = False
+        self._released_stamp = None
+
+    def _col_names_for(self, attr: str):
+        m = ATTR_COL_MAP.get(attr, {})
+        value_col = m.get("value", attr)
+        init_col = m.get("init", f"{attr}{INIT_SUFFIX}")
+        growth_col = m.get("growth", f"{attr}{GROWTH_SUFFIX}")
+        return value_col, init_col, growth_col
+
+    def _numeric_columns(self) -> List[str]:
+        """各属性的 value/init/growth 列，以及文件中可能已有的 add_ 列"""
+        cols = []
+        for a in ATTRS:
+            cols += list(self._col_names_for(a))
+            cols.append(f"add_{a}")
+        return list(dict.fromkeys(cols))
+
+    def load(self, path: str, sheet_name: str = "hero", progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+        """
+        只读取界面和计算需要的列（流式只读，有 python-calamine 时优先使用）；
+        其余列的写回/满红导出通过 WorkbookSession 直接操作原工作表，不经过 df。
+        """
+        report = progress or _no_progress
+        self.path = path
+        self.sheet_name = sheet_name
+        report(0, f"读取 {os.path.basename(path)}")
+        start = time.perf_counter()
+        _ensure_data_modules()
+        try:
+            numeric = self._numeric_columns()
+            with PERF.stage("read"):
+                df, engine, sheet_rows = _read_columns(path, sheet_name, ["ID", "name"] + numeric, set(numeric), report)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"读取 Excel 失败: {e}")
+        report(60, "校验列")
+        self.df = df
+        self.sheet_rows = sheet_rows
+        self._dirty = {}
+        self._session = None
+        self.journal = EditJournal(path + JOURNAL_SUFFIX, rows=len(df))
+        self._ensure_required_columns()
+        report(70, "计算加点")
+        with PERF.stage("compute"):
+            self._compute_base_and_add()
+        self.load_seconds = time.perf_counter() - start
+        self.load_engine = engine
+        report(100, "加载完成")
+        return self.df
+
+    def release(self) -> bool:
+        """
+        释放 df/store 等数据（标签页不活跃时由界面调用），之后 reload() 重新读取。
+        有未保存的修改时不释放，返回 False。
+        """
+        if self.df is None or self._dirty:
+            return False
+        try:
+            st = os.stat(self.path)
+            self._released_stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            self._released_stamp = None
+        self.df = None
+        self.store = None
+        self.sheet_rows = None
+        self.sort_index.clear()
+        self.released = True
+        return True
+
+    def reload(self, progress: Optional[ProgressCallback] = None) -> pd.DataFrame:
+        """重新读取 release() 释放的数据；源文件期间未被改动时保留撤销/重做记录"""
+        journal, stamp = self.journal, self._released_stamp
+        df = self.load(self.path, self.sheet_name, progress)
+        st = os.stat(self.path)
+        if stamp == (st.st_mtime_ns, st.st_size):
+            self.journal = journal
+        else:
+            # 文件已在别处被改动，旧的撤销记录不再对应当前数据；释放时没有未保存的编辑，日志可直接删除
+            self.journal.discard()
+        self.released = False
+        self._released_stamp = None
+        return df
+
+    def _ensure_required_columns(self):
+        if self.df is None:
+            raise RuntimeError("数据未加载")
+        needed = ["ID", "name"]
+        for a in ATTRS:
+            v, init, grow = self._col_names_for(a)
+            needed += [v, init, grow]
+        needed = list(dict.fromkeys(needed))
+        missing = [c for c in needed if c not in self.df.columns]
+        if missing:
+            raise RuntimeError(f"缺少必要列: {missing}\n请在 attributeHandler.py 顶部的 ATTR_COL_MAP 中为对应属性指定实际列名（区分大小写）。")
+
+    def _base_series(self, attr: str, df: Optional[pd.DataFrame] = None) -> pd.Series:
+        """float64 的 base = 初始 + 成长 * GROWTH_MULT（缺失按 0）"""
+        df = self.df if df is None else df
+        _, init_col, growth_col = self._col_names_for(attr)
+        # 安全读取列，缺失时填 0
+        init_series = df[init_col].fillna(0).astype(float) if init_col in df.columns else 0.0
+        growth_series = df[growth_col].fillna(0).astype(float) if growth_col in df.columns else 0.0
+        return pd.Series(init_series + growth_series * GROWTH_MULT, index=df.index, dtype=float)
+
+    def _compute_base_and_add(self):
+        if self.df is None:
+            return
+        df = self.df
+        n = len(df)
+        base = np.zeros((n, len(ATTRS)), dtype=np.float64)
+        add = np.zeros((n, len(ATTRS)), dtype=np.int64)
+        for i, a in enumerate(ATTRS):
+            value_col = self._col_names_for(a)[0]
+            add_col = f"add_{a}"
+            base[:, i] = self._base_series(a).to_numpy()
+            # 先保留文件已有 add_ 列（若存在），否则用 value-base 计算；最终强制为 int
+            if add_col in df.columns:
+                add[:, i] = pd.to_numeric(df[add_col], errors="coerce").fillna(0).round(0).astype(int).to_numpy()
+            else:
+                value_series = df[value_col].fillna(0).astype(float) if value_col in df.columns else 0.0
+                add[:, i] = (value_series - base[:, i]).round(0).fillna(0).astype(int).to_numpy()
+
+        # 默认目标判断（保持原逻辑：按 float64 base 取最大，并列取靠前者）
+        group = [ATTRS.index(x) for x in DEFAULT_TARGET_ATTRS if x in ATTRS]
+        if group and n:
+            target = np.asarray(group)[base[:, group].argmax(axis=1)]
+        else:
+            target = np.full(n, -1)
+        self.store = HeroAttrStore(base, add, target)
+        self.sort_index.clear()
+
+    def has_column(self, name: str) -> bool:
+        if self.df is None:
+            return False
+        return name in self.df.columns or (self.store is not None and self.store.column(name) is not None)
+
+    def column(self, name: str) -> np.ndarray:
+        """派生列直接返回 store 中的数组视图，其余返回 df 列的数组"""
+        arr = self.store.column(name) if self.store is not None else None
+        if arr is not None:
+            return arr
+        return self.df[name].to_numpy()
+
+    def value_at(self, pos: int, name: str):
+        """单个单元格的值：源数据列取 df，派生列取 store（base_ 按 float64 重新计算）"""
+        if name in self.df.columns:
+            return self.df.iat[pos, self.df.columns.get_loc(name)]
+        if name.startswith("base_") and name[5:] in ATTRS:
+            return float(self._base_series(name[5:], self.df.iloc[[pos]]).iat[0])
+        return self.store.column(name)[pos]
+
+    def to_frame(self, rows: Optional[List[int]] = None) -> pd.DataFrame:
+        """df 源数据列 + base_/add_/加点和/默认目标等派生列的完整 DataFrame（拷贝，供导出与外部使用）"""
+        if self.df is None:
+            return pd.DataFrame()
+        sel = np.arange(len(self.df)) if rows is None else np.asarray(rows, dtype=np.intp)
+        out = self.df.iloc[sel].copy()
+        for a in ATTRS:
+            out[f"base_{a}"] = self._base_series(a).to_numpy()[sel]
+            out[f"add_{a}"] = self.store.column(f"add_{a}")[sel].astype(int)
+        for name in DERIVED_COLUMNS:
+            out[name] = self.store.column(name)[sel]
+        return out
+
+    def _find_row(self, key: Union[int, str]) -> Optional[int]:
+        mask_id = self.df["ID"].astype(str) == str(key)
+        if mask_id.any():
+            return int(np.argmax(mask_id.to_numpy()))
+        mask_name = self.df["name"].astype(str).str.contains(str(key), na=False)
+        if mask_name.any():
+            return int(np.argmax(mask_name.to_numpy()))
+        return None
+
+    def get_hero(self, key: Union[int, str]) -> Optional[pd.Series]:
+        if self.df is None:
+            return None
+        pos = self._find_row(key)
+        if pos is None:
+            return None
+        return self.to_frame([pos]).iloc[0]
+
+    def search_rows(self, term: str) -> List[int]:
+        """返回匹配行在 df 中的位置（升序），供界面直接引用数据而不拷贝"""
+        if self.df is None:
+            return []
+        t = str(term)
+        mask = self.df["name"].astype(str).str.contains(t, na=False) | (self.df["ID"].astype(str) == t)
+        return np.flatnonzero(mask.to_numpy()).tolist()
+
+    def search(self, term: str) -> pd.DataFrame:
+        if self.df is None:
+            return pd.DataFrame()
+        return self.to_frame(self.search_rows(term))
+
+    def update_add_points(self, id_or_name: Union[int, str], new_adds: Dict[str, float]):
+        if self.df is None:
+            raise RuntimeError("数据未加载")
+        pos = self._find_row(id_or_name)
+        if pos is None:
+            raise KeyError("未找到指定英雄")
+        self.update_add_points_at(pos, new_adds)
+
+    def update_add_points_at(self, pos: int, new_adds: Dict[str, float]):
+        """按 df 行位置修改加点（未给出的属性保持不变），与批量修改走同一路径并记入编辑日志"""
+        if self.df is None:
+            raise RuntimeError("数据未加载")
+        row = self.store.add[pos].copy()
+        for a, v in new_adds.items():
+            if a in ATTRS:
+                # 只把 add_* 存为整数
+                row[ATTRS.index(a)] = int(round(v))
+        self.set_add_points_bulk([pos], row[None, :])
+
+    def set_add_points_bulk(self, rows, adds: np.ndarray, record: bool = True) -> List[int]:
+        """
+        批量写入加点：rows 为 df 行位置，adds 为 (len(rows), len(ATTRS)) 的新加点矩阵。
+        按列整体更新 store / add_ 列 / value 列，只记录实际变化的单元格，最后只重算一次。
+        record 为 True 时把变化的 (行, add_ 列, 旧值, 新值) 作为一步写入编辑日志。
+        返回加点发生变化的行位置（升序）。
+        """
+        if self.df is None:
+            raise RuntimeError("数据未加载")
+        rows = np.asarray(rows, dtype=np.intp)
+        adds = np.rint(np.asarray(adds, dtype=np.float64)).astype(np.int32).reshape(len(rows), len(ATTRS))
+        changed = adds != self.store.add[rows]
+        row_changed = changed.any(axis=1)
+        if not row_changed.any():
+            return []
+        rows, adds, changed = rows[row_changed], adds[row_changed], changed[row_changed]
+        r_idx, a_idx = np.nonzero(changed)
+        old = self.store.add[rows[r_idx], a_idx]
+        self.store.add[rows] = adds
+        self._edit_seq += 1
+        sub = self.df.iloc[rows]
+        for i, a in enumerate(ATTRS):
+            hit = changed[:, i]
+            if not hit.any():
+                continue
+            pos = rows[hit]
+            add_col = f"add_{a}"
+            value_col = self._col_names_for(a)[0]
+            if add_col in self.df.columns:
+                self.df.iloc[pos, self.df.columns.get_loc(add_col)] = adds[hit, i]
+            # value = float64 base + 整数加点，与单行修改一致
+            if value_col in self.df.columns:
+                base = self._base_series(a, sub).to_numpy()[hit]
+                self.df.iloc[pos, self.df.columns.get_loc(value_col)] = base + adds[hit, i].astype(np.float64)
+            for c in (add_col, value_col):
+                self._dirty.update(dict.fromkeys(((int(p), c) for p in pos), self._edit_seq))
+        for c in ("add_sum", "is_default_add"):
+            self._dirty.update(dict.fromkeys(((int(p), c) for p in rows), self._edit_seq))
+        self.store.recompute(rows)
+        self.sort_index.invalidate(rows)
+        # 数据全部更新后才记入撤销栈与日志，中途出错不会留下没有生效的一步
+        if record:
+            self.journal.record([(int(rows[r]), f"add_{ATTRS[i]}", int(o), int(adds[r, i]))
+                                 for r, i, o in zip(r_idx, a_idx, old)])
+        return rows.tolist()
+
+    def apply_bulk_rule(self, rule: str, rows=None, attr: Optional[str] = None, value: int = 0) -> List[int]:
+        """
+        对 rows（默认全部英雄）按规则批量改加点，见 BULK_RULES：
+        - reset_default：非默认加点的英雄重置为默认（目标属性 DEFAULT_ADD_VALUE，其余 0）
+        - set_attr：把 attr 的加点设为 value
+        - set_attr_if_max：只对 attr 的 base 在全部 ATTRS 中最高（并列取靠前者）的英雄把 attr 的加点设为 value
+        返回加点发生变化的行位置。
+        """
+        if self.df is None:
+            raise RuntimeError("数据未加载")
+        if rule not in BULK_RULES:
+            raise ValueError(f"未知的批量规则: {rule}")
+        rows = np.arange(len(self.store)) if rows is None else np.unique(np.asarray(rows, dtype=np.intp))
+        adds = self.store.add[rows].copy()
+        if rule == "reset_default":
+            rows, adds = rows[~self.store.is_default[rows]], adds[~self.store.is_default[rows]]
+            target = self.store.target[rows]
+            adds[:] = 0
+            has_target = target >= 0
+            adds[np.flatnonzero(has_target), target[has_target]] = int(DEFAULT_ADD_VALUE)
+        else:
+            if attr not in ATTRS:
+                raise ValueError(f"未知属性: {attr}")
+            i = ATTRS.index(attr)
+            if rule == "set_attr_if_max":
+                # 不能用默认目标 target：它只在 DEFAULT_TARGET_ATTRS 中比较，政治/魅力永远不会命中
+                base = np.column_stack([self._base_series(a).to_numpy()[rows] for a in ATTRS])
+                keep = base.argmax(axis=1) == i
+                rows, adds = rows[keep], adds[keep]
+            adds[:, i] = int(value)
+        with PERF.stage("bulk_edit"):
+            return self.set_add_points_bulk(rows, adds)
+
+    def _apply_cells(self, cells: JournalCells) -> List[int]:
+        """把一组 (行, add_ 列, 旧, 新) 差异写回（不再记录日志），返回变化的行位置"""
+        rows = np.unique(np.fromiter((c[0] for c in cells), dtype=np.intp, count=len(cells)))
+        adds = self.store.add[rows].copy()
+        at = {int(p): i for i, p in enumerate(rows)}
+        for pos, col, _old, new in cells:
+            adds[at[pos], ATTRS.index(col[4:])] = new
+        return self.set_add_points_bulk(rows, adds, record=False)
+
+    def undo(self) -> List[int]:
+        """撤销最近一步编辑，返回受影响的行位置"""
+        if self.df is None or not self.journal.can_undo():
+            return []
+        return self.journal.undo(self._apply_cells)
+
+    def redo(self) -> List[int]:
+        if self.df is None or not self.journal.can_redo():
+            return []
+        return self.journal.redo(self._apply_cells)
+
+    def pending_recovery(self) -> List[JournalCells]:
+        """源文件旁的恢复日志中尚未保存的编辑（没有则为空）"""
+        if self.df is None:
+            return []
+        return self.journal.pending()
+
+    def recover(self, groups: List[JournalCells]) -> List[int]:
+        """
+        重放恢复日志中的编辑；每个单元格的旧值须与当前数据一致（文件未在别处被改动），
+        否则报错且不做任何修改。恢复的各步可继续撤销。
+        """
+        # 先在加点矩阵的副本上校验整条日志，全部一致后再真正应用
+        sim = self.store.add.copy()
+        for cells in groups:
+            for pos, col, old, new in cells:
+                if not (0 <= pos < len(sim)) or col[4:] not in ATTRS or sim[pos, ATTRS.index(col[4:])] != old:
+                    raise RuntimeError("恢复日志与当前文件不一致，无法恢复")
+                sim[pos, ATTRS.index(col[4:])] = new
+        touched: List[int] = []
+        for cells in groups:
+            touched += self._apply_cells(cells)
+        self.journal.restore(groups)
+        return sorted(set(touched))
+
+    def mark_saved(self, snap: "ExcelHandler"):
+        """快照保存到原文件成功后调用：清除保存期间未再次修改的单元格记录"""
+        for key, seq in snap._saved_dirty.items():
+            if self._dirty.get(key) == seq:
+                del self._dirty[key]
+        if snap._saved_journal_seq is not None:
+            self.journal.mark_saved(snap._saved_journal_seq)
+
+    def snapshot(self) -> "ExcelHandler":
+        """
+        复制一份只供后台保存/导出使用的处理器：df 为独立拷贝，
+        后台线程写文件期间界面继续编辑 self.df 不会影响正在保存的内容。
+        """
+        snap = ExcelHandler()
+        snap.path = self.path
+        snap.sheet_name = self.sheet_name
+        snap.df = None if self.df is None else self.df.copy()
+        snap.store = None if self.store is None else self.store.copy()
+        snap.sheet_rows = self.sheet_rows
+        snap._dirty = dict(self._dirty)
+        # 快照只携带日志序号（不写日志文件），保存成功后由 mark_saved 记入原处理器的日志
+        snap.journal = EditJournal(seq=self.journal.seq)
+        snap._session = self._workbook_session() if self.path else None
+        return snap
+
+    def _workbook_session(self) -> WorkbookSession:
+        # 快照固定持有创建时的会话，保存期间不受 LRU 淘汰影响；其余情况从共享缓存获取
+        if self._session is not None:
+            return self._session
+        return WORKBOOK_CACHE.get(self.path, self.sheet_name)
+
+    def _sheet_rows_for(self, session: WorkbookSession, positions: np.ndarray) -> np.ndarray:
+        """
+        df 行位置 -> 工作表行号，按加载时记录的行号定位（重复 ID 的各行互不混淆）。
+        该行的 ID 与 df 不一致（文件在别处被改动、行号已失效）时退回按 ID 查找，仍找不到为 0。
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        ids = _normalize_ids(self.df["ID"].iloc[positions]).to_numpy()
+        if self.sheet_rows is None:
+            rows = np.zeros(len(positions), dtype=np.int64)
+            stale = np.arange(len(positions))
+        else:
+            rows = self.sheet_rows[positions].copy()
+            ws = session.ws
+            cells = [ws.cell(int(r), session.id_col).value if r <= ws.max_row else None for r in rows]
+            stale = np.flatnonzero(_normalize_ids(pd.Series(cells, dtype=object)).to_numpy() != ids)
+        for i in stale:
+            rows[i] = session.id_row_map.get(ids[i], 0)
+        return rows
+
+    def save(self, out_path: str, progress: Optional[ProgressCallback] = None):
+        if self.df is None:
+            raise RuntimeError("数据未加载")
+        report = progress or _no_progress
+        # 若没有原始文件路径，退回 pandas 全表保存（写入第二行作为 header）
+        if not self.path:
+            try:
+                self.to_frame().to_excel(out_path, index=False, engine="openpyxl")
+            except Exception as e:
+                raise RuntimeError(f"保存 Excel 失败: {e}")
+            return
+        try:
+            import openpyxl  # noqa: F401
+        except Exception:
+            try:
+                self.to_frame().to_excel(out_path, index=False, engine="openpyxl")
+            except Exception as e2:
+                raise RuntimeError(f"保存 Excel 失败（openpyxl 未安装且 pandas 导出失败）: {e2}")
+            return
+
+        report(0, "打开工作簿")
+        session = self._workbook_session()
+        with session.lock, PERF.stage("save"):
+            self._write_dirty(session, out_path, report)
+
+    def _write_dirty(self, session: WorkbookSession, out_path: str, report: ProgressCallback):
+        session.ensure()
+        ws = session.ws
+        header_map = session.header_map
+        report(40, "写回修改")
+
+        # 只写回自加载/上次保存以来修改过的单元格，按行分组后按加载时记录的工作表行号定位
+        dirty = dict(self._dirty)
+        by_row: Dict[int, List[str]] = {}
+        for pos, col in dirty:
+            by_row.setdefault(pos, []).append(col)
+        excel_rows = dict(zip(by_row, self._sheet_rows_for(session, list(by_row)).tolist()))
+        to_source = os.path.abspath(out_path) == os.path.abspath(self.path)
+        # 会话中的工作簿被各次保存/导出共用，必须始终与源文件一致：
+        # 记下被覆盖单元格的原值，除非成功写回了源文件，否则写出后恢复（与满红导出删除追加行同理）
+        overwritten = []
+        saved = False
+        try:
+            total = max(len(by_row), 1)
+            for n, (pos, cols) in enumerate(by_row.items()):
+                if n % 500 == 0:
+                    report(40 + 40 * n // total, "写回修改")
+                excel_row = excel_rows[pos]
+                if not excel_row:
+                    # 如果该行在原表找不到，跳过（避免新增乱位）
+                    continue
+                for hname in cols:
+                    col_letter = header_map.get(hname)
+                    # 仅当工作表与数据中都存在该列才写回（这样不会破坏工作表中额外的列）
+                    if col_letter is None or not self.has_column(hname):
+                        continue
+                    cell = ws[f"{col_letter}{excel_row}"]
+                    overwritten.append((cell, cell.value))
+                    cell.value = _excel_value(self.value_at(pos, hname))
+
+            report(80, "写入文件")
+            try:
+                session.save(out_path)
+            except Exception as e:
+                raise RuntimeError(f"保存 Excel 失败: {e}")
+            saved = True
+        finally:
+            if not (saved and to_source):
+                for cell, value in reversed(overwritten):
+                    cell.value = value
+        if to_source:
+            # 原文件已包含这些修改；另存为其他文件时原文件未变，修改记录保留
+            self._saved_dirty = dirty
+            for key, seq in dirty.items():
+                if self._dirty.get(key) == seq:
+                    del self._dirty[key]
+            self._saved_journal_seq = self.journal.seq
+            self.journal.mark_saved(self.journal.seq)
+        report(100, "保存完成")
+
+    def export_full_red(self, out_path: str, progress: Optional[ProgressCallback] = None):
+        if self.df is None:
+            raise RuntimeError("数据未加载")
+        report = progress or _no_progress
+        if not self.path:
+            raise RuntimeError("需要原始文件路径才能做部分插入保存")
+
+        try:
+            import openpyxl  # noqa: F401
+        except Exception:
+            raise RuntimeError("export_full_red 需要 openpyxl，可通过 pip install openpyxl 安装")
+
+        report(0, "打开工作簿")
+        session = self._workbook_session()
+        with session.lock, PERF.stage("export"):
+            try:
+                session.ensure()
+            except RuntimeError:
+                raise RuntimeError("未找到 ID 列，无法执行满红导出")
+            self._append_full_red(session, out_path, report)
+
+    def _append_full_red(self, session: WorkbookSession, out_path: str, report: ProgressCallback):
+        ws = session.ws
+        header_row = session.HEADER_ROW
+        headers_in_order = session.headers_in_order
+        report(40, "生成满红行")
+
+        df = self.df
+        # 新 ID：3 位 -> 50xxx，2 位 -> 500xx，其余位数跳过
+        id_str = _normalize_ids(df["ID"])
+        id_len = id_str.str.len()
+        keep = (id_len == 3) | (id_len == 2)
+        keep_pos = np.flatnonzero(keep.to_numpy())
+        df = df.iloc[keep_pos]
+        id_str = id_str[keep]
+        new_ids = np.where(id_len[keep] == 3, "50" + id_str, "500" + id_str)
+
+        # 一次性读出工作表数据区的原始值（保留单元格原类型），按各英雄自己的工作表行对齐（ID 重复时也不串行）
+        sheet_vals = pd.DataFrame(list(ws.iter_rows(min_row=header_row + 1, max_row=ws.max_row,
+                                                    max_col=len(headers_in_order), values_only=True)),
+                                  columns=range(len(headers_in_order)), dtype=object)
+        excel_rows = self._sheet_rows_for(session, keep_pos)
+        orig = sheet_vals.reindex(np.where(excel_rows > 0, excel_rows - header_row - 1, -1))
+        orig.index = df.index
+
+        # 表头 -> 角色（id / name / add / value / 其它）的一次性映射，代替逐列扫描 ATTRS
+        roles: Dict[str, Tuple[str, Optional[str]]] = {}
+        for a in ATTRS:
+            roles.setdefault(self._col_names_for(a)[0], ("value", a))
+        for a in ATTRS:
+            roles[f"add_{a}"] = ("add", a)
+        roles["name"] = ("name", None)
+        roles["ID"] = ("id", None)
+
+        # add_* 翻倍取整；value = base + 新加点（保持浮点，不转为 int）
+        adds = self.store.add[keep_pos].astype(np.int64) * 2
+        new_adds = {a: pd.Series(adds[:, i], index=df.index) for i, a in enumerate(ATTRS)}
+        report(60, "生成满红行")
+
+        out_cols = []
+        for j, hname in enumerate(headers_in_order):
+            if hname is None:
+                out_cols.append([None] * len(df))
+                continue
+            role, a = roles.get(hname, ("other", None))
+            if role == "id":
+                col = pd.Series(new_ids, index=df.index)
+            elif role == "name":
+                orig_name = orig[j].where(orig[j].notna(), df["name"])
+                col = orig_name.astype(str) + "(满红)"
+            elif role == "add":
+                col = new_adds[a]
+            elif role == "value":
+                col = self._base_series(a, df) + new_adds[a]
+            else:
+                # 其它列：原样取该英雄自己那一行的单元格值（不改变类型）；df 只含读取的几列，不能作为后备
+                col = orig[j]
+            col = col.astype(object)
+            out_cols.append(col.where(col.notna(), None).tolist())
+
+        # 新行整行追加到表末尾（保持 header 行在第 header_row）；
+        # 会话中的工作簿会被后续保存复用，写出后删除追加的行
+        append_at = ws.max_row + 1
+        try:
+            for row in zip(*out_cols):
+                ws.append(row)
+            # 保存为 out_path
+            report(80, "写入文件")
+            try:
+                session.save(out_path)
+            except Exception as e:
+                raise RuntimeError(f"满红导出保存失败: {e}")
+        finally:
+            if os.path.abspath(out_path) == os.path.abspath(session.path):
+                # 导出覆盖了源文件：磁盘上已含满红行，删掉追加行的内存工作簿会在下次保存时把它们覆盖掉，
+                # 因此直接关闭会话，下次使用时从磁盘重新打开
+                session.close()
+            elif ws.max_row >= append_at:
+                ws.delete_rows(append_at, ws.max_row - append_at + 1)
+        report(100, "导出完成")
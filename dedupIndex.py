@@ -0,0 +1,333 @@
+"""
+去重脚本共用的数据结构：
+- KSubsetIndex：把每个已保留行的 k 个值组合（不计顺序）哈希到行号，
+  查询“与当前行至少有 k 个相同值的已保留行”时只需查 C(n, k) 个键，而不是扫描全部已保留行。
+- KeyPacker / CounterStore：值组合编码成整数键的计数表，超出内存预算时可落到临时 SQLite 文件。
+- run_components：按值的连通分量拆分输入，在多个进程中并行做贪心去重。
+- 检查点：保存去重状态，输入只在末尾追加新行时下次只处理新增的行。
+"""
+import os
+import pickle
+import hashlib
+import numbers
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+def distinct_values(values: Iterable[Hashable]) -> List[Hashable]:
+    """去掉重复值并保持原顺序（共同值按集合计算，与 set(row) & set(other) 一致）"""
+    return list(dict.fromkeys(values))
+
+
+class KSubsetIndex:
+    """k 元子集 -> 已保留行号列表"""
+
+    def __init__(self, k: int):
+        if k < 1:
+            raise ValueError("k 必须 >= 1")
+        self.k = k
+        self._index: Dict[FrozenSet[Hashable], List[int]] = {}
+
+    def keys(self, values: Iterable[Hashable]):
+        """当前行全部 k 元子集的规范键（frozenset，与列的先后位置无关）"""
+        return (frozenset(c) for c in combinations(distinct_values(values), self.k))
+
+    def add(self, row_id: int, values: Iterable[Hashable]):
+        for key in self.keys(values):
+            self._index.setdefault(key, []).append(row_id)
+
+    def candidates(self, values: Iterable[Hashable], limit: Optional[int] = None) -> Set[int]:
+        """
+        与 values 至少有 k 个相同值的已保留行号集合。
+        limit 不为空时找到 limit 个即停止（只需判断是否达到上限的场景）。
+        """
+        found: Set[int] = set()
+        for key in self.keys(values):
+            rows = self._index.get(key)
+            if not rows:
+                continue
+            found.update(rows)
+            if limit is not None and len(found) >= limit:
+                break
+        return found
+
+
+# ---------------- 可落盘的计数状态 ----------------
+# 内存中每个计数条目的大致开销（字节，含 dict 槽位与 int 对象），用于把内存预算换算成条目数
+COUNTER_ENTRY_BYTES = 120
+
+
+def value_sort_key(value: Hashable):
+    """
+    跨行排序用的键：数值（int/float/bool 及 numpy 数值）一组、按数值大小比较，其余按类型名分组。
+    同一行内能直接 sorted() 的值，按此键得到的顺序与 sorted() 相同；不同行的数字与文本混在一起也不会报错。
+    """
+    if isinstance(value, numbers.Real):
+        return 0, "", value
+    return 1, type(value).__name__, value
+
+
+class KeyPacker:
+    """
+    把去重列的值映射为整数编码，再把 m 个编码打包成一个整数键。
+    编码按值排序（value_sort_key）后的名次分配，因此编码的大小顺序与原值一致，
+    对编码排序、取组合得到的顺序与对每行原值排序完全相同。
+    ordered=False 时按首次出现顺序编码（只需判断相等、值之间不可比较大小时使用）；
+    同类型的值之间也无法比较大小时同样退回首次出现顺序。
+    """
+
+    def __init__(self, values: Iterable[Hashable], ordered: bool = True):
+        values = list(dict.fromkeys(values))
+        if ordered:
+            try:
+                values.sort(key=value_sort_key)
+            except TypeError:
+                pass
+        self.values = values
+        self.codes = {v: i for i, v in enumerate(self.values)}
+        self.base = len(self.values) + 1
+
+    def encode(self, values: Iterable[Hashable]) -> List[int]:
+        return [self.codes[v] for v in values]
+
+    def decode(self, codes: Iterable[int]) -> List[Hashable]:
+        return [self.values[c] for c in codes]
+
+    def pack(self, codes: Iterable[int]) -> int:
+        """编码元组 -> 整数键（各位 +1，避免前导 0 造成不同长度的元组冲突）"""
+        key = 0
+        for c in codes:
+            key = key * self.base + c + 1
+        return key
+
+    def unpack(self, key: int, m: int) -> List[int]:
+        """pack 的逆运算：整数键 -> m 个编码"""
+        codes = []
+        for _ in range(m):
+            key, digit = divmod(key, self.base)
+            codes.append(digit - 1)
+        return codes[::-1]
+
+
+class CounterStore:
+    """整数键 -> 计数 的内存实现（dict）"""
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+
+    def get(self, key: int) -> int:
+        return self._counts.get(key, 0)
+
+    def set(self, key: int, value: int):
+        self._counts[key] = value
+
+    def __contains__(self, key: int) -> bool:
+        return self.get(key) > 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        return iter(list(self._counts.items()))
+
+    def close(self):
+        self._counts = {}
+
+
+class SpillCounterStore(CounterStore):
+    """
+    内存条目数超过 max_entries 时把全部计数写入临时 SQLite 文件并清空内存，
+    之后未命中内存的键从 SQLite 读取并放回内存。内存中的值总是最新值，写出时直接覆盖。
+    """
+
+    def __init__(self, max_entries: int, spill_dir: Optional[str] = None):
+        super().__init__()
+        self.max_entries = max(1, int(max_entries))
+        fd, self.path = tempfile.mkstemp(prefix="dedup_", suffix=".sqlite", dir=spill_dir)
+        os.close(fd)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE counts (key PRIMARY KEY, value INTEGER) WITHOUT ROWID")
+        self._spilled = 0  # 已写入 SQLite 的条目数（0 时不必查库）
+        self.spills = 0
+
+    @staticmethod
+    def _db_key(key: int):
+        # SQLite 整数最多 64 位，更大的打包键按字节串存储
+        return key if key < (1 << 63) else key.to_bytes((key.bit_length() + 7) // 8, "big")
+
+    def get(self, key: int) -> int:
+        value = self._counts.get(key)
+        if value is not None:
+            return value
+        if not self._spilled:
+            return 0
+        row = self._db.execute("SELECT value FROM counts WHERE key = ?", (self._db_key(key),)).fetchone()
+        if row is None:
+            return 0
+        self._counts[key] = row[0]
+        return row[0]
+
+    def set(self, key: int, value: int):
+        self._counts[key] = value
+        if len(self._counts) > self.max_entries:
+            self._spill()
+
+    def _spill(self):
+        self._db.executemany("INSERT OR REPLACE INTO counts (key, value) VALUES (?, ?)",
+                             ((self._db_key(k), v) for k, v in self._counts.items()))
+        self._db.commit()
+        self._spilled = self._db.execute("SELECT COUNT(*) FROM counts").fetchone()[0]
+        self._counts = {}
+        self.spills += 1
+
+    def __len__(self) -> int:
+        # 近似值：内存与磁盘中可能有重复的键
+        return len(self._counts) + self._spilled
+
+    def items(self) -> Iterator[Tuple[int, int]]:
+        # 先把内存中的最新值写入 SQLite，再从库中逐条读出
+        if self._counts:
+            self._spill()
+        for key, value in self._db.execute("SELECT key, value FROM counts"):
+            yield (int.from_bytes(key, "big") if isinstance(key, bytes) else key), value
+
+    def close(self):
+        super().close()
+        self._db.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def make_counter_store(memory_budget_mb: Optional[float] = None, spill_dir: Optional[str] = None,
+                       share: float = 1.0) -> CounterStore:
+    """
+    memory_budget_mb 为空时使用纯内存计数；否则按 share 比例的预算换算内存条目上限，超出部分落盘。
+    """
+    if memory_budget_mb is None:
+        return CounterStore()
+    max_entries = memory_budget_mb * share * 1024 * 1024 / COUNTER_ENTRY_BYTES
+    return SpillCounterStore(max_entries, spill_dir=spill_dir)
+
+
+# ---------------- 连通分量并行 ----------------
+# 行数少于该值时不启动子进程（进程启动与数据传输的开销大于收益）
+PARALLEL_MIN_ROWS = 20000
+
+
+def connected_components(code_rows: np.ndarray) -> np.ndarray:
+    """
+    按值做并查集：同一行的值相连，共享任意值的行属于同一分量。
+    返回每行的分量编号（分量根的值编码）。不同分量的行没有共同值，贪心去重时互不影响。
+    """
+    parent = list(range(int(code_rows.max()) + 1 if code_rows.size else 0))
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for row in code_rows.tolist():
+        first = find(row[0])
+        for c in row[1:]:
+            other = find(c)
+            if other != first:
+                parent[other] = first
+    roots = np.array([find(c) for c in range(len(parent))], dtype=np.int64)
+    return roots[code_rows[:, 0]] if len(code_rows) else np.zeros(0, dtype=np.int64)
+
+
+def _component_batches(labels: np.ndarray, batches: int) -> List[np.ndarray]:
+    """把分量按行数从大到小依次分给当前最小的批次；批次内的行保持原始顺序"""
+    comp, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    loads = [0] * batches
+    owner = np.empty(len(comp), dtype=np.int64)
+    for c in np.argsort(-sizes, kind="stable"):
+        b = loads.index(min(loads))
+        owner[c] = b
+        loads[b] += sizes[c]
+    row_batch = owner[inverse]
+    return [np.flatnonzero(row_batch == b) for b in range(batches) if loads[b]]
+
+
+def run_components(keep_func: Callable[..., np.ndarray], code_rows: np.ndarray, workers: Optional[int] = None,
+                   **kwargs) -> np.ndarray:
+    """
+    把输入按连通分量拆成互不相关的批次，在工作进程中分别执行 keep_func(批次行, **kwargs)（返回保留掩码），
+    再按原始行位置合并。每个分量内的行顺序不变，结果与整体顺序执行完全相同。
+    keep_func 需是模块级函数（可被子进程导入）。workers 为 1、行数较少或只有一个分量时直接在本进程执行。
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(code_rows) < PARALLEL_MIN_ROWS:
+        return keep_func(code_rows, **kwargs)
+    labels = connected_components(code_rows)
+    batches = _component_batches(labels, workers * 4)
+    if len(batches) <= 1:
+        return keep_func(code_rows, **kwargs)
+    keep = np.zeros(len(code_rows), dtype=bool)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(keep_func, code_rows[rows], **kwargs): rows for rows in batches}
+        for fut in as_completed(futures):
+            keep[futures[fut]] = fut.result()
+    return keep
+
+
+# ---------------- 增量检查点 ----------------
+CHECKPOINT_VERSION = 1
+
+
+def frame_digest(df) -> str:
+    """DataFrame 内容（列名、行标签与各单元格）的摘要，用于确认检查点之后历史行未被改动"""
+    import pandas as pd
+    h = hashlib.sha1(repr([str(c) for c in df.columns]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def load_checkpoint(path: Optional[str], params: Dict) -> Optional[Dict]:
+    """读取检查点；文件不存在、无法读取或去重参数不一致时返回 None（调用方从头处理）"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except Exception as e:
+        print(f"检查点无法读取，将从头处理：{e}")
+        return None
+    if state.get("version") != CHECKPOINT_VERSION or state.get("params") != params:
+        print("检查点的去重参数与本次不同，将从头处理")
+        return None
+    return state
+
+
+def resume_row(state: Optional[Dict], df) -> int:
+    """
+    检查点之后可以接着处理的起始行：df 的前 rows_done 行与检查点记录的内容一致时返回 rows_done，
+    否则（历史行被修改、删除或重排）返回 0。
+    """
+    if not state:
+        return 0
+    done = state["rows_done"]
+    if done > len(df) or frame_digest(df.iloc[:done]) != state["digest"]:
+        print("输入文件的历史行与检查点不一致，将从头处理")
+        return 0
+    return done
+
+
+def save_checkpoint(path: str, state: Dict):
+    """先写临时文件再替换，写入中途失败时旧检查点仍然完整"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(dict(state, version=CHECKPOINT_VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
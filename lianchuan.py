@@ -1,40 +1,142 @@
 # -*- coding: utf-8 -*-
+import os
+import numpy as np
 import pandas as pd
 import glob
 import re
 from functools import reduce
 
+from perfTrace import PerfTrace
+from tableIO import detect_format, read_table, table_columns
+
 # 定义一个函数，从文件名中提取数字，用于排序
 def extract_number(filename):
-    match = re.search(r'\d+', filename)  # 使用正则表达式匹配文件名中的数字
+    match = re.search(r'\d+', os.path.basename(filename))  # 使用正则表达式匹配文件名中的数字（不含目录）
     return int(match.group()) if match else float('inf')  # 如果匹配到数字，返回整数；否则返回正无穷大
 
 # 定义文件夹路径
 folder_path = "E:\\CODE\\dataAnalysis\\TEST"
+# 要合并的文件（可改为 *.parquet / *.feather，用 tableIO.py 预先转换后读取更快）
+file_pattern = "*.xls"
+# 合并结果输出文件
+output_path = 'merged_output.xlsx'
+# 是否在输出文件中追加分析表（变化、排名、滚动均值、汇总）
+write_analytics = True
+# 滚动均值的窗口（按文件数）
+rolling_window = 4
+
+def merge_files(filelist, perf):
+    """读取各文件的“队名”与最后一列，按“队名”外连接，并按第一个文件中的队名顺序排序"""
+    # 读取每个文件的“队名”列和最后一列
+    last_cols = []
+    with perf.stage("read"):
+        for file in filelist:
+            if detect_format(file) == "excel":
+                # Excel 只读表头也要解析整个工作簿：整表读取一次再取两列
+                df = read_table(file)
+                last_cols.append(df[['队名', df.columns[-1]]])
+                continue
+            # 列式文件先只读表头确定最后一列，再只读取这两列
+            cols = table_columns(file)
+            last_cols.append(read_table(file, columns=['队名', cols[-1]]))
+
+    # 按“队名”列进行外连接合并所有 DataFrame
+    # 如果列名重复，后续表格的列名会添加后缀 '_dup'
+    with perf.stage("merge"):
+        merged_df = reduce(lambda left, right: pd.merge(left, right, on='队名', how='outer', suffixes=('', '_dup')), last_cols)
+
+        # 获取第一个文件中“队名”的顺序，用于排序；第一个文件中没有的队排在后面（按出现顺序），不丢失队名
+        teams = pd.concat([last_cols[0]['队名'], merged_df['队名']]).dropna()
+        first_team_order = list(dict.fromkeys(teams.tolist()))
+        # 将“队名”列设置为分类类型，并按照第一个文件的顺序排序
+        merged_df['队名'] = pd.Categorical(merged_df['队名'], categories=first_team_order, ordered=True)
+        merged_df = merged_df.sort_values('队名', kind='stable').reset_index(drop=True)  # 按“队名”排序并重置索引
+    return merged_df
+
+def team_analytics(merged_df, labels, window=4):
+    """
+    在合并表（队 × 按编号排序的文件）上按列整体计算分析表，返回 {表名: DataFrame}：
+    - 变化：每个文件相对上一个文件的差值（上一个文件缺失时为空）
+    - 排名：每个文件内按数值从高到低的名次（并列取最小名次，缺失不参与）
+    - 滚动均值：最近 window 个文件的均值（忽略缺失）
+    - 汇总：出现次数、缺失次数、最长连续缺失、首末次出现的文件、均值、最新值、首末变化
+    labels 为各文件列的显示名（与合并表中“队名”之后的列一一对应）。
+    """
+    teams = merged_df['队名'].astype(object)
+    # 非数值单元格按缺失处理
+    values = merged_df.iloc[:, 1:].apply(pd.to_numeric, errors='coerce')
+    values.columns = labels
+    values.index = teams
+
+    matrix = values.to_numpy(dtype=np.float64)
+    present = ~np.isnan(matrix)
+    n_files = matrix.shape[1]
+    file_idx = np.arange(n_files)
+    rows = np.arange(len(matrix))
+    any_present = present.any(axis=1)
+    first_pos = present.argmax(axis=1)
+    last_pos = n_files - 1 - present[:, ::-1].argmax(axis=1)
+    first_val = matrix[rows, first_pos]
+    last_val = matrix[rows, last_pos]
+
+    # 最长连续缺失：逐列累计“最近一次出现的位置”，缺失段长度 = 当前位置 - 最近出现位置
+    last_seen = np.maximum.accumulate(np.where(present, file_idx, -1), axis=1)
+    gap = np.where(present, 0, file_idx - last_seen)
+
+    # 滚动均值：用累计和之差得到窗口内的和与出现次数
+    zero_pad = np.zeros((len(matrix), 1))
+    csum = np.hstack([zero_pad, np.nancumsum(matrix, axis=1)])
+    ccount = np.hstack([zero_pad, np.cumsum(present, axis=1)])
+    start = np.maximum(file_idx + 1 - window, 0)
+    win_sum = csum[:, file_idx + 1] - csum[:, start]
+    win_count = ccount[:, file_idx + 1] - ccount[:, start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rolling = np.where(win_count > 0, win_sum / win_count, np.nan)
+
+    summary = pd.DataFrame({
+        '出现次数': present.sum(axis=1),
+        '缺失次数': n_files - present.sum(axis=1),
+        '最长连续缺失': gap.max(axis=1),
+        '首次出现': pd.Series(labels, dtype=object).take(first_pos).where(any_present).to_numpy(),
+        '最后出现': pd.Series(labels, dtype=object).take(last_pos).where(any_present).to_numpy(),
+        '均值': values.mean(axis=1).to_numpy(),
+        '最新值': pd.Series(last_val).where(any_present).to_numpy(),
+        '首末变化': pd.Series(last_val - first_val).where(any_present).to_numpy(),
+    }, index=values.index)
+
+    return {
+        '变化': values.diff(axis=1),
+        '排名': values.rank(axis=0, ascending=False, method='min'),
+        f'滚动均值{window}': pd.DataFrame(rolling, index=values.index, columns=values.columns),
+        '汇总': summary,
+    }
 
-# 获取文件夹中所有以 .xls结尾的文件，并按文件名中的数字排序
-filelist = sorted(glob.glob(f"{folder_path}\\*.xls"), key=extract_number)
+def write_output(path, merged_df, sheets=None):
+    """合并表写入第一个工作表（与原输出相同），分析表各写一个工作表（队名作为第一列）"""
+    with pd.ExcelWriter(path) as writer:
+        merged_df.to_excel(writer, index=False)
+        for name, frame in (sheets or {}).items():
+            frame.rename_axis('队名').to_excel(writer, sheet_name=name)
 
-# 读取所有 Excel 文件，存储为 DataFrame 列表
-dfs = [pd.read_excel(file, engine='xlrd') for file in filelist]
+def main(argv=None):
+    # 性能记录：--perf[=memory,profile] / --perf-out 文件，或环境变量 PERF_TRACE
+    perf, _ = PerfTrace.from_argv("lianchuan", argv)
 
-# 提取每个 DataFrame 中的“队名”列和最后一列
-last_cols = []
-for df in dfs:
-    cols = df.columns  # 获取列名
-    # 选择“队名”列和最后一列（如果最后一列不是“队名”）
-    select_cols = ['队名'] + [cols[-1]]
-    last_cols.append(df.loc[:, select_cols])  # 提取所需列并添加到列表中
+    # 获取文件夹中所有匹配 file_pattern 的文件，并按文件名中的数字排序
+    filelist = sorted(glob.glob(os.path.join(folder_path, file_pattern)), key=extract_number)
+    merged_df = merge_files(filelist, perf)
 
-# 按“队名”列进行外连接合并所有 DataFrame
-# 如果列名重复，后续表格的列名会添加后缀 '_dup'
-merged_df = reduce(lambda left, right: pd.merge(left, right, on='队名', how='outer', suffixes=('', '_dup')), last_cols)
+    sheets = None
+    if write_analytics:
+        with perf.stage("analytics"):
+            labels = [os.path.splitext(os.path.basename(f))[0] for f in filelist]
+            sheets = team_analytics(merged_df, labels, rolling_window)
 
-# 获取第一个文件中“队名”的顺序，用于排序
-first_team_order = last_cols[0]['队名'].tolist()
-# 将“队名”列设置为分类类型，并按照第一个文件的顺序排序
-merged_df['队名'] = pd.Categorical(merged_df['队名'], categories=first_team_order, ordered=True)
-merged_df = merged_df.sort_values('队名').reset_index(drop=True)  # 按“队名”排序并重置索引
+    # 将合并后的结果保存为 Excel 文件
+    with perf.stage("write"):
+        write_output(output_path, merged_df, sheets)
+    perf.note(files=len(filelist), teams=len(merged_df))
+    perf.emit()
 
-# 将合并后的结果保存为 Excel 文件
-merged_df.to_excel('merged_output.xlsx', index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
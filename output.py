@@ -1,30 +1,111 @@
-from collections import Counter 
+import argparse
 
-def try_parse_int(s):  
+import numpy as np
+
+from perfTrace import PerfTrace
+
+def try_parse_int(s):
     try:
-        return int(s)  
-    except ValueError:  
-        return s  
-
-def process_file(input_file, output_file):  
-    with open(input_file, "r", encoding="utf-8") as f:  
-        arr1 = [[try_parse_int(i) for i in line.split("\t")] for line in reversed(f.read().split("\n"))]  
-
-    results = []  
-    for arr in arr1:  
-        first_value = arr[0] if arr else None  
-        elements = [e for e in arr[1:] if isinstance(e, int)]  
-        # 确定步长
-        div_1000 = [e // 1000 for e in elements]  
-        div_100 = [e // 100 for e in elements]  
-        step = 1000 if sum(i > 2 for i in div_1000) >= 3 else 100 if sum(i >= 2 for i in div_100) >= 3 else 10  
-        
-        max_value = max(elements)  
-        intervals = [(i, i + step) for i in range(0, max_value + 1, step)] 
-        counts = [(interval, sum(interval[0] <= e <= interval[1] for e in elements)) for interval in intervals]  
-        max_count = max(counts, key=lambda x: (x[1], x[0][1])) 
-        output = f'"{first_value}"\t【{intervals[0][0]}~{intervals[0][1]}】\t{counts[0][1]}\t【{max_count[0][0]}~{max_count[0][1]}】\t{max_count[1]}'     
-        results.append(output)  
-    with open(output_file, "w", encoding="utf-8") as f:  
-        f.write("\n".join(reversed(results))) 
-process_file("input.txt", "result.txt") 
\ No newline at end of file
+        return int(s)
+    except ValueError:
+        return s
+
+def auto_step(elements):
+    """按数值大小确定步长：超过 2000 的值不少于 3 个用 1000，不少于 200 的值不少于 3 个用 100，否则 10"""
+    div_1000 = [e // 1000 for e in elements]
+    div_100 = [e // 100 for e in elements]
+    return 1000 if sum(i > 2 for i in div_1000) >= 3 else 100 if sum(i >= 2 for i in div_100) >= 3 else 10
+
+class BinIndex:
+    """
+    一行数值的排序索引，建一次即可对任意步长回答分箱问题（每次查询为二分查找）：
+    区间 [a, b] 为闭区间，分箱为 [0, step], [step, 2*step], ... 直到起点超过最大值（与原逐区间计数一致，
+    恰好落在边界上的值同时计入相邻两个区间）。
+    """
+
+    def __init__(self, elements):
+        self.values = np.sort(np.asarray(elements, dtype=np.int64))
+        self.max_value = int(self.values[-1]) if len(self.values) else None
+
+    def count(self, a, b):
+        """落在 [a, b] 中的值的个数"""
+        v = self.values
+        return int(np.searchsorted(v, b, side="right") - np.searchsorted(v, a, side="left"))
+
+    def _counts(self, starts, step):
+        v = self.values
+        return np.searchsorted(v, starts + step, side="right") - np.searchsorted(v, starts, side="left")
+
+    def first_bin(self, step):
+        """第一个区间 (起点, 终点, 个数)"""
+        return 0, step, self.count(0, step)
+
+    def densest_bin(self, step):
+        """
+        个数最多的区间 (起点, 终点, 个数)，并列时取终点最大的。
+        非空区间必包含某个值，只需检查各值所在区间（值在起点上时还有前一个区间），不必枚举全部区间。
+        """
+        v = self.values[self.values >= 0]
+        if self.max_value is None or self.max_value < 0:
+            raise ValueError("没有可分箱的非负整数")
+        starts = v // step * step
+        starts = np.unique(np.concatenate([starts, starts[(v == starts) & (starts >= step)] - step]))
+        counts = self._counts(starts, step)
+        # unique 已升序：最大个数中最后一个即终点最大的区间
+        i = len(counts) - 1 - int(np.argmax(counts[::-1]))
+        return int(starts[i]), int(starts[i]) + step, int(counts[i])
+
+def format_bins(index, step):
+    """【首区间】\t个数\t【最多区间】\t个数"""
+    a0, b0, c0 = index.first_bin(step)
+    a, b, c = index.densest_bin(step)
+    return f'【{a0}~{b0}】\t{c0}\t【{a}~{b}】\t{c}'
+
+def process_file(input_file, output_file, perf=None, steps=None):
+    """
+    每行：首列为名称，其余整数按步长分箱，输出首区间与个数最多的区间。
+    steps 为空时每行按 auto_step 选一个步长；给出步长列表时每行依次输出各步长的结果（一次读取）。
+    """
+    # perf 为空时按环境变量 PERF_TRACE 记录阶段耗时并在结束时输出
+    own_perf = perf is None
+    if own_perf:
+        perf = PerfTrace.from_env("output")
+    with perf.stage("read"):
+        with open(input_file, "r", encoding="utf-8") as f:
+            arr1 = [[try_parse_int(i) for i in line.split("\t")] for line in reversed(f.read().split("\n"))]
+
+    results = []
+    with perf.stage("aggregate"):
+        for arr in arr1:
+            first_value = arr[0] if arr else None
+            elements = [e for e in arr[1:] if isinstance(e, int)]
+            # 每行只排序一次，各步长的统计都在排序后的值上二分查找
+            index = BinIndex(elements)
+            line_steps = steps or [auto_step(elements)]
+            output = f'"{first_value}"\t' + "\t".join(format_bins(index, s) for s in line_steps)
+            results.append(output)
+    with perf.stage("write"):
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(reversed(results)))
+    perf.note(file=input_file, lines=len(results))
+    if own_perf:
+        perf.emit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按步长分箱统计每行的数值")
+    parser.add_argument("input", nargs="?", default="input.txt", help="输入文件（默认 input.txt）")
+    parser.add_argument("output", nargs="?", default="result.txt", help="输出文件（默认 result.txt）")
+    parser.add_argument("--steps", help="逗号分隔的步长（如 10,100,1000），每行依次输出；默认每行自动选择一个步长")
+    # --perf[=memory,profile] / --perf-out 文件 开启阶段计时
+    perf, rest = PerfTrace.from_argv("output")
+    args = parser.parse_args(rest)
+    steps = None
+    if args.steps:
+        try:
+            steps = [int(s) for s in args.steps.split(",")]
+        except ValueError:
+            parser.error(f"--steps 必须是逗号分隔的正整数: {args.steps}")
+        if any(s <= 0 for s in steps):
+            parser.error(f"--steps 必须是逗号分隔的正整数: {args.steps}")
+    process_file(args.input, args.output, perf=perf, steps=steps)
+    perf.emit()
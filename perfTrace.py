@@ -0,0 +1,189 @@
+"""
+各脚本共用的性能记录：命名阶段计时，可选 tracemalloc 内存峰值与 cProfile 采样，结果输出为一行 JSON。
+
+开启方式（命令行参数优先于环境变量）：
+    PERF_TRACE=1                 只记录阶段耗时
+    PERF_TRACE=memory,profile    同时记录各阶段内存峰值，并把 cProfile 结果写成 .prof 文件
+    PERF_TRACE_OUT=perf.jsonl    JSON 追加写入该文件（默认输出到 stderr）
+    python 脚本.py --perf[=memory,profile] [--perf-out perf.jsonl]
+
+未开启时 stage() 不计时、不分配，可以留在代码里。
+"""
+import os
+import sys
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+PERF_ENV = "PERF_TRACE"
+PERF_OUT_ENV = "PERF_TRACE_OUT"
+_OFF_VALUES = {"", "0", "off", "false", "no"}
+_MB = 1024 * 1024
+
+
+def split_perf_args(argv: List[str]) -> Tuple[Optional[str], Optional[str], List[str]]:
+    """从命令行参数中取出 --perf[=选项] 与 --perf-out 路径，返回 (选项, 输出路径, 其余参数)"""
+    options, out, rest = None, None, []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--perf":
+            options = "on"
+        elif arg.startswith("--perf="):
+            options = arg.split("=", 1)[1] or "on"
+        elif arg == "--perf-out":
+            out = next(args, None)
+        elif arg.startswith("--perf-out="):
+            out = arg.split("=", 1)[1]
+        else:
+            rest.append(arg)
+    return options, out, rest
+
+
+class PerfTrace:
+    """
+    一次运行的阶段记录。同名阶段多次进入时累加耗时与次数；嵌套阶段记为 “外层/内层”。
+    memory 时每个阶段记录 tracemalloc 峰值（peak_mb，含嵌套阶段）与净增量（delta_mb）。
+    可在多个线程中使用（各线程的嵌套关系分开记录）；tracemalloc 峰值是进程级的，
+    多个线程同时处于阶段内时内存数字只作参考。
+    """
+
+    def __init__(self, tool: str, options: Optional[str] = None, out: Optional[str] = None):
+        self.tool = tool
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiler = None
+        self.configure(options, out)
+
+    def configure(self, options: Optional[str] = None, out: Optional[str] = None):
+        """按选项字符串（如 "1"、"memory,profile"）重新设置开关，并清空已有记录"""
+        flags = {f.strip().lower() for f in (options or "").split(",")} - {""}
+        self.enabled = bool(flags) and not flags <= _OFF_VALUES
+        self.memory = self.enabled and bool(flags & {"memory", "mem"})
+        self.profile = self.enabled and "profile" in flags
+        self.out = out
+        self.reset()
+
+    @classmethod
+    def from_env(cls, tool: str, options: Optional[str] = None, out: Optional[str] = None) -> "PerfTrace":
+        """选项与输出路径未给出时取环境变量 PERF_TRACE / PERF_TRACE_OUT"""
+        return cls(tool,
+                   options if options is not None else os.environ.get(PERF_ENV),
+                   out if out is not None else os.environ.get(PERF_OUT_ENV))
+
+    @classmethod
+    def from_argv(cls, tool: str, argv: Optional[List[str]] = None) -> Tuple["PerfTrace", List[str]]:
+        """按命令行参数（默认 sys.argv[1:]）与环境变量创建，同时返回去掉 --perf 参数后的参数列表"""
+        options, out, rest = split_perf_args(sys.argv[1:] if argv is None else argv)
+        return cls.from_env(tool, options, out), rest
+
+    def reset(self):
+        self.stages: Dict[str, Dict] = {}
+        self.extra = {}
+        self._started: Optional[float] = None
+        self._started_at: Optional[str] = None
+
+    @property
+    def _stack(self) -> List[list]:
+        # 当前线程的阶段栈：[阶段路径, 内层阶段的最大峰值]
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _start(self):
+        self._started = time.perf_counter()
+        self._started_at = datetime.now().isoformat(timespec="seconds")
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profile and self._profiler is None:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def note(self, **values):
+        """附加到输出 JSON 的计数信息（行数、文件名等）"""
+        if self.enabled:
+            self.extra.update(values)
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            if self._started is None:
+                self._start()
+        stack = self._stack
+        path = "/".join([s[0] for s in stack[-1:]] + [name])
+        if self.memory:
+            if stack:
+                # 重置峰值前先把当前峰值记入外层阶段
+                stack[-1][1] = max(stack[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            start_mem = tracemalloc.get_traced_memory()[0]
+        frame = [path, 0]
+        stack.append(frame)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            stack.pop()
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame[1])
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+            with self._lock:
+                rec = self.stages.setdefault(path, {"calls": 0, "seconds": 0.0})
+                rec["calls"] += 1
+                rec["seconds"] = round(rec["seconds"] + seconds, 6)
+                if self.memory:
+                    rec["peak_mb"] = round(max(rec.get("peak_mb", 0.0), peak / _MB), 3)
+                    rec["delta_mb"] = round(rec.get("delta_mb", 0.0) + (current - start_mem) / _MB, 3)
+
+    def report(self, **extra) -> Dict:
+        total = time.perf_counter() - self._started if self._started is not None else 0.0
+        with self._lock:
+            stages = {k: dict(v) for k, v in self.stages.items()}
+        data = {"tool": self.tool, "pid": os.getpid(), "started": self._started_at,
+                "total_seconds": round(total, 6), "stages": stages}
+        if self.memory and tracemalloc.is_tracing():
+            data["traced_peak_mb"] = round(max([r.get("peak_mb", 0.0) for r in stages.values()] +
+                                               [tracemalloc.get_traced_memory()[1] / _MB]), 3)
+        data.update(self.extra)
+        data.update(extra)
+        return data
+
+    def _dump_profile(self) -> Optional[str]:
+        if self._profiler is None:
+            return None
+        self._profiler.disable()
+        folder = os.path.dirname(os.path.abspath(self.out)) if self.out else os.getcwd()
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(folder, f"{self.tool}_{os.getpid()}_{stamp}.prof")
+        self._profiler.dump_stats(path)
+        self._profiler = None
+        return path
+
+    def emit(self, **extra) -> Optional[Dict]:
+        """输出本次记录（一行 JSON）并清空，之后的阶段开始新的一次记录；未开启时什么都不做"""
+        if not self.enabled:
+            return None
+        profile_path = self._dump_profile()
+        if profile_path:
+            extra["profile"] = profile_path
+        data = self.report(**extra)
+        line = json.dumps(data, ensure_ascii=False, default=str)
+        if self.out:
+            # 追加写入，多个进程/多次运行的记录逐行累积
+            with open(self.out, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        else:
+            print(line, file=sys.stderr)
+        self.reset()
+        return data
@@ -0,0 +1,156 @@
+"""
+各脚本共用的表格读写：按扩展名识别格式，读取时可只取需要的列。
+- .parquet / .pq：列式文件，只解码需要的列（需要 pyarrow）
+- .feather / .arrow / .ipc：Arrow IPC 文件，默认内存映射读取，只触及需要的列（需要 pyarrow）
+- .csv / .tsv / .txt：文本表格（.tsv / .txt 按制表符分隔）
+- 其余（.xlsx / .xlsm / .xls 等）：按 Excel 读取
+
+Excel 解析是各流程中最慢的一步：可以先把 Excel 存档一次性转换为列式文件，之后各脚本直接读取转换结果。
+
+    python tableIO.py 存档/*.xlsx --to parquet --sheet Sheet2 --header 1 [--out-dir 列式] [--columns ID1,heroID2]
+
+转换后的文件表头就在第一行，sheet_name / header 只对 Excel 生效，读取转换结果时无需修改调用参数。
+"""
+import os
+import sys
+import time
+import argparse
+from typing import List, Optional, Sequence, Union
+
+import pandas as pd
+
+FORMAT_BY_EXT = {
+    ".parquet": "parquet", ".pq": "parquet",
+    ".feather": "feather", ".arrow": "feather", ".ipc": "feather",
+    ".csv": "csv", ".tsv": "csv", ".txt": "csv",
+}
+EXT_BY_FORMAT = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv", "excel": ".xlsx"}
+SheetName = Union[str, int]
+
+
+def detect_format(path: str) -> str:
+    """按扩展名返回 parquet / feather / csv / excel"""
+    return FORMAT_BY_EXT.get(os.path.splitext(path)[1].lower(), "excel")
+
+
+def _csv_sep(path: str) -> str:
+    return "\t" if os.path.splitext(path)[1].lower() in (".tsv", ".txt") else ","
+
+
+def _require_pyarrow(fmt: str):
+    try:
+        import pyarrow  # noqa: F401
+    except Exception:
+        raise RuntimeError(f"读取/写入 {fmt} 需要 pyarrow，可通过 pip install pyarrow 安装")
+
+
+def table_columns(path: str, sheet_name: SheetName = 0, header: int = 0) -> List[str]:
+    """只读取表头（列式文件读 schema，不读数据）"""
+    fmt = detect_format(path)
+    if fmt == "parquet":
+        _require_pyarrow(fmt)
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    if fmt == "feather":
+        _require_pyarrow(fmt)
+        import pyarrow as pa
+        with pa.memory_map(path) as source:
+            return list(pa.ipc.open_file(source).schema.names)
+    if fmt == "csv":
+        return list(pd.read_csv(path, sep=_csv_sep(path), nrows=0, encoding="utf-8-sig").columns)
+    return list(pd.read_excel(path, sheet_name=sheet_name, header=header, nrows=0).columns)
+
+
+def read_table(path: str, columns: Optional[Sequence[str]] = None, sheet_name: SheetName = 0, header: int = 0,
+               memory_map: bool = True, **kwargs) -> pd.DataFrame:
+    """
+    按扩展名读取表格；columns 不为空时只读取这些列（按给出的顺序返回）。
+    sheet_name / header（表头所在行，0 起算）只对 Excel 生效；其余关键字参数传给对应的 pandas 读取函数。
+    行标签总是从 0 开始的 RangeIndex，与 read_excel 一致。
+    """
+    fmt = detect_format(path)
+    cols = None if columns is None else list(columns)
+    if fmt == "parquet":
+        _require_pyarrow(fmt)
+        import pyarrow.parquet as pq
+        df = pq.read_table(path, columns=cols, memory_map=memory_map, **kwargs).to_pandas()
+    elif fmt == "feather":
+        _require_pyarrow(fmt)
+        import pyarrow.feather as feather
+        df = feather.read_table(path, columns=cols, memory_map=memory_map, **kwargs).to_pandas()
+    elif fmt == "csv":
+        df = pd.read_csv(path, sep=_csv_sep(path), usecols=cols, encoding="utf-8-sig", **kwargs)
+    else:
+        df = pd.read_excel(path, sheet_name=sheet_name, header=header, usecols=cols, **kwargs)
+    # usecols 按文件中的列顺序返回，这里统一为调用方给出的顺序
+    return df if cols is None else df[cols]
+
+
+def _arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """Arrow 列需要单一类型：数字与文本混杂的 object 列转为文本（空值保留）"""
+    fixed = {}
+    for name in df.columns:
+        col = df[name]
+        if col.dtype == object and pd.api.types.infer_dtype(col, skipna=True) in ("mixed", "mixed-integer"):
+            fixed[name] = col.where(col.isna(), col.astype(str))
+    return df.assign(**fixed) if fixed else df
+
+
+def write_table(df: pd.DataFrame, path: str, index: bool = False, sheet_name: str = "Sheet1"):
+    """按扩展名写出表格（CSV 用 utf-8-sig，方便 Excel 直接打开中文）"""
+    fmt = detect_format(path)
+    if fmt == "parquet":
+        _require_pyarrow(fmt)
+        _arrow_safe(df).to_parquet(path, index=index)
+    elif fmt == "feather":
+        _require_pyarrow(fmt)
+        # Feather 不保存行标签：需要时先转成普通列
+        out = df.reset_index() if index else df.reset_index(drop=True)
+        _arrow_safe(out).to_feather(path)
+    elif fmt == "csv":
+        df.to_csv(path, sep=_csv_sep(path), index=index, encoding="utf-8-sig")
+    else:
+        df.to_excel(path, index=index, sheet_name=sheet_name)
+
+
+def convert_file(src: str, fmt: str = "parquet", out_dir: Optional[str] = None, sheet_name: SheetName = 0,
+                 header: int = 0, columns: Optional[Sequence[str]] = None) -> str:
+    """把一个表格文件（通常是 Excel 存档）转换为 fmt 格式，返回输出路径（与源文件同名，扩展名替换）"""
+    stem = os.path.splitext(os.path.basename(src))[0]
+    out = os.path.join(out_dir or os.path.dirname(os.path.abspath(src)), stem + EXT_BY_FORMAT[fmt])
+    if os.path.abspath(out) == os.path.abspath(src):
+        raise RuntimeError(f"输出文件与源文件相同：{src}")
+    write_table(read_table(src, columns=columns, sheet_name=sheet_name, header=header), out)
+    return out
+
+
+# ---------------- 运行 ----------------
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="把 Excel 存档一次性转换为 Parquet / Feather / CSV")
+    parser.add_argument("files", nargs="+", help="要转换的文件")
+    parser.add_argument("--to", default="parquet", choices=["parquet", "feather", "csv"], help="目标格式（默认 parquet）")
+    parser.add_argument("--sheet", default=None, help="Excel 工作表名（默认第一个工作表）")
+    parser.add_argument("--header", type=int, default=0, help="Excel 表头所在行，0 起算（去重脚本的表为 1）")
+    parser.add_argument("--columns", help="只保留这些列（逗号分隔）")
+    parser.add_argument("--out-dir", help="输出目录（默认与源文件相同）")
+    args = parser.parse_args(argv)
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    columns = args.columns.split(",") if args.columns else None
+    failed = 0
+    for src in args.files:
+        start = time.perf_counter()
+        try:
+            out = convert_file(src, args.to, args.out_dir, sheet_name=args.sheet if args.sheet is not None else 0,
+                               header=args.header, columns=columns)
+        except Exception as e:
+            failed += 1
+            print(f"[失败] {os.path.basename(src)}: {e}", file=sys.stderr)
+            continue
+        print(f"[完成] {os.path.basename(src)} -> {out}（{time.perf_counter() - start:.2f} 秒）")
+    print(f"共 {len(args.files)} 个文件，失败 {failed} 个")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""ExcelHandler 保存/满红导出的写回结果（工作表由 openpyxl 在 tmp_path 中生成）"""
+import random
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import attributeHandler as ah
+
+ATTRS = ah.ATTRS
+HEADERS = ["ID", "name", "备注"] + [c for a in ATTRS for c in (a, a + "初始", a + "成长")] + ["品质"]
+# 工作表第 1 行为标题，第 2 行为表头，数据从第 3 行开始
+FIRST_ROW = 3
+# 第 3、5 行（df 位置）的 ID 相同，用于检查按行位置而不是按 ID 写回
+DUP_POS = (3, 5)
+
+
+def make_sheet(path, n=12, seed=1):
+    rng = random.Random(seed)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "hero"
+    ws.append(["英雄表"])
+    ws.append(HEADERS)
+    for i in range(n):
+        hid = 10 + i if i % 4 else 100 + i
+        row = [hid, f"英雄{i}", f"note{i}"]
+        for a in ATTRS:
+            init, growth = rng.randint(50, 90), rng.choice([0.5, 1, 1.5, 2])
+            row += [init + growth * ah.GROWTH_MULT + rng.choice([0, 10, 50]), init, growth]
+        row.append(rng.choice(["橙", "紫"]))
+        ws.append(row)
+    ws.cell(FIRST_ROW + DUP_POS[0], 1).value = ws.cell(FIRST_ROW + DUP_POS[1], 1).value
+    wb.save(path)
+    return path
+
+
+def sheet_rows(path):
+    ws = load_workbook(path)["hero"]
+    return [list(r) for r in ws.iter_rows(min_row=FIRST_ROW, values_only=True)]
+
+
+def assert_rows_equal(got, expected):
+    assert len(got) == len(expected)
+    for g, e in zip(got, expected):
+        assert g == pytest.approx(e)
+
+
+def col(name):
+    return HEADERS.index(name)
+
+
+def base(row, attr):
+    return row[col(attr + "初始")] + row[col(attr + "成长")] * ah.GROWTH_MULT
+
+
+@pytest.fixture
+def src(tmp_path):
+    return str(make_sheet(tmp_path / "hero.xlsx"))
+
+
+def load(path):
+    handler = ah.ExcelHandler()
+    handler.load(path)
+    return handler
+
+
+def test_save_writes_only_edited_cells_by_row_position(src, tmp_path):
+    before = sheet_rows(src)
+    handler = load(src)
+    handler.update_add_points_at(DUP_POS[0], {"武力": 77})
+    handler.update_add_points_at(DUP_POS[1], {"智力": 33})
+    out = str(tmp_path / "out.xlsx")
+    handler.save(out)
+
+    expected = [list(r) for r in before]
+    expected[DUP_POS[0]][col("武力")] = base(before[DUP_POS[0]], "武力") + 77
+    expected[DUP_POS[1]][col("智力")] = base(before[DUP_POS[1]], "智力") + 33
+    assert_rows_equal(sheet_rows(out), expected)
+    # 另存为时源文件不变，修改仍未保存
+    assert_rows_equal(sheet_rows(src), before)
+    assert handler._dirty
+
+
+def test_save_to_source_clears_dirty(src):
+    before = sheet_rows(src)
+    handler = load(src)
+    handler.update_add_points_at(0, {"速度": 5})
+    handler.save(src)
+
+    expected = [list(r) for r in before]
+    expected[0][col("速度")] = base(before[0], "速度") + 5
+    assert_rows_equal(sheet_rows(src), expected)
+    assert not handler._dirty
+
+
+def full_red_rows(rows, adds):
+    """满红导出应追加的行：ID 加前缀、名称加后缀、加点翻倍，其余列取该英雄自己那一行"""
+    out = []
+    for row, add in zip(rows, adds):
+        hid = str(row[col("ID")])
+        new = list(row)
+        new[col("ID")] = ("50" if len(hid) == 3 else "500") + hid
+        new[col("name")] = f"{row[col('name')]}(满红)"
+        for a in ATTRS:
+            new[col(a)] = base(row, a) + add[a] * 2
+        out.append(new)
+    return out
+
+
+def test_export_full_red_appends_rows_from_each_heros_own_row(src, tmp_path):
+    before = sheet_rows(src)
+    handler = load(src)
+    handler.update_add_points_at(DUP_POS[0], {"武力": 77})
+    out = str(tmp_path / "red.xlsx")
+    handler.export_full_red(out)
+
+    adds = [{a: round(r[col(a)] - base(r, a)) for a in ATTRS} for r in before]
+    adds[DUP_POS[0]]["武力"] = 77
+    # 原数据行保持磁盘上的内容（编辑未保存），满红行追加在末尾
+    assert_rows_equal(sheet_rows(out), before + full_red_rows(before, adds))
+    # 同 ID 的两行各自带出自己的备注
+    red = sheet_rows(out)[len(before):]
+    assert [red[p][col("备注")] for p in DUP_POS] == [f"note{p}" for p in DUP_POS]
+
+
+def test_save_as_then_export_does_not_leak_unsaved_edits(src, tmp_path):
+    before = sheet_rows(src)
+    handler = load(src)
+    handler.update_add_points_at(1, {"防御": 21})
+    handler.save(str(tmp_path / "copy.xlsx"))
+    # 另存为后源文件对应的共享工作簿不应带着这次修改
+    out = str(tmp_path / "red.xlsx")
+    handler.export_full_red(out)
+    assert_rows_equal(sheet_rows(out)[:len(before)], before)
+    handler.save(str(tmp_path / "copy2.xlsx"))
+    expected = [list(r) for r in before]
+    expected[1][col("防御")] = base(before[1], "防御") + 21
+    assert_rows_equal(sheet_rows(str(tmp_path / "copy2.xlsx")), expected)
@@ -0,0 +1,169 @@
+"""Deduplication4/5 的 deduplicate_excel_optimized 与原逐行算法的结果一致（顺序、并行、落盘、检查点）"""
+import random
+from itertools import combinations
+
+import pandas as pd
+import pytest
+
+import Deduplication4
+import Deduplication5
+import dedupIndex
+
+COLUMNS = ["ID1", "heroID2", "heroID3"]
+SUM_FIELD = "场次"
+SHEET = "Sheet2"
+PARAMS = [dict(max_two_duplicate_rows=2, max_value_frequency=3),
+          dict(max_two_duplicate_rows=0, max_value_frequency=5),
+          dict(max_two_duplicate_rows=3, max_value_frequency=10)]
+
+
+def make_frame(n=400, seed=11):
+    """值分成几组互不相交的范围（连通分量可并行），少量跨组行把第 0、1 组连起来"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        group = rng.randrange(6)
+        values = [group * 100 + rng.randrange(12) for _ in COLUMNS]
+        if group == 0 and rng.random() < 0.1:
+            values[rng.randrange(len(values))] = 100 + rng.randrange(12)
+        rows.append(values + [rng.randint(1, 99)])
+    return pd.DataFrame(rows, columns=COLUMNS + [SUM_FIELD])
+
+
+def write_sheet(df, path):
+    """与输入文件相同的布局：第 1 行标题，第 2 行表头"""
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame([["title"]]).to_excel(writer, sheet_name=SHEET, index=False, header=False)
+        df.to_excel(writer, sheet_name=SHEET, index=False, startrow=1)
+    return str(path)
+
+
+def _sums(df):
+    ids = df[COLUMNS].apply(frozenset, axis=1)
+    return ids, df.groupby(ids)[SUM_FIELD].sum().to_dict()
+
+
+def reference4(df, max_two_duplicate_rows, max_value_frequency):
+    """原 Deduplication4：与已保留行逐一比较共同值个数"""
+    ids, sums = _sums(df)
+    kept, processed, value_counts = [], [], {}
+    for idx, row in df.iterrows():
+        values = set(row[COLUMNS])
+        if any(values == p for p in processed):
+            continue
+        matches = sum(len(values & p) >= 2 for p in processed)
+        if matches and matches >= max_two_duplicate_rows:
+            continue
+        current = row[COLUMNS].tolist()
+        if any(value_counts.get(v, 0) >= max_value_frequency for v in current):
+            continue
+        for v in current:
+            value_counts[v] = value_counts.get(v, 0) + 1
+        new_row = row.copy()
+        new_row[SUM_FIELD] = sums[ids[idx]]
+        kept.append(new_row)
+        processed.append(values)
+    return pd.DataFrame(kept)
+
+
+def reference5(df, max_two_duplicate_rows, max_value_frequency):
+    """原 Deduplication5：按排序后的值组合计数（组合首次出现时只记数不检查；被跳过的行也计入它之前检查过的组合）"""
+    ids, sums = _sums(df)
+    kept, complete, pairs, value_counts = [], set(), {}, {}
+    for idx, row in df.iterrows():
+        values = tuple(sorted(row[col] for col in COLUMNS))
+        if values in complete:
+            continue
+        skip = False
+        for pair in combinations(values, 2):
+            if pair not in pairs:
+                pairs[pair] = 1
+                continue
+            pairs[pair] += 1
+            if pairs[pair] > max_two_duplicate_rows:
+                skip = True
+                break
+        if skip or any(value_counts.get(v, 0) >= max_value_frequency for v in values):
+            continue
+        complete.add(values)
+        for v in values:
+            value_counts[v] = value_counts.get(v, 0) + 1
+        new_row = row.copy()
+        new_row[SUM_FIELD] = sums[ids[idx]]
+        kept.append(new_row)
+    return pd.DataFrame(kept)
+
+
+CASES = [(Deduplication4, reference4), (Deduplication5, reference5)]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return make_frame()
+
+
+@pytest.fixture(scope="module")
+def sheet(frame, tmp_path_factory):
+    return write_sheet(frame, tmp_path_factory.mktemp("dedup") / "d.xlsx")
+
+
+def run(module, path, **kwargs):
+    return module.deduplicate_excel_optimized(path, SHEET, COLUMNS, sum_field=SUM_FIELD, **kwargs)
+
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("module, reference", CASES)
+def test_sequential_matches_reference(module, reference, params, frame, sheet):
+    expected = reference(frame, **params)
+    pd.testing.assert_frame_equal(run(module, sheet, workers=1, **params), expected)
+    assert list(run(module, sheet, workers=1, return_indices=True, **params)) == list(expected.index)
+
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("module, reference", CASES)
+def test_parallel_matches_reference(module, reference, params, frame, sheet, monkeypatch):
+    # 测试数据较小，去掉并行的行数下限，确保真正拆成多个分量批次在子进程中执行
+    monkeypatch.setattr(dedupIndex, "PARALLEL_MIN_ROWS", 0)
+    batches = []
+    split = dedupIndex._component_batches
+    monkeypatch.setattr(dedupIndex, "_component_batches", lambda *a: batches.append(split(*a)) or batches[-1])
+    pd.testing.assert_frame_equal(run(module, sheet, workers=3, **params), reference(frame, **params))
+    assert batches and len(batches[0]) > 1
+
+
+@pytest.mark.parametrize("params", PARAMS)
+def test_spill_matches_reference(params, frame, sheet, tmp_path, monkeypatch):
+    spills = []
+    spill = dedupIndex.SpillCounterStore._spill
+    monkeypatch.setattr(dedupIndex.SpillCounterStore, "_spill", lambda self: spills.append(1) or spill(self))
+    # 预算只够几十个条目，计数在处理过程中多次落盘
+    got = run(Deduplication5, sheet, workers=1, memory_budget_mb=0.002, spill_dir=str(tmp_path), **params)
+    pd.testing.assert_frame_equal(got, reference5(frame, **params))
+    assert len(spills) > 1
+    # 临时 SQLite 文件用完即删
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("module, reference", CASES)
+def test_checkpoint_resume_matches_reference(module, reference, params, frame, sheet, tmp_path, capsys):
+    checkpoint = str(tmp_path / "dedup.ckpt")
+    for cut in (150, 300):
+        run(module, write_sheet(frame.iloc[:cut], tmp_path / f"part{cut}.xlsx"), checkpoint=checkpoint, **params)
+    capsys.readouterr()
+    got = run(module, sheet, checkpoint=checkpoint, **params)
+    # 只处理了末尾追加的 100 行，结果与整体计算相同
+    assert f"从检查点继续：已处理 300 行，本次新增 {len(frame) - 300} 行" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(got, reference(frame, **params))
+
+
+@pytest.mark.parametrize("module, reference", CASES)
+def test_checkpoint_with_changed_history_starts_over(module, reference, frame, tmp_path, capsys):
+    checkpoint = str(tmp_path / "dedup.ckpt")
+    run(module, write_sheet(frame.iloc[:300], tmp_path / "part.xlsx"), checkpoint=checkpoint, **PARAMS[0])
+    changed = frame.copy()
+    changed.loc[10, SUM_FIELD] += 1
+    capsys.readouterr()
+    got = run(module, write_sheet(changed, tmp_path / "changed.xlsx"), checkpoint=checkpoint, **PARAMS[0])
+    assert "输入文件的历史行与检查点不一致，将从头处理" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(got, reference(changed, **PARAMS[0]))
@@ -0,0 +1,93 @@
+"""team_analytics 的各分析表与逐队逐文件循环计算的结果一致"""
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lianchuan import team_analytics
+
+LABELS = ["f1", "f2", "f3", "f4", "f5", "f6", "f7"]
+
+
+def make_merged(n_teams=40, seed=5):
+    rng = random.Random(seed)
+    rows = []
+    for t in range(n_teams):
+        row = [f"队{t}"]
+        for _ in LABELS:
+            r = rng.random()
+            # 缺失、非数值与并列的值
+            row.append(None if r < 0.25 else "—" if r < 0.3 else rng.choice([1.5, 2.0, 3.0]) if r < 0.4 else rng.randint(0, 50))
+        rows.append(row)
+    rows.append(["全缺"] + [None] * len(LABELS))
+    return pd.DataFrame(rows, columns=["队名"] + [f"v{i}" for i in range(len(LABELS))])
+
+
+def numeric(v):
+    return float(v) if isinstance(v, (int, float)) else math.nan
+
+
+def reference(merged, window):
+    """逐队、逐文件的循环实现"""
+    teams = merged["队名"].tolist()
+    matrix = [[numeric(v) for v in row[1:]] for row in merged.itertuples(index=False)]
+    n = len(LABELS)
+    change, rolling, summary = [], [], []
+    for vals in matrix:
+        change.append([math.nan] + [vals[j] - vals[j - 1] for j in range(1, n)])
+        roll = []
+        for j in range(n):
+            win = [v for v in vals[max(0, j - window + 1):j + 1] if not math.isnan(v)]
+            roll.append(sum(win) / len(win) if win else math.nan)
+        rolling.append(roll)
+        seen = [j for j in range(n) if not math.isnan(vals[j])]
+        longest = run = 0
+        for v in vals:
+            run = run + 1 if math.isnan(v) else 0
+            longest = max(longest, run)
+        summary.append({
+            "出现次数": len(seen),
+            "缺失次数": n - len(seen),
+            "最长连续缺失": longest,
+            "首次出现": LABELS[seen[0]] if seen else None,
+            "最后出现": LABELS[seen[-1]] if seen else None,
+            "均值": sum(vals[j] for j in seen) / len(seen) if seen else math.nan,
+            "最新值": vals[seen[-1]] if seen else math.nan,
+            "首末变化": vals[seen[-1]] - vals[seen[0]] if seen else math.nan,
+        })
+    rank = [[] for _ in matrix]
+    for j in range(n):
+        column = [vals[j] for vals in matrix]
+        for i, v in enumerate(column):
+            rank[i].append(math.nan if math.isnan(v) else 1 + sum(o > v for o in column if not math.isnan(o)))
+    index = pd.Index(teams, name="队名")
+    frame = lambda data: pd.DataFrame(data, index=index, columns=LABELS, dtype=float)
+    return {
+        "变化": frame(change),
+        "排名": frame(rank),
+        f"滚动均值{window}": frame(rolling),
+        "汇总": pd.DataFrame(summary, index=index),
+    }
+
+
+def assert_frame_close(got, expected):
+    assert list(got.index) == list(expected.index)
+    assert list(got.columns) == list(expected.columns)
+    for c in expected.columns:
+        g, e = got[c].tolist(), expected[c].tolist()
+        if pd.api.types.is_numeric_dtype(expected[c]):
+            np.testing.assert_allclose(np.asarray(g, dtype=float), np.asarray(e, dtype=float), equal_nan=True)
+        else:
+            assert [None if pd.isna(v) else v for v in g] == [None if pd.isna(v) else v for v in e]
+
+
+@pytest.mark.parametrize("window", [1, 3, 4, 10])
+def test_team_analytics_matches_reference(window):
+    merged = make_merged()
+    got = team_analytics(merged, LABELS, window=window)
+    expected = reference(merged, window)
+    assert list(got) == list(expected)
+    for name in expected:
+        assert_frame_close(got[name], expected[name])
@@ -0,0 +1,71 @@
+"""BinIndex 与原逐区间计数的结果一致"""
+import random
+import subprocess
+import sys
+
+import pytest
+
+import output
+from output import BinIndex, auto_step, format_bins
+
+
+def reference_bins(elements, step):
+    """原实现：枚举 [0, step], [step, 2*step], ... 逐区间计数，取个数最多（并列取终点最大）的区间"""
+    intervals = [(i, i + step) for i in range(0, max(elements) + 1, step)]
+    counts = [(interval, sum(interval[0] <= e <= interval[1] for e in elements)) for interval in intervals]
+    best = max(counts, key=lambda x: (x[1], x[0][1]))
+    return f'【{intervals[0][0]}~{intervals[0][1]}】\t{counts[0][1]}\t【{best[0][0]}~{best[0][1]}】\t{best[1]}'
+
+
+def random_rows(count=300, seed=7):
+    rng = random.Random(seed)
+    for _ in range(count):
+        top = rng.choice([30, 500, 5000, 50000])
+        row = [rng.randint(0, top) for _ in range(rng.randint(1, 40))]
+        # 恰好落在区间边界上的值、重复值与负数
+        row += [rng.choice([10, 100, 1000]) * rng.randint(0, 5) for _ in range(rng.randint(0, 5))]
+        row += [rng.randint(-50, -1) for _ in range(rng.randint(0, 2))]
+        yield row
+
+
+@pytest.mark.parametrize("step", [7, 10, 100, 1000])
+def test_format_bins_matches_reference(step):
+    for row in random_rows():
+        assert format_bins(BinIndex(row), step) == reference_bins(row, step)
+
+
+def test_auto_step_matches_reference():
+    for row in random_rows():
+        assert format_bins(BinIndex(row), auto_step(row)) == reference_bins(row, auto_step(row))
+
+
+def test_count_closed_interval():
+    index = BinIndex([0, 10, 10, 15, 20, 35])
+    assert index.count(10, 20) == 4
+    assert index.count(21, 34) == 0
+
+
+def test_no_non_negative_values():
+    with pytest.raises(ValueError):
+        BinIndex([-3, -1]).densest_bin(10)
+
+
+def test_process_file_multiple_steps(tmp_path):
+    rows = list(random_rows(20, seed=3))
+    src = tmp_path / "input.txt"
+    src.write_text("\n".join("\t".join([f"行{i}"] + [str(v) for v in row]) for i, row in enumerate(rows)),
+                   encoding="utf-8")
+    out = tmp_path / "result.txt"
+    output.process_file(str(src), str(out), steps=[10, 100])
+    expected = [f'"行{i}"\t' + "\t".join(reference_bins(row, s) for s in (10, 100)) for i, row in enumerate(rows)]
+    assert out.read_text(encoding="utf-8").split("\n") == expected
+
+
+@pytest.mark.parametrize("steps", ["0", "-5", "10,0", "x"])
+def test_cli_rejects_non_positive_steps(tmp_path, steps):
+    src = tmp_path / "input.txt"
+    src.write_text("a\t1\t2", encoding="utf-8")
+    result = subprocess.run([sys.executable, output.__file__, str(src), str(tmp_path / "out.txt"), f"--steps={steps}"],
+                            capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "--steps" in result.stderr